@@ -0,0 +1,89 @@
+"""
+answer_cache.py
+Shared cache of chat answers and sub-agent answers.
+
+Questions are keyed by fast_path.question_key — content words in order,
+with the drivers and races they mention canonicalised — so "Who'll win the
+title?" and "who wins the 2026 championship" share an entry. Entries live in a bounded LRU with a
+TTL and are dropped wholesale when the data version changes (new simulation
+store or new actual results), so a cached answer never outlives its data.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from tools import data_loader
+
+ANSWER_CACHE_TTL_S       = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_ENABLED     = os.getenv("ANSWER_CACHE", "1") != "0"
+
+
+def data_version() -> str:
+    """Active snapshot version + actual-results mtime: what every answer depends on."""
+    results = data_loader.ACTUAL_RESULTS_PATH
+    mtime = results.stat().st_mtime_ns if results.exists() else 0
+    return f"{data_loader.sim_version()}:{mtime}"
+
+
+class AnswerCache:
+    """LRU + TTL map from (scope, question key) to answer text, scoped to a data version."""
+
+    def __init__(self, version: Callable[[], str] = data_version,
+                 ttl: float = ANSWER_CACHE_TTL_S, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self._version     = version
+        self._ttl         = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._cached_version = None
+        self.hits   = 0
+        self.misses = 0
+
+    def _check_version(self):
+        version = self._version()
+        if version != self._cached_version:
+            self._entries.clear()
+            self._cached_version = version
+
+    def get(self, scope: str, key: tuple | None) -> str | None:
+        """Cached answer for key in scope ("chat" or a sub-agent name); None key never hits."""
+        if key is None or not ANSWER_CACHE_ENABLED:
+            return None
+        self._check_version()
+        key = (scope, key)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, scope: str, key: tuple | None, answer: str):
+        if key is None or not ANSWER_CACHE_ENABLED or not answer:
+            return
+        self._check_version()
+        key = (scope, key)
+        self._entries[key] = (time.monotonic() + self._ttl, answer)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries"  : len(self._entries),
+            "hits"     : self.hits,
+            "misses"   : self.misses,
+            "hit_rate" : round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+ANSWERS = AnswerCache()
@@ -0,0 +1,59 @@
+"""
+bench_fanout.py
+Compares orchestrator latency for a multi-part question with sub-agents
+dispatched concurrently vs one after another, on the local stub model
+(STUB_MODEL_DELAY seconds per LLM call) so runs are deterministic.
+
+    cd backend
+    python -m agents.bench_fanout [--delay 0.5] [--question "..."]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+DEFAULT_QUESTION = (
+    "Who wins the championship on title probabilities, how do the driver profiles "
+    "of LEC and VER compare head to head, and who is the race winner at the "
+    "Monaco Grand Prix?"
+)
+
+
+async def _timed(agent, question: str) -> tuple[float, list]:
+    agents = []
+    progress = lambda e: e["status"] == "started" and agents.append(e["agent"])
+    started = time.perf_counter()
+    async for _ in agent.stream_async(question, invocation_state={"progress": progress}):
+        pass
+    return time.perf_counter() - started, agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--delay", type=float, default=0.5, help="stub seconds per LLM call")
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    args = parser.parse_args()
+
+    # The model and answer cache are configured at import time, so set them first.
+    # Cached sub-agent answers would turn the timed runs into cache hits.
+    os.environ["CHAT_MODEL"]       = "stub"
+    os.environ["STUB_MODEL_DELAY"] = str(args.delay)
+    os.environ["ANSWER_CACHE"]     = "0"
+    from strands.tools.executors import SequentialToolExecutor
+    from agents.orchestrator import create_orchestrator
+
+    # Warm-up: loads the simulation inputs and caches the tools fill lazily
+    asyncio.run(_timed(create_orchestrator(), args.question))
+
+    concurrent, agents = asyncio.run(_timed(create_orchestrator(), args.question))
+    sequential, _      = asyncio.run(_timed(create_orchestrator(SequentialToolExecutor()), args.question))
+
+    print(f"question    : {args.question}")
+    print(f"sub-agents  : {', '.join(agents)}  ({args.delay:g}s per LLM call)")
+    print(f"sequential  : {sequential:6.2f}s")
+    print(f"concurrent  : {concurrent:6.2f}s  ({sequential / concurrent:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
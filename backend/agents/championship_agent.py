@@ -1,23 +1,37 @@
-from strands import Agent
-from strands.models.openai import OpenAIModel
+from strands import Agent, tool
+from agents.models import ModelMetrics, create_model
 from tools.championship_tools import (
     get_championship_standings,
     get_constructors_standings,
     get_title_contenders,
 )
+from tools.whatif_tools import simulate_what_if
+from tools.outcome_tools import query_outcomes
+
+# Plain functions (the REST API calls them too) registered as strands tools
+TOOLS = [tool(f) for f in (
+    get_championship_standings,
+    get_constructors_standings,
+    get_title_contenders,
+    simulate_what_if,
+    query_outcomes,
+)]
 
 def create_championship_agent():
-    model = OpenAIModel(model_id="gpt-4o", params={"max_tokens": 2048})
+    model = create_model(max_tokens=2048)
     return Agent(
         model=model,
+        callback_handler=None,
+        hooks=[ModelMetrics("championship")],
         system_prompt="""You are the Championship Analyst for PolePosition AI.
 You have deep expertise in F1 championship dynamics and access to 10,000 Monte Carlo
 simulation results for the 2026 season. Use your tools to fetch real data and
 reason freely about what it means. Always pass full GP names to tools
-e.g. "Monaco Grand Prix" not "Monaco".""",
-        tools=[
-            get_championship_standings,
-            get_constructors_standings,
-            get_title_contenders,
-        ]
+e.g. "Monaco Grand Prix" not "Monaco".
+For hypotheticals ("what if Ferrari's DNF rate drops to 5%", "what if Cadillac
+finds 0.5s") run simulate_what_if and report the change against the baseline.
+For conditional or combined outcomes ("if Leclerc wins Monaco, what are Leclerc's
+title odds?", "Piastri beats Norris at both Silverstone and Spa") use query_outcomes and
+compare the conditional figure with the unconditional one.""",
+        tools=TOOLS
     )
\ No newline at end of file
@@ -0,0 +1,439 @@
+"""
+fast_path.py
+Deterministic router for the common chat questions.
+
+"Who wins the championship?", "How will Norris do at Silverstone?" and
+"Compare LEC and VER" are each answered by a single tool call, so they don't
+need the orchestrator and a specialist LLM round-trip. route() spots drivers
+and races in the question (names, codes, circuit nicknames — canonicalised
+through the data snapshot's find_driver / find_race), matches one of a handful of intents and
+renders the tool output through a template. Anything open-ended, hypothetical
+or multi-part returns None and goes to the LLM as before, as does anything the
+templates would answer wrongly: teams, places other than first, the back of
+the field, sprints.
+
+Set CHAT_FAST_PATH=0 to send everything to the LLM. `python -m agents.fast_path`
+checks the routing of the example questions below.
+"""
+
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Callable
+
+from tools.data_loader import DataSnapshot, snapshot
+from tools.championship_tools import get_championship_standings, get_constructors_standings
+from tools.driver_tools import get_driver_profile, compare_drivers
+from tools.race_tools import get_race_winner_probs, get_race_prediction
+
+FAST_PATH_ENABLED = os.getenv("CHAT_FAST_PATH", "1") != "0"
+
+# Questions longer than this are treated as open-ended
+MAX_WORDS = 25
+
+# ── Entity aliases ───────────────────────────────────────────────
+_FIRST_NAME_EXTRAS = {"ALB": ["alex"], "BEA": ["ollie"], "PER": ["checo"], "ANT": ["kimi"]}
+_TEAM_EXTRAS = ["merc", "aston", "racing bulls", "vcarb", "sauber", "kick sauber"]
+
+_CIRCUIT_ALIASES = {
+    "Australian Grand Prix"   : ["australia", "melbourne", "albert park"],
+    "Chinese Grand Prix"      : ["china", "shanghai"],
+    "Japanese Grand Prix"     : ["japan", "suzuka"],
+    "Bahrain Grand Prix"      : ["sakhir"],
+    "Saudi Arabian Grand Prix": ["saudi", "saudi arabia", "jeddah"],
+    "Canadian Grand Prix"     : ["canada", "montreal"],
+    "Spanish Grand Prix"      : ["spain", "barcelona"],
+    "Austrian Grand Prix"     : ["austria", "red bull ring", "spielberg"],
+    "British Grand Prix"      : ["britain", "silverstone"],
+    "Belgian Grand Prix"      : ["belgium", "spa"],
+    "Hungarian Grand Prix"    : ["hungary", "hungaroring"],
+    "Dutch Grand Prix"        : ["netherlands", "zandvoort"],
+    "Italian Grand Prix"      : ["italy", "monza"],
+    "Azerbaijan Grand Prix"   : ["baku"],
+    "United States Grand Prix": ["austin", "cota", "usa"],
+    "Mexico City Grand Prix"  : ["mexico"],
+    "São Paulo Grand Prix"    : ["brazil", "interlagos", "sao paulo"],
+    "Las Vegas Grand Prix"    : ["vegas"],
+    "Qatar Grand Prix"        : ["lusail"],
+    "Abu Dhabi Grand Prix"    : ["yas marina"],
+}
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and possessives, collapse punctuation to spaces."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = re.sub(r"'s\b", "", text.lower())
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def _driver_aliases(snap: DataSnapshot) -> dict:
+    aliases = {}
+    for code in snap.drivers:
+        name = snap.driver_names.get(code, code)
+        parts = _fold(name).split()
+        for alias in [_fold(name), parts[-1], parts[0], *_FIRST_NAME_EXTRAS.get(code, [])]:
+            aliases[alias] = name
+    return aliases
+
+
+def _race_aliases(snap: DataSnapshot) -> dict:
+    aliases = {}
+    for name in snap.race_names.values():
+        short = _fold(name.replace("Grand Prix", ""))
+        for alias in [_fold(name), short, f"{short} gp", *_CIRCUIT_ALIASES.get(name, [])]:
+            aliases[alias] = name
+    return aliases
+
+
+def _team_aliases(snap: DataSnapshot) -> set:
+    teams = {_fold(t) for t in snap.team_map.values() if t}
+    return teams | {t.replace("f1 team", "").strip() for t in teams} | set(_TEAM_EXTRAS)
+
+
+class _Aliases:
+    """Alias tables for one data snapshot — rebuilt when a reload changes the version."""
+
+    def __init__(self, snap: DataSnapshot):
+        self.version = snap.version
+        self.drivers = _driver_aliases(snap)
+        self.races   = _race_aliases(snap)
+        self.teams   = re.compile(
+            r"\b(" + "|".join(map(re.escape, sorted(_team_aliases(snap), key=len, reverse=True))) + r")\b"
+        )
+
+
+_aliases_current: _Aliases | None = None
+
+def _aliases(snap: DataSnapshot) -> _Aliases:
+    global _aliases_current
+    current = _aliases_current
+    if current is None or current.version != snap.version:
+        current = _aliases_current = _Aliases(snap)
+    return current
+
+
+def _alias_spans(folded: str, aliases: dict) -> list[tuple[int, int, str]]:
+    """(start, end, canonical name) of each alias in the question, longest alias first, in order seen."""
+    found, taken = [], folded
+    for alias in sorted(aliases, key=len, reverse=True):
+        match = re.search(rf"\b{re.escape(alias)}\b", taken)
+        if match:
+            found.append((match.start(), match.end(), aliases[alias]))
+            taken = taken[:match.start()] + "#" * len(alias) + taken[match.end():]
+    return sorted(found)
+
+
+def _find_aliases(folded: str, aliases: dict) -> list:
+    """Canonical names mentioned in the question, in order seen."""
+    return [name for _, _, name in _alias_spans(folded, aliases)]
+
+
+def extract_entities(question: str, snap: DataSnapshot | None = None) -> tuple[list, list]:
+    """(driver codes, race names) mentioned in the question."""
+    snap = snap or snapshot()
+    aliases = _aliases(snap)
+    folded = _fold(question)
+
+    # Codes only count in capitals — "per", "law", "gas" are ordinary words
+    codes = [t for t in re.findall(r"\b[A-Z]{3}\b", question) if t in snap.drivers]
+    names = _find_aliases(folded, aliases.drivers)
+    drivers = []
+    for code in codes + [snap.find_driver(name) for name in names]:
+        if code and code not in drivers:
+            drivers.append(code)
+
+    races = []
+    for name in _find_aliases(folded, aliases.races):
+        _, race = snap.find_race(name)
+        if race and race not in races:
+            races.append(race)
+    return drivers, races
+
+
+# ── Cache keys ───────────────────────────────────────────────────
+_FILLER = {
+    "a", "an", "the", "of", "for", "in", "at", "to", "on", "be", "is", "are", "am",
+    "and", "with", "between", "than",
+    "who", "what", "which", "will", "ll", "going", "gonna", "do", "does", "did",
+    "you", "me", "tell", "please", "think", "2026", "this", "year", "season",
+    "predict", "predicted", "prediction", "likely", "most", "grand", "prix", "gp",
+}
+_SYNONYMS = {
+    "title": "championship", "wdc": "championship", "champion": "championship",
+    "wins": "win", "winner": "win", "winning": "win", "won": "win",
+    "favourite": "win", "favorite": "win", "favourites": "win", "favorites": "win",
+    "vs": "compare", "versus": "compare", "comparison": "compare",
+    "constructor": "constructors", "wcc": "constructors",
+}
+# Questions leaning on earlier turns can't be answered from a shared cache
+_CONTEXT_WORDS = re.compile(
+    r"\b(he|him|his|she|her|they|them|their|it|its|that|those|these|what about|"
+    r"also|instead|same|again|else|other|more)\b"
+)
+
+
+def question_key(question: str) -> tuple | None:
+    """
+    Wording-insensitive key for a self-contained question: its content
+    words in order (synonyms merged, filler and repeats dropped), with each
+    driver or race it mentions replaced in place by its code or round.
+    Order is kept because "Ferrari beat McLaren" and "McLaren beat Ferrari"
+    ask different things. None if it refers to earlier turns.
+    """
+    folded = _fold(question)
+    if not folded or _CONTEXT_WORDS.search(folded):
+        return None
+    snap = snapshot()
+    aliases = _aliases(snap)
+    drivers, _ = extract_entities(question, snap)
+    codes = {d.lower(): d for d in drivers}
+
+    spans = sorted(
+        [(start, end, snap.find_driver(name)) for start, end, name in _alias_spans(folded, aliases.drivers)]
+        + [(start, end, f"R{snap.find_race(name)[0]}") for start, end, name in _alias_spans(folded, aliases.races)]
+    )
+
+    def words(text: str) -> list:
+        return [codes.get(w) or _SYNONYMS.get(w, w) for w in text.split() if w not in _FILLER]
+
+    tokens, pos = [], 0
+    for start, end, entity in spans:
+        if start < pos:   # a driver alias inside a race alias, or the reverse
+            continue
+        tokens += words(folded[pos:start])
+        tokens.append(entity)
+        pos = end
+    tokens += words(folded[pos:])
+    # A repeated word adds nothing ("compare LEC vs VER" → compare LEC compare VER)
+    return tuple(dict.fromkeys(tokens))
+
+
+# ── Intents ──────────────────────────────────────────────────────
+_OPEN_ENDED = re.compile(
+    r"\b(why|how come|explain|if|suppose|imagine|hypothetical|scenario|without|instead|"
+    r"career|history|previous|last (year|season)|20(1\d|2[0-5])|after round|round \d+|"
+    r"dnf|retire|reliability|pace|safety car|rain|weather|upgrade|penalty|strategy|"
+    r"regulation|model|simulation|method)\b"
+)
+# Questions the templates would answer wrongly: about a team, a place other
+# than first, the back of the field, a sprint rather than the Grand Prix,
+# qualifying or the podium rather than the win, or the standings part-way
+# through the season rather than at the end
+_NOT_FAVOURITE = re.compile(
+    r"\b(teams?|first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|"
+    r"\d+(st|nd|rd|th)|p\d+|runners? up|last|worst|least|slowest|bottom|sprints?|"
+    r"pole|qualifying|quali|grid|fastest|podiums?|"
+    r"leads?|leading|leader|after|points)\b"
+)
+_CHAMPIONSHIP  = re.compile(r"\b(championship|title|champion|standings|wdc)\b")
+_CONSTRUCTORS  = re.compile(r"\b(constructors?|wcc)\b|\bteams? (championship|standings|title)\b")
+_COMPARE       = re.compile(r"\b(compare|comparison|vs|versus|or|beat|beats|better|against|head to head)\b")
+_RACE_WIN      = re.compile(r"\b(win|wins|winner|favou?rite|who|predict|prediction|odds|chances?)\b")
+_DRIVER_SEASON = re.compile(
+    r"\b(season|profile|do|does|perform|chances?|points|expect|outlook|predict|prediction|"
+    r"title|championship|how good|strongest|best)\b"
+)
+
+
+def _pct(x: float) -> str:
+    return f"{x:.1f}%"
+
+
+def _name(row: dict) -> str:
+    return f"{row['full_name']} ({row['team']})"
+
+
+def _championship() -> str:
+    result = get_championship_standings()
+    rows = result["standings"]
+    by_title = sorted(rows, key=lambda r: r["champ_pct"], reverse=True)
+    top = by_title[0]
+    lines = [
+        f"{_name(top)} is the title favourite, winning the championship in "
+        f"{_pct(top['champ_pct'])} (±{top['champ_pct_ci']:.1f}) of {result['precision']['n_sims']:,} simulated seasons.",
+        "",
+        "Predicted standings (average points, title chance):",
+    ]
+    lines += [
+        f"{r['position']}. {_name(r)} — {r['avg_points']:.0f} pts, {_pct(r['champ_pct'])}"
+        for r in rows[:5]
+    ]
+    return "\n".join(lines)
+
+
+def _constructors() -> str:
+    rows = get_constructors_standings()["constructors"]
+    top = rows[0]
+    lines = [
+        f"{top['team']} lead the predicted constructors' championship with "
+        f"{top['avg_points']:.0f} points on average and a {_pct(top['champ_pct'])} title chance.",
+        "",
+    ]
+    lines += [
+        f"{r['position']}. {r['team']} — {r['avg_points']:.0f} pts, {_pct(r['champ_pct'])}"
+        for r in rows[:5]
+    ]
+    return "\n".join(lines)
+
+
+def _driver_profile(driver: str) -> str:
+    p = get_driver_profile(driver)
+    best  = ", ".join(f"{c['race']} ({_pct(c['win_pct'])})" for c in p["best_circuits"][:3])
+    worst = ", ".join(c["race"] for c in p["worst_circuits"][:3])
+    return "\n".join([
+        f"{_name(p)} is predicted to score {p['avg_points']:.0f} points on average "
+        f"(range {p['min_points']:.0f}–{p['max_points']:.0f}), with a "
+        f"{_pct(p['champ_pct'])} chance of the title and a {_pct(p['win_pct'])} win rate per race.",
+        f"Best chances to win: {best}.",
+        f"Toughest weekends: {worst}.",
+    ])
+
+
+def _compare(d1: str, d2: str) -> str:
+    c = compare_drivers(d1, d2)
+    a, b = c["driver1"], c["driver2"]
+    a_edges = sum(1 for r in c["circuit_comparison"] if r["advantage"] == a["code"])
+    b_edges = len(c["circuit_comparison"]) - a_edges
+    return "\n".join([
+        f"{a['full_name']} vs {b['full_name']}:",
+        f"• {a['code']}: {a['avg_points']:.0f} pts avg, {_pct(a['champ_pct'])} title, "
+        f"{_pct(a['win_pct'])} race win rate",
+        f"• {b['code']}: {b['avg_points']:.0f} pts avg, {_pct(b['champ_pct'])} title, "
+        f"{_pct(b['win_pct'])} race win rate",
+        f"{a['code']} finishes the season ahead in {_pct(c['d1_beats_d2_pct'])} of simulations, "
+        f"and has the better win chance at {a_edges} of {a_edges + b_edges} races.",
+    ])
+
+
+def _race_winner(race: str) -> str:
+    rows = get_race_winner_probs(race)["drivers"]
+    top = rows[0]
+    lines = [
+        f"{_name(top)} is favourite for the {race} with a {_pct(top['win_pct'])} win chance "
+        f"({_pct(top['podium_pct'])} podium).",
+        "",
+    ]
+    lines += [f"{r['position']}. {_name(r)} — {_pct(r['win_pct'])} win" for r in rows[:5]]
+    return "\n".join(lines)
+
+
+def _race_prediction(driver: str, race: str) -> str:
+    p = get_race_prediction(driver, race)
+    return (
+        f"{_name(p)} at the {p['race']}: {_pct(p['win_pct'])} win, {_pct(p['podium_pct'])} podium, "
+        f"{_pct(p['points_pct'])} points — most likely finish P{p['likely_pos']}."
+    )
+
+
+def classify(question: str) -> tuple[str, Callable[[], str]] | None:
+    """(intent, render) for a fast-path question, or None for the LLM."""
+    folded = _fold(question)
+    if not folded or len(folded.split()) > MAX_WORDS or _OPEN_ENDED.search(folded):
+        return None
+
+    snap = snapshot()
+    drivers, races = extract_entities(question, snap)
+
+    if _aliases(snap).teams.search(folded):
+        return None
+    if len(races) > 1 or len(drivers) > 2:
+        return None
+    if _CONSTRUCTORS.search(folded):
+        return ("constructors", _constructors) if not drivers and not races else None
+    if _NOT_FAVOURITE.search(folded):
+        return None
+    if len(drivers) == 2:
+        if races or not _COMPARE.search(folded):
+            return None
+        return "compare", lambda: _compare(*drivers)
+    if drivers and races:
+        return "race_prediction", lambda: _race_prediction(drivers[0], races[0])
+    if races:
+        return ("race_winner", lambda: _race_winner(races[0])) if _RACE_WIN.search(folded) else None
+    if drivers:
+        return ("driver_profile", lambda: _driver_profile(drivers[0])) if _DRIVER_SEASON.search(folded) else None
+    if _CHAMPIONSHIP.search(folded):
+        return "championship", _championship
+    return None
+
+
+# ── Routing + hit rate ───────────────────────────────────────────
+class FastPathStats:
+    """Counts of fast-path hits per intent and LLM fallbacks."""
+
+    def __init__(self):
+        self.hits   = Counter()
+        self.misses = 0
+
+    def record(self, intent: str | None):
+        if intent:
+            self.hits[intent] += 1
+        else:
+            self.misses += 1
+
+    def snapshot(self) -> dict:
+        total = sum(self.hits.values()) + self.misses
+        return {
+            "questions" : total,
+            "hits"      : sum(self.hits.values()),
+            "misses"    : self.misses,
+            "hit_rate"  : round(sum(self.hits.values()) / total, 4) if total else 0.0,
+            "by_intent" : dict(self.hits),
+        }
+
+
+STATS = FastPathStats()
+
+
+def route(question: str) -> tuple[str, str] | None:
+    """(intent, answer) if the question can be answered without the LLM."""
+    if not FAST_PATH_ENABLED:
+        return None
+    match = classify(question)
+    STATS.record(match[0] if match else None)
+    if match is None:
+        return None
+    intent, render = match
+    return intent, render()
+
+
+# ── Routing examples ─────────────────────────────────────────────
+FAST_PATH_EXAMPLES = {
+    "Who wins the championship?"          : "championship",
+    "Who wins the constructors' title?"   : "constructors",
+    "What are the team standings?"        : "constructors",
+    "Compare LEC and VER"                 : "compare",
+    "How will Norris do at Silverstone?"  : "race_prediction",
+    "Who will win Monaco?"                : "race_winner",
+    "How good is Hamilton this season?"   : "driver_profile",
+}
+# Close to a template, but its answer would be wrong — these go to the LLM
+LLM_ONLY_EXAMPLES = (
+    "Which team wins the title?",
+    "How likely is Ferrari to win the championship?",
+    "Who will be second in the championship?",
+    "Who will finish last in the championship?",
+    "Who is the worst driver in the championship?",
+    "Who is most likely to finish last at Monaco?",
+    "Who finishes P2 at Monza?",
+    "Who wins the sprint in China?",
+    "Who will be on pole at Monaco?",
+    "Who tops qualifying at Monza?",
+    "Who will be on the podium at Silverstone?",
+    "Who will lead after Monaco?",
+    "Who leads the championship after Silverstone?",
+    "Why is Leclerc the favourite?",
+)
+
+
+if __name__ == "__main__":
+    cases = [*FAST_PATH_EXAMPLES.items(), *((q, None) for q in LLM_ONLY_EXAMPLES)]
+    wrong = 0
+    for question, want in cases:
+        got = (classify(question) or (None,))[0]
+        if got != want:
+            wrong += 1
+            print(f"✗ {question!r}: expected {want or 'LLM'}, routed to {got or 'LLM'}")
+    print(f"{len(cases) - wrong} of {len(cases)} routed as expected")
+    raise SystemExit(1 if wrong else 0)
@@ -0,0 +1,59 @@
+"""
+models.py
+Single place the agents get their model from.
+
+CHAT_MODEL picks the OpenAI model id (default gpt-4o). CHAT_MODEL=stub swaps
+in the deterministic local StubModel, so the chat stack can run and be
+tested without OpenAI. Each agent also gets a ModelMetrics hook, which
+records its model calls for /metrics.
+"""
+
+import os
+import time
+
+from metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS
+
+CHAT_MODEL       = os.getenv("CHAT_MODEL", "gpt-4o")
+STUB_MODEL_DELAY = float(os.getenv("STUB_MODEL_DELAY", "0"))
+
+
+def create_model(max_tokens: int):
+    if CHAT_MODEL == "stub":
+        from agents.stub_model import StubModel
+        return StubModel(delay=STUB_MODEL_DELAY)
+
+    from strands.models.openai import OpenAIModel
+    return OpenAIModel(model_id=CHAT_MODEL, params={"max_tokens": max_tokens})
+
+
+class ModelMetrics:
+    """
+    strands hook provider: latency, outcome and token usage of every model
+    call one agent makes, labelled with the agent's name. An agent makes
+    one model call at a time, so a single start time is enough.
+    """
+
+    def __init__(self, agent: str):
+        self.agent    = agent
+        self._started = None
+
+    def register_hooks(self, registry, **kwargs):
+        from strands.hooks import AfterModelCallEvent, BeforeModelCallEvent
+        registry.add_callback(BeforeModelCallEvent, self._before)
+        registry.add_callback(AfterModelCallEvent, self._after)
+
+    def _before(self, event):
+        self._started = time.perf_counter()
+
+    def _after(self, event):
+        if self._started is None:
+            return
+        LLM_SECONDS.observe(time.perf_counter() - self._started, self.agent)
+        self._started = None
+        if event.exception is not None or event.stop_response is None:
+            LLM_CALLS.inc(self.agent, "error")
+            return
+        LLM_CALLS.inc(self.agent, "ok")
+        usage = (event.stop_response.message.get("metadata") or {}).get("usage") or {}
+        LLM_TOKENS.inc(self.agent, "input", amount=usage.get("inputTokens", 0))
+        LLM_TOKENS.inc(self.agent, "output", amount=usage.get("outputTokens", 0))
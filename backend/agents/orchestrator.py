@@ -1,49 +1,107 @@
-from strands import Agent, tool
-from strands.models.openai import OpenAIModel
+import asyncio
+import os
+
+from strands import Agent, ToolContext, tool
+from strands.tools.executors import ConcurrentToolExecutor
+from agents.models import ModelMetrics, create_model
+from agents.answer_cache import ANSWERS
+from agents.fast_path import question_key
 from agents.championship_agent import create_championship_agent
 from agents.driver_agent import create_driver_agent
 from agents.race_agent import create_race_agent
 
-# Create sub-agents once at startup
-_championship_agent = create_championship_agent()
-_driver_agent       = create_driver_agent()
-_race_agent         = create_race_agent()
+# Seconds one specialist may take before the orchestrator answers without it
+SUB_AGENT_TIMEOUT_S = float(os.getenv("SUB_AGENT_TIMEOUT_S", "60"))
+
+# Sub-agents are built per question: each call is independent, concurrent
+# chat sessions never share agent state, and history doesn't pile up.
+# All ask_* calls the orchestrator makes in one turn run concurrently
+# (ConcurrentToolExecutor), so a multi-part question costs roughly the
+# slowest specialist rather than the sum of them.
 
-@tool
-def ask_championship_agent(question: str) -> str:
+async def _ask(name: str, create_agent, question: str, tool_context: ToolContext) -> str:
+    """
+    Run one sub-agent under SUB_AGENT_TIMEOUT_S, forwarding its progress
+    through the "progress" callback the chat handler puts in
+    invocation_state (if any). Sub-agents are stateless, so answers are
+    shared across conversations through the answer cache.
+    """
+    emit = tool_context.invocation_state.get("progress") or (lambda event: None)
+
+    key = question_key(question)
+    cached = ANSWERS.get(name, key)
+    if cached is not None:
+        emit({"type": "progress", "agent": name, "status": "cached"})
+        return cached
+
+    emit({"type": "progress", "agent": name, "status": "started"})
+
+    async def run():
+        result, seen_tools = None, set()
+        async for event in create_agent().stream_async(question):
+            tool_use = event.get("current_tool_use") or {}
+            if tool_use.get("toolUseId") and tool_use["toolUseId"] not in seen_tools:
+                seen_tools.add(tool_use["toolUseId"])
+                emit({"type": "progress", "agent": name, "status": "tool", "tool": tool_use.get("name")})
+            if "result" in event:
+                result = event["result"]
+        return str(result)
+
+    try:
+        answer = await asyncio.wait_for(run(), SUB_AGENT_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        emit({"type": "progress", "agent": name, "status": "timeout"})
+        return (f"The {name} specialist did not answer within {SUB_AGENT_TIMEOUT_S:g}s. "
+                f"Answer from the other specialists and say this part is unavailable.")
+
+    emit({"type": "progress", "agent": name, "status": "done"})
+    ANSWERS.put(name, key, answer)
+    return answer
+
+@tool(context=True)
+async def ask_championship_agent(question: str, tool_context: ToolContext) -> str:
     """
     Ask the championship specialist. Use for standings, title probabilities,
-    constructors championship, who wins the championship.
+    constructors championship, who wins the championship, and conditional
+    odds ("if X wins Monaco, what are their title chances?").
     """
-    return str(_championship_agent(question))
+    return await _ask("championship", create_championship_agent, question, tool_context)
 
-@tool
-def ask_driver_agent(question: str) -> str:
+@tool(context=True)
+async def ask_driver_agent(question: str, tool_context: ToolContext) -> str:
     """
     Ask the driver specialist. Use for driver profiles, head to head comparisons,
     best and worst circuits for a driver.
     """
-    return str(_driver_agent(question))
+    return await _ask("driver", create_driver_agent, question, tool_context)
 
-@tool
-def ask_race_agent(question: str) -> str:
+@tool(context=True)
+async def ask_race_agent(question: str, tool_context: ToolContext) -> str:
     """
     Ask the race specialist. Use for race winner predictions, driver probabilities
     at specific circuits, full season calendar for a driver.
     """
-    return str(_race_agent(question))
+    return await _ask("race", create_race_agent, question, tool_context)
 
 
-def create_orchestrator():
-    model = OpenAIModel(model_id="gpt-4o", params={"max_tokens": 4096})
+def create_orchestrator(tool_executor=None):
+    model = create_model(max_tokens=4096)
     return Agent(
         model=model,
+        callback_handler=None,
+        hooks=[ModelMetrics("orchestrator")],
+        tool_executor=tool_executor or ConcurrentToolExecutor(),
         system_prompt="""You are PolePosition AI — an expert F1 prediction system for the 2026 season.
 
 You have three specialist agents at your disposal. Route questions to the right 
 agent or combine multiple agents for complex questions. Synthesize their responses 
 into one clear, engaging answer.
 
+For a multi-part question, work out every specialist question it needs up front
+and make all of those calls in the same turn — they run in parallel. Give each
+specialist a focused, self-contained question. Only call again after seeing the
+results if something is genuinely missing.
+
 Key context:
 - 10,000 Monte Carlo simulations using real Bahrain pre-season testing data
 - Training data: 2023, 2024, 2025 seasons — CV MAE 0.632
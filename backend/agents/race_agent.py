@@ -1,23 +1,32 @@
-from strands import Agent
-from strands.models.openai import OpenAIModel
+from strands import Agent, tool
+from agents.models import ModelMetrics, create_model
 from tools.race_tools import (
     get_race_winner_probs,
     get_race_prediction,
     get_driver_calendar,
 )
+from tools.outcome_tools import query_outcomes
+
+# Plain functions (the REST API calls them too) registered as strands tools
+TOOLS = [tool(f) for f in (
+    get_race_winner_probs,
+    get_race_prediction,
+    get_driver_calendar,
+    query_outcomes,
+)]
 
 def create_race_agent():
-    model = OpenAIModel(model_id="gpt-4o", params={"max_tokens": 2048})
+    model = create_model(max_tokens=2048)
     return Agent(
         model=model,
+        callback_handler=None,
+        hooks=[ModelMetrics("race")],
         system_prompt="""You are the Race Analyst for PolePosition AI.
 You have deep expertise in F1 circuit characteristics and race strategy, and access 
 to 10,000 Monte Carlo simulation results for the 2026 season. Use your tools to 
 fetch real data and reason freely about what it means. Always pass full GP names 
-to tools e.g. "Monaco Grand Prix" not "Monaco".""",
-        tools=[
-            get_race_winner_probs,
-            get_race_prediction,
-            get_driver_calendar,
-        ]
+to tools e.g. "Monaco Grand Prix" not "Monaco".
+For results that depend on each other across races ("if Norris wins Monza, how
+often does Norris podium at Baku?") use query_outcomes.""",
+        tools=TOOLS
     )
\ No newline at end of file
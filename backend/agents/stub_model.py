@@ -0,0 +1,124 @@
+"""
+stub_model.py
+Deterministic local stand-in for the OpenAI model (CHAT_MODEL=stub).
+
+Speaks the strands streaming protocol, so the real agents, tools and chat
+pipeline run end to end without network access or an API key:
+  • a user question with tools available → calls every tool whose name or
+    description shares enough words with the question (several at once for
+    compound questions), filling string arguments with the question
+  • a turn carrying tool results → streams a short answer quoting them
+STUB_MODEL_DELAY adds a fixed per-call latency to mimic a remote model.
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import Any, AsyncGenerator
+
+from strands.models.model import Model
+
+_WORD = re.compile(r"[a-z]+")
+_STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "in", "at", "on", "is", "are",
+    "use", "ask", "agent", "get", "me", "who", "what", "how", "will", "does",
+    "do", "with", "e", "g", "specific", "all", "one", "two",
+}
+
+
+def _words(text: str) -> set:
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 2}
+
+
+class StubModel(Model):
+    def __init__(self, delay: float = 0.0, **model_config: Any):
+        self.config = {"model_id": "stub", "delay": delay, **model_config}
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> dict:
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs) -> AsyncGenerator:
+        raise NotImplementedError("StubModel does not support structured output")
+        yield  # pragma: no cover
+
+    # ── Decisions ─────────────────────────────────────────────
+    @staticmethod
+    def _question(messages: list) -> str:
+        for message in reversed(messages):
+            if message["role"] != "user":
+                continue
+            texts = [c["text"] for c in message["content"] if "text" in c]
+            if texts:
+                return " ".join(texts)
+        return ""
+
+    @staticmethod
+    def _pick_tools(question: str, tool_specs: list) -> list:
+        asked  = _words(question)
+        scored = []
+        for spec in tool_specs:
+            vocab = _words(spec["name"].replace("_", " ") + " " + spec.get("description", ""))
+            scored.append((len(asked & vocab), spec))
+        best = max(score for score, _ in scored)
+        if best == 0:
+            return [tool_specs[0]]
+        return [spec for score, spec in scored if score >= max(2, best - 1) or score == best]
+
+    @staticmethod
+    def _arguments(spec: dict, question: str) -> dict:
+        schema = spec["inputSchema"]["json"]
+        return {
+            name: question
+            for name in schema.get("required", [])
+            if schema["properties"].get(name, {}).get("type") == "string"
+        }
+
+    # ── Streaming ─────────────────────────────────────────────
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs) -> AsyncGenerator:
+        started  = time.perf_counter()
+        question = self._question(messages)
+        results  = [c["toolResult"] for c in messages[-1]["content"] if "toolResult" in c]
+
+        if self.config["delay"]:
+            await asyncio.sleep(self.config["delay"])
+
+        yield {"messageStart": {"role": "assistant"}}
+        out_words = 0
+
+        if tool_specs and not results:
+            for spec in self._pick_tools(question, tool_specs):
+                tool_use = {"name": spec["name"], "toolUseId": f"tooluse_{uuid.uuid4().hex[:24]}"}
+                yield {"contentBlockStart": {"start": {"toolUse": tool_use}}}
+                yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(self._arguments(spec, question))}}}}
+                yield {"contentBlockStop": {}}
+                out_words += 8
+            stop_reason = "tool_use"
+        else:
+            quoted = []
+            for result in results:
+                text = " ".join(
+                    c["text"] if "text" in c else json.dumps(c.get("json", ""))
+                    for c in result.get("content", [])
+                )
+                quoted.append(text[:200])
+            answer = f"Stub answer to: {question}" + "".join(f"\n• {q}" for q in quoted)
+
+            yield {"contentBlockStart": {"start": {}}}
+            for token in re.findall(r"\S+\s*", answer):
+                yield {"contentBlockDelta": {"delta": {"text": token}}}
+                out_words += 1
+            yield {"contentBlockStop": {}}
+            stop_reason = "end_turn"
+
+        yield {"messageStop": {"stopReason": stop_reason}}
+
+        in_words = sum(len(json.dumps(m["content"]).split()) for m in messages)
+        yield {"metadata": {
+            "usage"   : {"inputTokens": in_words, "outputTokens": out_words, "totalTokens": in_words + out_words},
+            "metrics" : {"latencyMs": int((time.perf_counter() - started) * 1000)},
+        }}
@@ -0,0 +1,104 @@
+"""
+bench_startup.py
+Cold-start cost of an API process, each number from a fresh interpreter
+(median of --runs):
+
+  import main     module import — what every worker and reload pays
+  first request   import + the first GET /api/championship
+  chat ready      import + building the first orchestrator (strands, the
+                  model client and the agents), deferred until /ws/chat or
+                  the CHAT_WARMUP background import
+
+followed by where import time goes (python -X importtime, self time summed
+by top-level package), and what the lazy chat stack keeps out of startup.
+
+    cd backend
+    python bench_startup.py [--runs 5] [--top 12]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent
+
+# Modules the REST endpoints shouldn't need
+HEAVY = ("pandas", "strands", "openai", "boto3", "scipy", "sklearn", "lightgbm")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+t2 = time.perf_counter()
+assert client.get("/api/championship").status_code == 200
+t3 = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+main.chat_stack()()
+t4 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "first_request": (t1 - t0) + (t3 - t2),
+                  "chat_ready": (t1 - t0) + (t4 - t3), "loaded": loaded}}))
+"""
+
+
+def _env() -> dict:
+    env = {**os.environ, "CAREER_WARMUP": "0", "CHAT_WARMUP": "0", "SIM_WATCH_INTERVAL_S": "0"}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND), env.get("PYTHONPATH")]))
+    return env
+
+
+def probe() -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(heavy=HEAVY)], cwd=BACKEND, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(code: str) -> Counter:
+    """Self import time in seconds per top-level package for `python -c code`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND, env=_env(),
+                         capture_output=True, text=True, check=True)
+    totals = Counter()
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.runs)]
+    print(f"cold start, median of {args.runs} fresh processes")
+    for key, label in (("import", "import main"), ("first_request", "first request"),
+                       ("chat_ready", "chat ready")):
+        print(f"  {label:<14} {statistics.median(r[key] for r in runs) * 1e3:7.0f} ms")
+    loaded = runs[-1]["loaded"]
+    print(f"  heavy modules loaded before chat: {', '.join(loaded) if loaded else 'none'}")
+
+    rest = import_breakdown("import main")
+    chat = import_breakdown("import main; main.chat_stack()")
+    total = sum(rest.values())
+    print(f"\nimport main — {total * 1e3:.0f} ms of imports, self time by package")
+    for name, t in rest.most_common(args.top):
+        print(f"  {name:<24} {t * 1e3:7.1f} ms  {t / total:6.1%}")
+
+    deferred = Counter({name: t - rest[name] for name, t in chat.items() if t - rest[name] > 0.001})
+    print(f"\ndeferred to the chat stack — {sum(deferred.values()) * 1e3:.0f} ms")
+    for name, t in deferred.most_common(args.top):
+        print(f"  {name:<24} {t * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+chat.py
+Streaming, bounded, cancellable chat turns for the /ws/chat handler.
+
+Common questions are answered straight from the tools by the fast-path
+router (agents/fast_path.py) without touching the LLM; repeats of other
+self-contained questions come from the answer cache (agents/answer_cache.py).
+Remaining turns run the orchestrator through strands' async stream, so LLM
+round-trips are awaited rather than blocking the event loop, and REST
+requests keep flowing. At most MAX_ACTIVE_CHATS turns run at once; up to
+MAX_QUEUED_CHATS more wait in an admission queue (told their position) and
+anything beyond that is turned away. Cancelling the turn's task — e.g. when
+the socket disconnects — stops the in-flight model and sub-agent calls.
+
+Events sent to the client:
+  queued   {"position"}             waiting for a free slot
+  thinking                          turn started
+  token    {"text"}                 partial orchestrator output
+  progress {"agent", "status", ...} sub-agent started / tool call / done
+  response {"message", "source"}    final answer (full text); source is
+                                    "fast_path", "cache" or "llm"
+  cancelled                         turn stopped by the client
+  error    {"message"}
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from agents.answer_cache import ANSWERS
+from agents.fast_path import question_key, route
+
+MAX_ACTIVE_CHATS = int(os.getenv("MAX_ACTIVE_CHATS", "4"))
+MAX_QUEUED_CHATS = int(os.getenv("MAX_QUEUED_CHATS", "32"))
+
+Send = Callable[[dict], Awaitable[None]]
+
+
+class ChatBusy(Exception):
+    """Raised when the admission queue is full."""
+
+
+class ChatAdmission:
+    """Global concurrency limit with a bounded FIFO admission queue."""
+
+    def __init__(self, max_active: int = MAX_ACTIVE_CHATS, max_queued: int = MAX_QUEUED_CHATS):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._slots     = asyncio.Semaphore(max_active)
+        self.active     = 0
+        self.waiting    = 0
+
+    @asynccontextmanager
+    async def slot(self, send: Send):
+        if self._slots.locked():
+            if self.waiting >= self.max_queued:
+                raise ChatBusy("Too many chats in progress — try again shortly")
+            self.waiting += 1
+            try:
+                await send({"type": "queued", "position": self.waiting})
+                await self._slots.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+async def stream_turn(agent, message: str, send: Send) -> str:
+    """
+    Run one orchestrator turn, streaming tokens and sub-agent progress to
+    send() in order. Returns the final response text.
+    """
+    loop   = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def progress(event: dict):
+        # Safe from tool threads as well as the loop itself
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    async def forward():
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            await send(event)
+
+    forwarder = asyncio.create_task(forward())
+    result = None
+    try:
+        async for event in agent.stream_async(message, invocation_state={"progress": progress}):
+            if "data" in event and event["data"]:
+                events.put_nowait({"type": "token", "text": event["data"]})
+            if "result" in event:
+                result = event["result"]
+        events.put_nowait(None)
+        await forwarder
+    finally:
+        if not forwarder.done():
+            forwarder.cancel()
+
+    return str(result) if result is not None else ""
+
+
+def _remember(agent, question: str, answer: str):
+    """Record an exchange answered outside the orchestrator so it sees it in follow-ups."""
+    agent.messages.append({"role": "user", "content": [{"text": question}]})
+    agent.messages.append({"role": "assistant", "content": [{"text": answer}]})
+
+
+async def run_turn(agent, message: str, send: Send, admission: ChatAdmission):
+    """Admit, stream and answer one question; errors go back to the client."""
+    routed = route(message)
+    if routed is not None:
+        _, answer = routed
+        _remember(agent, message, answer)
+        await send({"type": "thinking"})
+        await send({"type": "response", "message": answer, "source": "fast_path"})
+        return
+
+    key = question_key(message)
+    cached = ANSWERS.get("chat", key)
+    if cached is not None:
+        _remember(agent, message, cached)
+        await send({"type": "thinking"})
+        await send({"type": "response", "message": cached, "source": "cache"})
+        return
+
+    history = list(agent.messages)
+    try:
+        async with admission.slot(send):
+            await send({"type": "thinking"})
+            text = await stream_turn(agent, message, send)
+            ANSWERS.put("chat", key, text)
+            await send({"type": "response", "message": text, "source": "llm"})
+    except ChatBusy as e:
+        await send({"type": "error", "message": str(e)})
+    # On cancel or failure, drop the half-finished exchange so the next turn
+    # starts clean — a dangling toolUse would break every later turn
+    except asyncio.CancelledError:
+        agent.messages[:] = history
+        raise
+    except Exception as e:
+        agent.messages[:] = history
+        await send({"type": "error", "message": f"Chat failed: {e}"})
@@ -0,0 +1,144 @@
+"""
+bench.py
+Timing for features.pipeline against the notebook's original
+build_year_features (kept verbatim below as the reference; the parity
+check lives in tests/test_pipeline.py).
+
+History is synthesised by replaying the real seasons under earlier year
+numbers, so --seasons 60 builds sixty full calendars through exactly the
+code paths the real data takes.
+
+    cd backend
+    python -m features.bench --seasons 3 15 60
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from features import pipeline
+from tools import raw_store
+
+TABLES = ('race_results', 'qualifying', 'pitstops')
+
+
+def reference_build_year_features(df_r, df_q, df_p):
+    """build_year_features as it was in 02_feature_engineering.ipynb."""
+    circuit_types, safety_car_prob = pipeline.CIRCUIT_TYPES, pipeline.SAFETY_CAR_PROB
+    df_r, df_q, df_p = df_r.copy(), df_q.copy(), df_p.copy()
+
+    avg_finish_by_grid   = df_r.groupby('grid_position')['finish_position'].mean()
+    df_r['expected_finish'] = df_r['grid_position'].map(avg_finish_by_grid)
+    df_r['outperformance']  = df_r['expected_finish'] - df_r['finish_position']
+
+    df_r['dnf'] = df_r['status'].apply(
+        lambda x: 0 if x == 'Finished' or '+' in str(x) else 1
+    )
+
+    df_r = df_r.sort_values(['driver_name', 'round']).reset_index(drop=True)
+
+    df_r['rolling_avg_finish_5'] = df_r.groupby('driver_name')['finish_position'] \
+        .transform(lambda x: x.shift(1).rolling(5, min_periods=1).mean())
+    df_r['rolling_avg_points_5'] = df_r.groupby('driver_name')['points'] \
+        .transform(lambda x: x.shift(1).rolling(5, min_periods=1).mean())
+    df_r['constructor_rolling_points_5'] = df_r.groupby('team')['points'] \
+        .transform(lambda x: x.shift(1).rolling(5, min_periods=1).mean())
+    df_r['dnf_rate'] = df_r.groupby('driver_name')['dnf'] \
+        .transform(lambda x: x.shift(1).rolling(10, min_periods=1).mean())
+    df_r['driver_experience'] = df_r.groupby('driver_name').cumcount()
+
+    df_r['circuit_type']           = df_r['circuit'].map(circuit_types).fillna('permanent')
+    df_r['safety_car_probability'] = df_r['circuit'].map(safety_car_prob).fillna(0.5)
+    df_r['home_race']              = 0
+    df_r['wet_race']               = 0
+    df_r['championship_gap']       = 0
+
+    df_q = df_q.sort_values(['driver_name', 'round']).reset_index(drop=True)
+    df_q['rolling_avg_quali_5'] = df_q.groupby('driver_name')['quali_position'] \
+        .transform(lambda x: x.shift(1).rolling(5, min_periods=1).mean())
+
+    quali_team = df_q[['round', 'driver', 'team', 'quali_position']].copy()
+    team_best  = quali_team.groupby(['round', 'team'])['quali_position'].min().reset_index()
+    team_best.columns = ['round', 'team', 'team_best_quali']
+    quali_team = quali_team.merge(team_best, on=['round', 'team'])
+    quali_team['teammate_quali_gap'] = quali_team['quali_position'] - quali_team['team_best_quali']
+    df_q = df_q.merge(
+        quali_team[['round', 'driver', 'teammate_quali_gap']],
+        on=['round', 'driver'], how='left'
+    )
+
+    df_p['duration_seconds'] = pd.to_numeric(df_p['duration'], errors='coerce')
+    driver_map = df_r[['driver', 'driver_name']].drop_duplicates()
+    driver_map['driver_lastname'] = driver_map['driver_name'].str.split(' ').str[-1].str.lower()
+    df_p_fixed = df_p.merge(
+        driver_map[['driver', 'driver_lastname']],
+        left_on='driver', right_on='driver_lastname', how='left'
+    ).rename(columns={'driver_y': 'driver_code'})
+
+    team_pit = df_r[['round', 'driver', 'team']].merge(
+        df_p_fixed[['round', 'driver_code', 'duration_seconds']],
+        left_on=['round', 'driver'], right_on=['round', 'driver_code'], how='left'
+    )
+    avg_pit = team_pit.groupby(['round', 'team'])['duration_seconds'].mean().reset_index()
+    avg_pit.columns = ['round', 'team', 'avg_team_pit_seconds']
+    df_r = df_r.merge(avg_pit, on=['round', 'team'], how='left')
+    df_r['avg_team_pit_seconds'] = df_r['avg_team_pit_seconds'] \
+        .fillna(df_r['avg_team_pit_seconds'].mean())
+
+    df_merged = df_r.merge(
+        df_q[['round', 'driver', 'quali_position', 'rolling_avg_quali_5', 'teammate_quali_gap']],
+        on=['round', 'driver'], how='left'
+    )
+    df_merged['quali_position']      = df_merged['quali_position'].fillna(df_merged['grid_position'])
+    df_merged['rolling_avg_quali_5'] = df_merged['rolling_avg_quali_5'].fillna(10.0)
+    df_merged['teammate_quali_gap']  = df_merged['teammate_quali_gap'].fillna(0.0)
+    return df_merged
+
+
+def reference_build_master(years, data_dir) -> pd.DataFrame:
+    """Serial per-year loop + the notebook's stack-and-clean cells."""
+    frames = {y: reference_build_year_features(*(raw_store.read_table(t, years=[y], data_dir=data_dir)
+                                                 for t in TABLES))
+              for y in years}
+    return pipeline.finalize(frames)
+
+
+def synthesise(data_dir: Path, n_seasons: int) -> list[int]:
+    """Write n_seasons of raw tables into data_dir by replaying the real years backwards."""
+    real = raw_store.available_years('race_results')
+    source = {t: {y: raw_store.read_table(t, years=[y]) for y in real} for t in TABLES}
+    years = list(range(real[-1] - n_seasons + 1, real[-1] + 1))
+    for i, year in enumerate(years):
+        src = real[i % len(real)]
+        for t in TABLES:
+            raw_store.write_season(t, year, source[t][src], data_dir)
+    return years
+
+
+def _timed(fn) -> tuple[float, pd.DataFrame]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seasons", nargs="+", type=int, default=[3, 30], help="history lengths to time")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'seasons':>8} {'rows':>7} {'notebook':>10} {'vectorised':>11} {'parallel':>10} {'max diff':>9}")
+    for n in args.seasons:
+        with tempfile.TemporaryDirectory() as tmp:
+            years = synthesise(Path(tmp), n)
+            t_ref, ref = _timed(lambda: reference_build_master(years, Path(tmp)))
+            t_vec, new = _timed(lambda: pipeline.build_master(years, data_dir=Path(tmp), workers=1))
+            t_par, _   = _timed(lambda: pipeline.build_master(years, data_dir=Path(tmp), workers=args.workers))
+        print(f"{n:>8} {len(new):>7} {t_ref:>9.2f}s {t_vec:>10.2f}s {t_par:>9.2f}s {pipeline.max_difference(ref, new):>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+pipeline.py
+Multi-year feature engineering for the training set (master_features_all),
+extracted from 02_feature_engineering.ipynb.
+
+Same features and columns as the notebook's build_year_features, computed
+without per-group Python callbacks: lagged rolling means are differences of
+one cumulative sum over the rows sorted by group, the DNF and home-race
+flags are column expressions, and every grouping is keyed by year so any
+number of seasons is built in one pass. Chunks of years are built in
+parallel processes (each worker reads its own years from the raw store, so
+only the result crosses the process boundary).
+
+    cd backend
+    python -m features.pipeline 2023 2024 --prebuilt ../data/master_features_2025.csv
+
+python -m features.bench checks parity with the notebook version and
+times both on synthetic multi-decade histories.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools import raw_store
+
+# ── Circuit tables (shared with the notebook's single-season cells) ──────
+CIRCUIT_TYPES = {
+    'Albert Park Grand Prix Circuit': 'street',
+    'Shanghai International Circuit': 'permanent',
+    'Suzuka Circuit': 'permanent',
+    'Bahrain International Circuit': 'permanent',
+    'Jeddah Corniche Circuit': 'street',
+    'Miami International Autodrome': 'street',
+    'Autodromo Enzo e Dino Ferrari': 'permanent',
+    'Circuit de Monaco': 'street',
+    'Circuit de Barcelona-Catalunya': 'permanent',
+    'Circuit Gilles Villeneuve': 'permanent',
+    'Red Bull Ring': 'permanent',
+    'Silverstone Circuit': 'permanent',
+    'Circuit de Spa-Francorchamps': 'permanent',
+    'Hungaroring': 'permanent',
+    'Circuit Zandvoort': 'permanent',
+    'Autodromo Nazionale di Monza': 'permanent',
+    'Baku City Circuit': 'street',
+    'Marina Bay Street Circuit': 'street',
+    'Circuit of the Americas': 'permanent',
+    'Autodromo Hermanos Rodriguez': 'permanent',
+    'Autodromo Jose Carlos Pace': 'permanent',
+    'Las Vegas Strip Street Circuit': 'street',
+    'Lusail International Circuit': 'permanent',
+    'Yas Marina Circuit': 'permanent'
+}
+
+# Historical safety car probability per circuit (0-1)
+SAFETY_CAR_PROB = {
+    'Albert Park Grand Prix Circuit': 0.7,
+    'Shanghai International Circuit': 0.5,
+    'Suzuka Circuit': 0.4,
+    'Bahrain International Circuit': 0.3,
+    'Jeddah Corniche Circuit': 0.8,
+    'Miami International Autodrome': 0.6,
+    'Autodromo Enzo e Dino Ferrari': 0.4,
+    'Circuit de Monaco': 0.9,
+    'Circuit de Barcelona-Catalunya': 0.3,
+    'Circuit Gilles Villeneuve': 0.7,
+    'Red Bull Ring': 0.5,
+    'Silverstone Circuit': 0.5,
+    'Circuit de Spa-Francorchamps': 0.6,
+    'Hungaroring': 0.3,
+    'Circuit Zandvoort': 0.5,
+    'Autodromo Nazionale di Monza': 0.6,
+    'Baku City Circuit': 0.8,
+    'Marina Bay Street Circuit': 0.8,
+    'Circuit of the Americas': 0.6,
+    'Autodromo Hermanos Rodriguez': 0.4,
+    'Autodromo Jose Carlos Pace': 0.7,
+    'Las Vegas Strip Street Circuit': 0.6,
+    'Lusail International Circuit': 0.4,
+    'Yas Marina Circuit': 0.3
+}
+
+HOME_CIRCUITS = {
+    'VER': 'Circuit Zandvoort',
+    'NOR': 'Silverstone Circuit',
+    'PIA': 'Albert Park Grand Prix Circuit',
+    'RUS': 'Silverstone Circuit',
+    'HAM': 'Silverstone Circuit',
+    'LEC': 'Circuit de Monaco',
+    'SAI': 'Circuit de Barcelona-Catalunya',
+    'ALO': 'Circuit de Barcelona-Catalunya',
+    'GAS': 'Circuit de Monaco',
+    'OCO': 'Circuit de Monaco',
+    'TSU': 'Suzuka Circuit',
+    'ANT': 'Autodromo Nazionale di Monza',
+    'BOR': 'Autodromo Jose Carlos Pace',
+    'HAD': 'Circuit de Monaco',
+    'STR': 'Circuit Gilles Villeneuve',
+    'ALB': 'Silverstone Circuit',
+    'HUL': 'Circuit de Spa-Francorchamps',
+    'BEA': 'Silverstone Circuit',
+    'LAW': 'Albert Park Grand Prix Circuit',
+    'DOO': 'Albert Park Grand Prix Circuit',
+    'COL': 'Autodromo Jose Carlos Pace'
+}
+
+# Default parallelism: one worker per this many seasons, up to the CPU count
+MIN_YEARS_PER_WORKER = 20
+
+# Recent data matters more; older years get the smallest weight
+SAMPLE_WEIGHTS = {2023: 0.5, 2024: 0.8, 2025: 1.0}
+
+# Dropped from the training set: leakage, weak, or raw inputs of other features
+DROP_COLS = ['expected_finish', 'teammate_finish_gap',
+             'fastest_lap_rank', 'championship_gap',
+             'wet_race', 'home_race', 'status',
+             'points', 'laps_completed']
+
+# Defaults for rolling features with no history yet (a driver's first race)
+ROLLING_DEFAULTS = {
+    'rolling_avg_finish_5'        : 10.0,
+    'rolling_avg_points_5'        : 5.0,
+    'constructor_rolling_points_5': 10.0,
+    'dnf_rate'                    : 0.0,
+}
+
+# ── Vectorised building blocks ───────────────────────────────────
+
+def dnf_flag(status: pd.Series) -> pd.Series:
+    """1 unless the driver finished (status "Finished" or "+N Lap(s)")."""
+    finished = status.eq('Finished') | status.str.contains('+', regex=False).fillna(False).astype(bool)
+    return (~finished).astype(int)
+
+
+def home_race_flag(df: pd.DataFrame) -> pd.Series:
+    """1 where the race is at the driver's home circuit."""
+    return df['circuit'].eq(df['driver'].map(HOME_CIRCUITS)).astype(int)
+
+
+def _groups(keys: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row order that makes each key's rows contiguous (stable, so the frame's
+    own order is kept within a key), the sorted group codes and the index
+    where each sorted row's group starts. Integer keys are taken as group
+    ids with -1 for missing, as from groupby(...).ngroup().
+    """
+    codes = keys.to_numpy() if pd.api.types.is_integer_dtype(keys) else pd.factorize(keys)[0]
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    n = len(codes)
+    starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]] if n else np.zeros(0, bool)
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0)) if n else np.zeros(0, int)
+    return order, sorted_codes, group_start
+
+
+def lagged_rolling_mean(values: pd.Series, keys: pd.Series, window: int) -> pd.Series:
+    """
+    Same as values.groupby(keys).transform(lambda x: x.shift(1).rolling(window,
+    min_periods=1).mean()): the mean of up to `window` earlier rows of the same
+    key, in the frame's row order, ignoring NaNs.
+    """
+    order, codes, group_start = _groups(keys)
+    v = values.to_numpy(dtype=np.float64)[order]
+    valid = ~np.isnan(v)
+    csum = np.r_[0.0, np.cumsum(np.where(valid, v, 0.0))]   # csum[i] = sum of v[:i]
+    ccnt = np.r_[0, np.cumsum(valid)]
+    i  = np.arange(len(v))
+    lo = np.maximum(group_start, i - window)
+    total, count = csum[i] - csum[lo], ccnt[i] - ccnt[lo]
+    mean = np.where((count > 0) & (codes >= 0), total / np.maximum(count, 1), np.nan)
+    out = np.empty_like(mean)
+    out[order] = mean
+    return pd.Series(out, index=values.index)
+
+
+def group_cumcount(keys: pd.Series) -> pd.Series:
+    """Same as frame.groupby(keys).cumcount(): 0, 1, 2, ... within each key."""
+    order, _, group_start = _groups(keys)
+    out = np.empty(len(order), dtype=np.int64)
+    out[order] = np.arange(len(order)) - group_start
+    return pd.Series(out, index=keys.index)
+
+# ── Seasons ──────────────────────────────────────────────────────
+
+def build_features(df_r: pd.DataFrame, df_q: pd.DataFrame, df_p: pd.DataFrame) -> pd.DataFrame:
+    """
+    Training rows from raw race results, qualifying and pit stops — one row
+    per driver per race. Any number of seasons at once: every statistic is
+    per year, exactly as if each season were built alone, and rows come out
+    ordered by year, driver name, round.
+    """
+    df_r = df_r.copy()
+
+    # ── Outperformance ─────────────────────────────────────────
+    df_r['expected_finish'] = df_r.groupby(['year', 'grid_position'])['finish_position'].transform('mean')
+    df_r['outperformance']  = df_r['expected_finish'] - df_r['finish_position']
+    df_r['dnf']             = dnf_flag(df_r['status'])
+
+    # ── Rolling features (sorted by driver + round) ────────────
+    df_r = df_r.sort_values(['year', 'driver_name', 'round'], kind='stable').reset_index(drop=True)
+    by_driver = df_r.groupby(['year', 'driver_name'], sort=False).ngroup()
+    by_team   = df_r.groupby(['year', 'team'], sort=False).ngroup()
+    df_r['rolling_avg_finish_5']         = lagged_rolling_mean(df_r['finish_position'], by_driver, 5)
+    df_r['rolling_avg_points_5']         = lagged_rolling_mean(df_r['points'], by_driver, 5)
+    # Team rows in driver-name order, as the notebook has always computed it
+    df_r['constructor_rolling_points_5'] = lagged_rolling_mean(df_r['points'], by_team, 5)
+    df_r['dnf_rate']                     = lagged_rolling_mean(df_r['dnf'], by_driver, 10)
+    df_r['driver_experience']            = group_cumcount(by_driver)
+
+    # ── Circuit features ───────────────────────────────────────
+    df_r['circuit_type']           = df_r['circuit'].map(CIRCUIT_TYPES).fillna('permanent')
+    df_r['safety_car_probability'] = df_r['circuit'].map(SAFETY_CAR_PROB).fillna(0.5)
+    df_r['home_race']              = 0  # weak feature, dropped later
+    df_r['wet_race']               = 0  # leakage, dropped later
+    df_r['championship_gap']       = 0  # leakage, dropped later
+
+    # ── Qualifying rolling average + teammate gap ───────────────
+    df_q = df_q.sort_values(['year', 'driver_name', 'round'], kind='stable').reset_index(drop=True)
+    df_q['rolling_avg_quali_5'] = lagged_rolling_mean(
+        df_q['quali_position'], df_q.groupby(['year', 'driver_name'], sort=False).ngroup(), 5)
+    team_best = df_q.groupby(['year', 'round', 'team'])['quali_position'].transform('min')
+    df_q['teammate_quali_gap'] = df_q['quali_position'] - team_best
+
+    # ── Pit stop average per team per round ────────────────────
+    # Pit stops name drivers by Jolpica id ("norris"); match on last name
+    id_to_code = df_r[['year', 'driver', 'driver_name']].drop_duplicates()
+    id_to_code = pd.DataFrame({
+        'year'           : id_to_code['year'],
+        'driver_code'    : id_to_code['driver'],
+        'driver_lastname': id_to_code['driver_name'].str.split(' ').str[-1].str.lower(),
+    })
+    pits = pd.DataFrame({'year': df_p['year'], 'round': df_p['round'], 'driver_lastname': df_p['driver'],
+                         'duration_seconds': pd.to_numeric(df_p['duration'], errors='coerce')})
+    pits = pits.merge(id_to_code, on=['year', 'driver_lastname'], how='left')
+
+    team_pit = df_r[['year', 'round', 'driver', 'team']].merge(
+        pits[['year', 'round', 'driver_code', 'duration_seconds']],
+        left_on=['year', 'round', 'driver'], right_on=['year', 'round', 'driver_code'], how='left'
+    )
+    avg_pit = (team_pit.groupby(['year', 'round', 'team'])['duration_seconds'].mean()
+               .rename('avg_team_pit_seconds').reset_index())
+    df_r = df_r.merge(avg_pit, on=['year', 'round', 'team'], how='left')
+    df_r['avg_team_pit_seconds'] = df_r['avg_team_pit_seconds'].fillna(
+        df_r.groupby('year')['avg_team_pit_seconds'].transform('mean'))
+
+    # ── Merge qualifying into results ──────────────────────────
+    df_merged = df_r.merge(
+        df_q[['year', 'round', 'driver', 'quali_position', 'rolling_avg_quali_5', 'teammate_quali_gap']],
+        on=['year', 'round', 'driver'], how='left'
+    )
+    df_merged['quali_position']      = df_merged['quali_position'].fillna(df_merged['grid_position'])
+    df_merged['rolling_avg_quali_5'] = df_merged['rolling_avg_quali_5'].fillna(10.0)
+    df_merged['teammate_quali_gap']  = df_merged['teammate_quali_gap'].fillna(0.0)
+    return df_merged
+
+
+def build_from_store(years, data_dir: Path = raw_store.DATA_DIR) -> pd.DataFrame:
+    """build_features for some years of the raw store (the per-process unit of work)."""
+    return build_features(*(raw_store.read_table(table, years=years, data_dir=data_dir)
+                            for table in ('race_results', 'qualifying', 'pitstops')))
+
+# ── All seasons ──────────────────────────────────────────────────
+
+def build_years(years, data_dir: Path = raw_store.DATA_DIR, workers: int | None = None) -> dict:
+    """
+    {year: features}. Years are split into one contiguous chunk per worker;
+    each chunk is built in a single vectorised pass, so per-call overhead
+    is paid per chunk rather than per season. workers=None picks one per
+    MIN_YEARS_PER_WORKER seasons, capped at the CPU count.
+    """
+    years = sorted(int(y) for y in years)
+    if workers is None:
+        # A worker costs a process start and a pandas import; give each enough seasons
+        workers = min(os.cpu_count() or 1, -(-len(years) // MIN_YEARS_PER_WORKER))
+    workers = max(1, min(workers, len(years)))
+    chunks = [list(c) for c in np.array_split(years, workers)]
+    if workers == 1:
+        built = [build_from_store(years, data_dir)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            built = list(pool.map(build_from_store, chunks, [data_dir] * workers))
+    df = pd.concat(built, ignore_index=True)
+    return {int(y): g.reset_index(drop=True) for y, g in df.groupby('year', sort=True)}
+
+
+def finalize(frames: dict, weights: dict = SAMPLE_WEIGHTS) -> pd.DataFrame:
+    """
+    Stack per-year frames into the training set: add sample_weight, drop the
+    unused columns and fill rolling features that have no history yet.
+    """
+    floor = min(weights.values())
+    stacked = pd.concat(
+        [frames[y].assign(sample_weight=weights.get(y, floor)) for y in sorted(frames)],
+        ignore_index=True,
+    )
+    df_all = stacked.drop(columns=[c for c in DROP_COLS if c in stacked.columns])
+    return df_all.fillna(ROLLING_DEFAULTS)
+
+
+def build_master(years, prebuilt: dict | None = None, data_dir: Path = raw_store.DATA_DIR,
+                 workers: int | None = None, weights: dict = SAMPLE_WEIGHTS) -> pd.DataFrame:
+    """
+    master_features_all: `years` built from the raw store, plus any prebuilt
+    {year: frame} (the notebook's hand-tuned 2025 master), stacked and cleaned.
+    """
+    frames = build_years(years, data_dir, workers)
+    frames.update(prebuilt or {})
+    return finalize(frames, weights)
+
+
+def max_difference(ref: pd.DataFrame, new: pd.DataFrame) -> float:
+    """Largest absolute numeric difference between two feature frames (asserts same shape, columns, text)."""
+    assert list(ref.columns) == list(new.columns), "column order differs"
+    assert len(ref) == len(new), "row count differs"
+    numeric = ref.select_dtypes('number').columns
+    text = ref.columns.difference(numeric)
+    assert (ref[text].astype(str).values == new[text].astype(str).values).all(), "text columns differ"
+    diff = np.abs(ref[numeric].to_numpy(float) - new[numeric].to_numpy(float))
+    assert (np.isnan(diff) == np.isnan(ref[numeric].to_numpy(float))).all(), "missing values differ"
+    return float(np.nanmax(diff)) if diff.size else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build master_features_all from the raw store.")
+    parser.add_argument("years", nargs="+", type=int)
+    parser.add_argument("--prebuilt", nargs="*", type=Path, default=[],
+                        help="finished per-year feature CSVs to stack in (year from their year column)")
+    parser.add_argument("--data-dir", type=Path, default=raw_store.DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", type=Path, default=raw_store.DATA_DIR / "master_features_all.csv")
+    args = parser.parse_args()
+
+    prebuilt = {}
+    for path in args.prebuilt:
+        df = raw_store.read_frame(path)
+        prebuilt[int(df['year'].iloc[0])] = df
+    df_all = build_master(args.years, prebuilt, args.data_dir, args.workers)
+    raw_store.write_frame(df_all, args.out)
+    print(f"✅ Saved {args.out.name}: {df_all.shape}")
+
+
+if __name__ == "__main__":
+    main()
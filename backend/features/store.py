@@ -0,0 +1,376 @@
+"""
+store.py
+Incremental feature store: appends one round's feature rows from persisted
+rolling state instead of rebuilding every season.
+
+    data/features/state.json               rolling state per season
+    data/features/year=2025/round=07.parquet   rows emitted for one round
+
+Per season the state holds, per driver, the last 5 finishes and points, the
+last 10 DNF flags, the start count and the last 5 qualifying positions; per
+team and driver, the last 5 points (constructor_rolling_points_5 walks a
+team's rows in driver-name order); the grid → finish sums behind
+expected_finish; the team pit average sums behind its fill value; and the
+season's driver codes/names for matching pit stops. Appending a round reads
+just that round from the raw store and emits exactly the rows a full
+rebuild (features.pipeline) would produce for it with the data available
+at the time.
+
+A few columns are season-relative in the full rebuild (expected_finish /
+outperformance, the team-window order, the pit fill), so earlier rounds'
+values move as a season grows. materialize() re-derives those from the
+stored rows — a vectorised pass over one season, no raw data — so the
+materialised season equals a full rebuild. state.json is written after the
+round file, so it is the commit point: a crash re-emits the round.
+
+    cd backend
+    python -m features.store update                 # append new rounds from data/raw
+    python -m features.store verify [--replay]      # diff against a full rebuild
+    python -m features.store export --prebuilt ../data/master_features_2025.csv
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from features import pipeline
+from tools import raw_store
+
+FEATURES_DIR  = "features"      # under the data dir
+STATE_FILE    = "state.json"
+FORMAT_NAME   = "poleposition-features"
+FORMAT_VERSION = 1
+
+DRIVER_WINDOW = 5    # finish, points and qualifying windows
+DNF_WINDOW    = 10
+TEAM_WINDOW   = 5
+
+# Unfilled team pit average, kept with the rows so the season fill can be redone
+_PIT_RAW = "_avg_team_pit_raw"
+
+
+def _mean(window: list) -> float:
+    values = [v for v in window if v is not None]
+    return sum(values) / len(values) if values else math.nan
+
+
+def _push(window: list, value, size: int):
+    window.append(None if value is None or pd.isna(value) else float(value))
+    del window[:-size]
+
+
+def _lastname(name: str) -> str:
+    return name.split(' ')[-1].lower()
+
+
+def _new_season() -> dict:
+    return {"rounds": [], "drivers": {}, "quali": {}, "team_tails": {},
+            "grid": {}, "pit": [0.0, 0], "names": []}
+
+
+class FeatureStore:
+    """Feature rows per round plus the rolling state needed to append the next one."""
+
+    def __init__(self, path: Path | None = None, data_dir: Path = raw_store.DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.path     = Path(path) if path else self.data_dir / FEATURES_DIR
+        state_path = self.path / STATE_FILE
+        if state_path.exists():
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+            if state.get("format") != FORMAT_NAME or state.get("version", 0) > FORMAT_VERSION:
+                raise ValueError(f"{state_path} is not a version {FORMAT_VERSION} {FORMAT_NAME} state file")
+            self.seasons = state["seasons"]
+        else:
+            self.seasons = {}
+
+    # ── Persistence ──────────────────────────────────────────────
+
+    def _round_path(self, year: int, rnd: int) -> Path:
+        return self.path / f"year={int(year)}" / f"round={int(rnd):02d}.parquet"
+
+    def _save_state(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f".{STATE_FILE}.tmp"
+        body = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "seasons": self.seasons}
+        tmp.write_text(json.dumps(body, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path / STATE_FILE)
+
+    def _write_rows(self, year: int, rnd: int, rows: pd.DataFrame):
+        path = self._round_path(year, rnd)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp)
+        os.replace(tmp, path)
+
+    def rounds(self, year: int) -> list[int]:
+        return list(self.seasons.get(str(int(year)), {}).get("rounds", []))
+
+    def reset(self, year: int):
+        """Forget a season: its state and its round files."""
+        self.seasons.pop(str(int(year)), None)
+        shutil.rmtree(self.path / f"year={int(year)}", ignore_errors=True)
+        self._save_state()
+
+    # ── Appending ────────────────────────────────────────────────
+
+    def append(self, year: int, rnd: int, results: pd.DataFrame, quali: pd.DataFrame,
+               pits: pd.DataFrame) -> pd.DataFrame:
+        """
+        Emit and store one round's feature rows from its raw tables, updating
+        the season's rolling state. Rounds must arrive in order per season.
+        """
+        key = str(int(year))
+        season = self.seasons.setdefault(key, _new_season())
+        if season["rounds"] and rnd <= season["rounds"][-1]:
+            raise ValueError(f"{year} round {rnd} is not after round {season['rounds'][-1]} — "
+                             "reset the season and replay it")
+        rows = _round_features(season, results, quali, pits)
+        self._write_rows(year, rnd, rows)
+        season["rounds"].append(int(rnd))
+        self._save_state()
+        return rows.drop(columns=[_PIT_RAW])
+
+    def append_from_raw(self, year: int, rnd: int) -> pd.DataFrame:
+        """append() with the round's tables read from the raw store (one partition each)."""
+        tables = (raw_store.read_table(t, years=[year], rounds=[rnd], data_dir=self.data_dir)
+                  for t in ("race_results", "qualifying", "pitstops"))
+        return self.append(year, rnd, *tables)
+
+    def update(self, years=None) -> dict:
+        """
+        Append every raw round not in the store yet. A season that gained a
+        round earlier than its last stored one is replayed from scratch.
+        Returns {year: rounds appended}.
+        """
+        years = years or raw_store.available_years("race_results", self.data_dir)
+        appended = {}
+        for year in sorted(int(y) for y in years):
+            raw_rounds = sorted(raw_store.rounds("race_results", year, self.data_dir)) \
+                or sorted(set(raw_store.read_table("race_results", years=[year], columns=["round"],
+                                                   data_dir=self.data_dir)["round"]))
+            done = self.rounds(year)
+            new = [r for r in raw_rounds if r not in done]
+            if new and done and new[0] < done[-1]:
+                self.reset(year)
+                new = raw_rounds
+            for rnd in new:
+                self.append_from_raw(year, rnd)
+            if new:
+                appended[year] = new
+        return appended
+
+    # ── Reading ──────────────────────────────────────────────────
+
+    def materialize(self, year: int) -> pd.DataFrame:
+        """
+        The season as a full rebuild would produce it: stored rows in
+        driver-name/round order with the season-relative columns re-derived.
+        """
+        files = sorted((self.path / f"year={int(year)}").glob("round=*.parquet"))
+        if not files:
+            raise ValueError(f"No features stored for {year}")
+        df = pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+        df = df.sort_values(["driver_name", "round"], kind="stable").reset_index(drop=True)
+
+        df["expected_finish"] = df.groupby("grid_position")["finish_position"].transform("mean")
+        df["outperformance"]  = df["expected_finish"] - df["finish_position"]
+        df["constructor_rolling_points_5"] = pipeline.lagged_rolling_mean(
+            df["points"], df.groupby("team", sort=False).ngroup(), TEAM_WINDOW)
+        df["avg_team_pit_seconds"] = df[_PIT_RAW].fillna(df[_PIT_RAW].mean())
+        return df.drop(columns=[_PIT_RAW])
+
+    def export(self, years=None, prebuilt: dict | None = None) -> pd.DataFrame:
+        """master_features_all from the store, brought up to date first (plus prebuilt {year: frame} overrides)."""
+        prebuilt = prebuilt or {}
+        years = [int(y) for y in years] if years else raw_store.available_years("race_results", self.data_dir)
+        years = [y for y in years if y not in prebuilt]
+        self.update(years)
+        frames = {y: self.materialize(y) for y in years}
+        frames.update(prebuilt)
+        return pipeline.finalize(frames)
+
+    # ── Verification ─────────────────────────────────────────────
+
+    def verify(self, years=None, replay: bool = False) -> dict:
+        """
+        Diff the store against a full rebuild from the raw store. With
+        replay, also re-appends every round into a scratch store and diffs
+        each emitted round against a rebuild on the data up to that round.
+        Returns {year: {"rows", "max_diff"[, "replay_max_diff"]}}.
+        """
+        years = sorted(int(y) for y in (years or self.seasons))
+        full = pipeline.build_years(years, self.data_dir, workers=1)
+        report = {}
+        for year in years:
+            stored = self.materialize(year)
+            expected = full[year][stored.columns]
+            report[year] = {"rows": len(stored), "max_diff": pipeline.max_difference(expected, stored)}
+
+        if replay:
+            with tempfile.TemporaryDirectory() as tmp:
+                scratch = FeatureStore(Path(tmp), self.data_dir)
+                for year in years:
+                    raw = {t: raw_store.read_table(t, years=[year], data_dir=self.data_dir)
+                           for t in ("race_results", "qualifying", "pitstops")}
+                    worst = 0.0
+                    for rnd in sorted(set(raw["race_results"]["round"])):
+                        upto = {t: df[df["round"] <= rnd] for t, df in raw.items()}
+                        emitted = scratch.append(year, rnd, *(df[df["round"] == rnd] for df in upto.values()))
+                        rebuilt = pipeline.build_features(upto["race_results"], upto["qualifying"], upto["pitstops"])
+                        rebuilt = rebuilt[rebuilt["round"] == rnd].reset_index(drop=True)
+                        worst = max(worst, pipeline.max_difference(rebuilt, emitted))
+                    report[year]["replay_max_diff"] = worst
+        return report
+
+# ── One round ────────────────────────────────────────────────────
+
+def _round_features(season: dict, results: pd.DataFrame, quali: pd.DataFrame,
+                    pits: pd.DataFrame) -> pd.DataFrame:
+    """One round's rows (driver-name order) from the season state, which it updates."""
+    df = results.sort_values("driver_name", kind="stable").reset_index(drop=True)
+
+    # ── Outperformance (season-so-far mean finish per grid slot) ─
+    for grid, finish in zip(df["grid_position"], df["finish_position"]):
+        cell = season["grid"].setdefault(str(int(grid)), [0.0, 0])
+        cell[0] += float(finish)
+        cell[1] += 1
+    df["expected_finish"] = [season["grid"][str(int(g))][0] / season["grid"][str(int(g))][1]
+                             for g in df["grid_position"]]
+    df["outperformance"]  = df["expected_finish"] - df["finish_position"]
+    df["dnf"]             = pipeline.dnf_flag(df["status"])
+
+    # ── Rolling windows ────────────────────────────────────────
+    finish_5, points_5, team_5, dnf_10, experience = [], [], [], [], []
+    for row in df.itertuples(index=False):
+        d = season["drivers"].setdefault(row.driver_name, {"finish": [], "points": [], "dnf": [], "starts": 0})
+        finish_5.append(_mean(d["finish"]))
+        points_5.append(_mean(d["points"]))
+        dnf_10.append(_mean(d["dnf"]))
+        experience.append(d["starts"])
+        _push(d["finish"], row.finish_position, DRIVER_WINDOW)
+        _push(d["points"], row.points, DRIVER_WINDOW)
+        _push(d["dnf"], row.dnf, DNF_WINDOW)
+        d["starts"] += 1
+
+        # Team window: this driver's earlier rows, topped up from the tails of
+        # teammates whose names sort before theirs (already updated this round)
+        tails = season["team_tails"].setdefault(row.team, {})
+        window = list(tails.get(row.driver_name, []))
+        for name in sorted((n for n in tails if n < row.driver_name), reverse=True):
+            if len(window) >= TEAM_WINDOW:
+                break
+            window = tails[name][-(TEAM_WINDOW - len(window)):] + window
+        team_5.append(_mean(window[-TEAM_WINDOW:]))
+        _push(tails.setdefault(row.driver_name, []), row.points, TEAM_WINDOW)
+
+    df["rolling_avg_finish_5"]         = finish_5
+    df["rolling_avg_points_5"]         = points_5
+    df["constructor_rolling_points_5"] = team_5
+    df["dnf_rate"]                     = dnf_10
+    df["driver_experience"]            = np.array(experience, dtype=np.int64)
+
+    # ── Circuit features ───────────────────────────────────────
+    df["circuit_type"]           = df["circuit"].map(pipeline.CIRCUIT_TYPES).fillna("permanent")
+    df["safety_car_probability"] = df["circuit"].map(pipeline.SAFETY_CAR_PROB).fillna(0.5)
+    df["home_race"]              = 0
+    df["wet_race"]               = 0
+    df["championship_gap"]       = 0
+
+    # ── Team pit average (matched on last name against the season's drivers) ─
+    for pair in zip(df["driver"], df["driver_name"]):
+        if list(pair) not in season["names"]:
+            season["names"].append(list(pair))
+    codes_by_lastname: dict = {}
+    for code, name in season["names"]:
+        codes_by_lastname.setdefault(_lastname(name), []).append(code)
+    durations: dict = {}
+    for driver_id, duration in zip(pits["driver"], pd.to_numeric(pits["duration"], errors="coerce")):
+        for code in codes_by_lastname.get(driver_id, []):
+            durations.setdefault(code, []).append(duration)
+    team_stops: dict = {}
+    for code, team in zip(df["driver"], df["team"]):
+        team_stops.setdefault(team, []).extend(d for d in durations.get(code, []) if not pd.isna(d))
+    df[_PIT_RAW] = [_mean(team_stops[team]) for team in df["team"]]
+    for value in df[_PIT_RAW].dropna():
+        season["pit"][0] += float(value)
+        season["pit"][1] += 1
+    pit_fill = season["pit"][0] / season["pit"][1] if season["pit"][1] else math.nan
+    df["avg_team_pit_seconds"] = df[_PIT_RAW].fillna(pit_fill)
+
+    # ── Qualifying ─────────────────────────────────────────────
+    q = quali.sort_values("driver_name", kind="stable").reset_index(drop=True)
+    quali_5 = []
+    for name, position in zip(q["driver_name"], q["quali_position"]):
+        window = season["quali"].setdefault(name, [])
+        quali_5.append(_mean(window))
+        _push(window, position, DRIVER_WINDOW)
+    q["rolling_avg_quali_5"] = quali_5
+    q["teammate_quali_gap"]  = q["quali_position"] - q.groupby("team")["quali_position"].transform("min")
+
+    df = df.merge(q[["round", "driver", "quali_position", "rolling_avg_quali_5", "teammate_quali_gap"]],
+                  on=["round", "driver"], how="left")
+    df["quali_position"]      = df["quali_position"].fillna(df["grid_position"])
+    df["rolling_avg_quali_5"] = df["rolling_avg_quali_5"].fillna(10.0)
+    df["teammate_quali_gap"]  = df["teammate_quali_gap"].fillna(0.0)
+
+    # Column order of pipeline.build_features, raw pit average last
+    ordered = [c for c in df.columns if c != _PIT_RAW and c != "avg_team_pit_seconds"]
+    at = ordered.index("quali_position")
+    return df[ordered[:at] + ["avg_team_pit_seconds"] + ordered[at:] + [_PIT_RAW]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental feature store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_ in (("update", "append rounds new in the raw store"),
+                        ("verify", "diff the store against a full rebuild"),
+                        ("export", "write master_features_all from the store")):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("years", nargs="*", type=int)
+        p.add_argument("--store", type=Path, default=None, help="default: <data-dir>/features")
+        p.add_argument("--data-dir", type=Path, default=raw_store.DATA_DIR)
+    sub.choices["verify"].add_argument("--replay", action="store_true",
+                                       help="also check every round against a rebuild as of that round")
+    sub.choices["export"].add_argument("--prebuilt", nargs="*", type=Path, default=[])
+    sub.choices["export"].add_argument("--out", type=Path, default=raw_store.DATA_DIR / "master_features_all.csv")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store, args.data_dir)
+    started = time.perf_counter()
+    if args.command == "update":
+        appended = store.update(args.years or None)
+        for year, rounds in appended.items():
+            print(f"  {year}: appended round(s) {', '.join(map(str, rounds))}")
+        print(f"✅ {'Up to date' if not appended else 'Updated'} in {time.perf_counter() - started:.2f}s")
+    elif args.command == "verify":
+        report = store.verify(args.years or None, args.replay)
+        ok = True
+        for year, r in report.items():
+            worst = max(r["max_diff"], r.get("replay_max_diff", 0.0))
+            ok &= worst < 1e-9
+            extra = f", replay max diff {r['replay_max_diff']:.1e}" if "replay_max_diff" in r else ""
+            print(f"  {year}: {r['rows']} rows, max diff {r['max_diff']:.1e}{extra}")
+        print("✅ Store matches a full rebuild" if ok else "❌ Store differs from a full rebuild")
+        raise SystemExit(0 if ok else 1)
+    else:
+        prebuilt = {}
+        for path in args.prebuilt:
+            df = raw_store.read_frame(path)
+            prebuilt[int(df["year"].iloc[0])] = df
+        df_all = store.export(args.years or None, prebuilt)
+        raw_store.write_frame(df_all, args.out)
+        print(f"✅ Saved {args.out.name}: {df_all.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+http_cache.py
+Conditional HTTP caching for prediction endpoints.
+
+Prediction payloads only change when the simulation data does, so each
+(endpoint, params) body is JSON-encoded and gzipped once per simulation
+version and kept in a bounded LRU. Responses carry an ETag derived from the
+version and body — with a "-gz" suffix on the gzipped representation, so
+caches never mix the two — and a matching If-None-Match gets an empty 304.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi import Request, Response
+
+CACHE_MAX_AGE     = int(os.getenv("CACHE_MAX_AGE", "60"))   # seconds before revalidating
+CACHE_MAX_ENTRIES = 512
+GZIP_MIN_BYTES    = 1024   # smaller bodies aren't worth compressing
+
+
+class _Entry:
+    __slots__ = ("etag", "body", "gzipped")
+
+    def __init__(self, etag: str, body: bytes, gzipped: bytes | None):
+        self.etag    = etag
+        self.body    = body
+        self.gzipped = gzipped
+
+
+class ResponseCache:
+    """Pre-encoded, pre-compressed JSON bodies keyed by data version + request key."""
+
+    def __init__(self, version: Callable[[], str], max_entries: int = CACHE_MAX_ENTRIES):
+        self._version     = version
+        self._max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._cached_version = None
+        self.hits   = 0
+        self.misses = 0
+
+    def _entry(self, key: tuple, build: Callable[[], dict]) -> _Entry:
+        version = self._version()
+        if version != self._cached_version:
+            self._entries.clear()
+            self._cached_version = version
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+
+        body    = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest  = hashlib.blake2b(body, digest_size=8).hexdigest()
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        entry   = _Entry(f'"{version}-{digest}"', body, gzipped)
+
+        self._entries[key] = entry
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries"  : len(self._entries),
+            "hits"     : self.hits,
+            "misses"   : self.misses,
+            "hit_rate" : round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def respond(self, request: Request, key: tuple, build: Callable[[], dict]) -> Response:
+        """Serve build() for key — 304 if the client already has it."""
+        entry = self._entry(key, build)
+        gzipped = entry.gzipped is not None and "gzip" in request.headers.get("accept-encoding", "")
+        etag = f'{entry.etag[:-1]}-gz"' if gzipped else entry.etag
+        headers = {
+            "ETag"          : etag,
+            "Cache-Control" : f"public, max-age={CACHE_MAX_AGE}, must-revalidate",
+            "Vary"          : "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=304, headers=headers)
+
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.gzipped, media_type="application/json", headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._entries.clear()
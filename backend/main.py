@@ -1,19 +1,84 @@
 # POLEPOSITION AI — FastAPI Backend
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from agents.orchestrator import create_orchestrator
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from tools.championship_tools import (
     get_championship_standings,
     get_constructors_standings,
 )
 from tools.race_tools import get_race_winner_probs
 from tools.driver_tools import get_driver_profile
-from tools.career_tools import get_career_stats
-from tools.data_loader import DRIVERS, RACE_NAMES, DRIVER_NAMES, TEAM_MAP
+from tools.career_tools import get_career_stats, get_all_career_stats, warm_career_cache, close_client
+from tools.whatif_tools import simulate_what_if, DEFAULT_WHATIF_SIMS
+from tools.outcome_tools import query_outcomes
+from simulation.engine import DEFAULT_SEED
+from tools import data_loader
+from http_cache import ResponseCache
+import metrics
+from chat import ChatAdmission, run_turn
+from agents.fast_path import STATS as FAST_PATH_STATS
+from agents.answer_cache import ANSWERS
+import asyncio
+import logging
+import os
+import secrets
+from contextlib import asynccontextmanager
 import json
 
-app = FastAPI(title="PolePosition AI")
+logger = logging.getLogger(__name__)
+
+CAREER_WARMUP = os.getenv("CAREER_WARMUP", "1") != "0"
+# 1: import the chat stack in the background after startup; 0: on the first /ws/chat
+CHAT_WARMUP = os.getenv("CHAT_WARMUP", "1") != "0"
+# Seconds between checks of the sim store / features files for a new publish (0 = off)
+SIM_WATCH_INTERVAL_S = float(os.getenv("SIM_WATCH_INTERVAL_S", "10"))
+# Enables POST /api/admin/reload when set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+async def watch_sim_data(interval: float):
+    """
+    Reload the data snapshot when its files change. A store publish is
+    atomic (a new version directory, then one rename of the manifest that
+    points at it), so whenever the manifest changes it names a complete
+    store. A failed load keeps the current snapshot and is retried on the
+    next check.
+    """
+    seen = data_loader.watch_stamp()
+    while True:
+        await asyncio.sleep(interval)
+        stamp = data_loader.watch_stamp()
+        if stamp == seen:
+            continue
+        try:
+            await run_in_threadpool(data_loader.reload)
+            seen = stamp
+        except Exception:
+            logger.exception("Simulation data reload failed — still serving %s", data_loader.sim_version())
+
+def chat_stack():
+    """
+    The orchestrator factory. strands, the model client and the agents are
+    imported on first call — about a second the REST endpoints never wait for.
+    """
+    from agents.orchestrator import create_orchestrator
+    return create_orchestrator
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prefetch career stats in the background — startup doesn't wait on Jolpica
+    warmup = asyncio.create_task(warm_career_cache()) if CAREER_WARMUP else None
+    watcher = asyncio.create_task(watch_sim_data(SIM_WATCH_INTERVAL_S)) if SIM_WATCH_INTERVAL_S > 0 else None
+    chat_warmup = asyncio.create_task(run_in_threadpool(chat_stack)) if CHAT_WARMUP else None
+    yield
+    for task in (warmup, watcher, chat_warmup):
+        if task and not task.done():
+            task.cancel()
+    await close_client()
+
+app = FastAPI(title="PolePosition AI", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,37 +86,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the latency includes CORS handling
+app.add_middleware(metrics.RouteMetrics)
+
+# Bounds how many chat turns run (and wait) at once across all sockets
+chat_admission = ChatAdmission()
 
-# Create orchestrator once at startup
-orchestrator = create_orchestrator()
+# Prediction payloads are encoded once per data snapshot version
+response_cache = ResponseCache(data_loader.sim_version)
 
 # ── REST ENDPOINTS ───────────────────────────────────────────────
 
 @app.get("/api/championship")
-async def championship():
-    return get_championship_standings()
+async def championship(request: Request, after_round: int | None = None):
+    """
+    Driver title probabilities. With ?after_round=N, rounds 1..N are fixed
+    to the actual results and only the remaining rounds are simulated.
+    """
+    if after_round is not None:
+        return await run_in_threadpool(get_championship_standings, after_round)
+    return response_cache.respond(request, ("championship",), get_championship_standings)
 
 @app.get("/api/constructors")
-async def constructors():
-    return get_constructors_standings()
+async def constructors(request: Request):
+    return response_cache.respond(request, ("constructors",), get_constructors_standings)
 
 @app.get("/api/drivers")
 async def drivers():
+    snap = data_loader.snapshot()
     return {"drivers": [
-        {"code": d, "name": DRIVER_NAMES.get(d, d), "team": TEAM_MAP.get(d, "")}
-        for d in DRIVERS
+        {"code": d, "name": snap.driver_names.get(d, d), "team": snap.team_map.get(d, "")}
+        for d in snap.drivers
     ]}
 
 @app.get("/api/driver/{driver_code}")
-async def driver(driver_code: str):
-    return get_driver_profile(driver_code)
+async def driver(request: Request, driver_code: str, after_round: int | None = None):
+    if after_round is not None:
+        return await run_in_threadpool(get_driver_profile, driver_code, after_round)
+    return response_cache.respond(request, ("driver", driver_code.upper()),
+                                  lambda: get_driver_profile(driver_code))
 
 @app.get("/api/driver/{driver_code}/career")
 async def driver_career(driver_code: str):
     """
     Returns career stats from Jolpica (wins, poles, podiums, etc.)
     combined with 2026 prediction data.
-    Results are cached in memory after first fetch.
+    Results are cached in memory and SQLite (see career_tools).
     """
     career = await get_career_stats(driver_code.upper())
     if not career:
@@ -65,38 +145,150 @@ async def driver_career(driver_code: str):
         "prediction": prediction,
     }
 
+@app.get("/api/careers")
+async def careers():
+    """
+    Career stats for every driver in one response, summed from the cached
+    per-season aggregates (so the Drivers page needs a single request).
+    """
+    return {"careers": [c for c in await get_all_career_stats() if c]}
+
 @app.get("/api/race/{race_name}")
-async def race(race_name: str):
-    return get_race_winner_probs(race_name)
+async def race(request: Request, race_name: str):
+    return response_cache.respond(request, ("race", race_name.strip().lower()),
+                                  lambda: get_race_winner_probs(race_name))
 
 @app.get("/api/races")
 async def races():
     return {"races": [
         {"round": rnd, "name": name}
-        for rnd, name in sorted(RACE_NAMES.items())
+        for rnd, name in sorted(data_loader.snapshot().race_names.items())
     ]}
 
+class SimulateRequest(BaseModel):
+    base_predictions       : dict[str, float | list[float]] | None = None
+    dnf_rate               : dict[str, float] | None = None
+    combined_pace_gap_s    : dict[str, float] | None = None
+    safety_car_probability : dict[str, float] | None = None
+    race                   : str | None = None
+    n_sims                 : int = DEFAULT_WHATIF_SIMS
+    seed                   : int = DEFAULT_SEED
+    sampling               : str = "plain"
+
+# Plain def — FastAPI runs it in the threadpool so the simulation
+# doesn't block the event loop
+@app.post("/api/simulate")
+def simulate(req: SimulateRequest):
+    """
+    What-if simulation: re-runs the season with overridden base predictions,
+    DNF rates, pace gaps or safety car probabilities (capped sim count).
+    """
+    return simulate_what_if(**req.model_dump())
+
+
+class QueryRequest(BaseModel):
+    event       : dict
+    given       : dict | None = None
+    after_round : int | None = None
+
+@app.post("/api/query")
+def query(req: QueryRequest):
+    """
+    P(event) or P(event | given) over every simulated season, e.g.
+    {"event": {"driver": "LEC", "champion": true},
+     "given": {"driver": "LEC", "race": "Monaco Grand Prix", "position": 1}}
+    """
+    return query_outcomes(**req.model_dump())
+
+# ── METRICS ──────────────────────────────────────────────────────
+
+@metrics.REGISTRY.collector
+def collect_counts():
+    """Cache, router and admission counts the other modules keep, copied at scrape time."""
+    for cache, stats in (("response", response_cache.snapshot()), ("answer", ANSWERS.snapshot())):
+        metrics.CACHE_REQUESTS.set_total(stats["hits"], cache, "hit")
+        metrics.CACHE_REQUESTS.set_total(stats["misses"], cache, "miss")
+    metrics.update_cache_ratios()
+
+    fast_path = FAST_PATH_STATS.snapshot()
+    for intent, n in fast_path["by_intent"].items():
+        metrics.CHAT_QUESTIONS.set_total(n, intent)
+    metrics.CHAT_QUESTIONS.set_total(fast_path["misses"], "fallback")
+    metrics.CHAT_ACTIVE.set(chat_admission.active)
+    metrics.CHAT_QUEUED.set(chat_admission.waiting)
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ── ADMIN ────────────────────────────────────────────────────────
+
+@app.post("/api/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: str | None = Header(default=None)):
+    """
+    Load the simulation store and features from disk and swap them in
+    without a restart — requests already running finish on the old data.
+    Needs ADMIN_TOKEN set and sent as X-Admin-Token.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404)
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        return await run_in_threadpool(data_loader.reload, force)
+    except Exception as e:
+        logger.exception("Simulation data reload failed")
+        return {"error": f"Reload failed: {e}", "version": data_loader.sim_version()}
+
 # ── WEBSOCKET CHAT ───────────────────────────────────────────────
 
+@app.get("/api/chat/stats")
+async def chat_stats():
+    """Fast-path router hit rate by intent, and answer cache hit rate."""
+    return {"fast_path": FAST_PATH_STATS.snapshot(), "answer_cache": ANSWERS.snapshot()}
+
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
+    """
+    One orchestrator (and conversation history) per connection. Each
+    question runs as its own task so the socket keeps listening: a
+    {"type": "cancel"} message or a disconnect stops the turn in flight.
+    """
     await websocket.accept()
+    orchestrator = (await run_in_threadpool(chat_stack))()
+    turn: asyncio.Task | None = None
+    metrics.WS_TOTAL.inc()
+    metrics.WS_ACTIVE.inc()
+
+    async def send(event: dict):
+        await websocket.send_text(json.dumps(event))
+
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data).get("message", "")
+            data = json.loads(await websocket.receive_text())
 
-            await websocket.send_text(json.dumps({"type": "thinking"}))
+            if data.get("type") == "cancel":
+                if turn and not turn.done():
+                    turn.cancel()
+                    await send({"type": "cancelled"})
+                continue
 
-            response = orchestrator(message)
+            if turn and not turn.done():
+                await send({"type": "error", "message": "Still answering the previous question"})
+                continue
 
-            await websocket.send_text(json.dumps({
-                "type"   : "response",
-                "message": str(response),
-            }))
+            turn = asyncio.create_task(
+                run_turn(orchestrator, data.get("message", ""), send, chat_admission)
+            )
 
     except WebSocketDisconnect:
         pass
+    finally:
+        metrics.WS_ACTIVE.dec()
+        if turn and not turn.done():
+            turn.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""
+metrics.py
+Prometheus metrics for the API, served as text at GET /metrics.
+
+Counters, gauges and histograms live in one process-wide registry; an
+update is a dict lookup and a couple of additions under a lock, cheap
+enough for every request. Values other modules already count (response
+and answer caches, fast-path router, chat admission) are read by collectors at
+scrape time instead, so they cost nothing per request.
+
+    http_request_duration_seconds{method,route,status}   every HTTP route
+    tool_call_duration_seconds{tool} / tool_calls_total   every tool call
+    llm_request_duration_seconds{agent} / llm_tokens_total  per agent
+    jolpica_request_duration_seconds / jolpica_responses_total{status}
+    cache_requests_total{cache,result}, cache_hit_ratio{cache}
+    chat_questions_total{route}, chat_turns_active / _queued
+    ws_sessions_active, ws_sessions_total
+
+Every worker process keeps its own registry, so scrape each worker.
+"""
+
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus client defaults, and a longer-tailed set for model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS     = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name   = name
+        self.help   = help
+        self.labels = tuple(labels)
+        self._lock  = threading.Lock()
+        self._values: dict = {}
+
+    def _key(self, values: tuple) -> tuple:
+        if len(values) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {values}")
+        return values
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += self._samples(items)
+        return lines
+
+    def _samples(self, items) -> list[str]:
+        return [f"{self.name}{_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, *labels):
+        """For collectors mirroring a count another module keeps."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def totals(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Per label set: a count per bucket (cumulated at render), the sum and the count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, items) -> list[str]:
+        lines = []
+        for key, (counts, total, n) in items:
+            running = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                running += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], None]):
+        """Run fn before every scrape — it copies state kept elsewhere into metrics."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labels))
+
+def gauge(name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labels))
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ── Shared metrics ───────────────────────────────────────────────
+HTTP_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency by route template.",
+                         ["method", "route", "status"])
+
+TOOL_SECONDS = histogram("tool_call_duration_seconds", "Tool call latency (REST and agent calls).", ["tool"])
+TOOL_CALLS   = counter("tool_calls_total", "Tool calls by outcome: ok, error (an error result) or exception.",
+                       ["tool", "outcome"])
+
+LLM_SECONDS  = histogram("llm_request_duration_seconds", "Model call latency per agent.", ["agent"],
+                         buckets=LLM_BUCKETS)
+LLM_CALLS    = counter("llm_requests_total", "Model calls per agent by outcome.", ["agent", "outcome"])
+LLM_TOKENS   = counter("llm_tokens_total", "Model tokens per agent.", ["agent", "type"])
+
+JOLPICA_SECONDS   = histogram("jolpica_request_duration_seconds", "Jolpica upstream request latency.")
+JOLPICA_RESPONSES = counter("jolpica_responses_total", "Jolpica responses by HTTP status (error = no response).",
+                            ["status"])
+
+CACHE_REQUESTS = counter("cache_requests_total", "Cache lookups by result.", ["cache", "result"])
+CACHE_RATIO    = gauge("cache_hit_ratio", "Hits over lookups since start.", ["cache"])
+
+WS_ACTIVE = gauge("ws_sessions_active", "Open chat WebSocket sessions.")
+WS_TOTAL  = counter("ws_sessions_total", "Chat WebSocket sessions opened.")
+
+CHAT_QUESTIONS = counter("chat_questions_total",
+                         "Chat questions by fast-path intent, or fallback when they went on to the LLM.", ["route"])
+CHAT_ACTIVE    = gauge("chat_turns_active", "Chat turns holding an admission slot.")
+CHAT_QUEUED    = gauge("chat_turns_queued", "Chat turns waiting for an admission slot.")
+
+
+def update_cache_ratios():
+    """cache_hit_ratio from cache_requests_total — anything but a miss was served from cache."""
+    lookups, misses = {}, {}
+    for (cache, result), n in CACHE_REQUESTS.totals().items():
+        lookups[cache] = lookups.get(cache, 0) + n
+        if result == "miss":
+            misses[cache] = misses.get(cache, 0) + n
+    for cache, n in lookups.items():
+        if n:
+            CACHE_RATIO.set(1 - misses.get(cache, 0) / n, cache)
+
+
+def timed_tool(fn):
+    """Time every call of a tool function and count its outcome. Works on async tools too."""
+    name = fn.__name__
+
+    def record(started: float, result, outcome: str | None = None):
+        TOOL_SECONDS.observe(time.perf_counter() - started, name)
+        if outcome is None:
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+        TOOL_CALLS.inc(name, outcome)
+
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                record(started, None, "exception")
+                raise
+            record(started, result)
+            return result
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            record(started, None, "exception")
+            raise
+        record(started, result)
+        return result
+    return wrapper
+
+
+class RouteMetrics:
+    """
+    ASGI middleware timing every HTTP request, labelled with the matched
+    route template (/api/driver/{driver_code}), so series stay bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            HTTP_SECONDS.observe(time.perf_counter() - started, scope["method"],
+                                 getattr(route, "path", "unmatched"), str(status))
@@ -0,0 +1,112 @@
+"""
+bench_sampling.py
+Estimator variance per second of compute for the engine's sampling modes.
+
+Each mode runs --replicates independent seasons of --sims sims (seeds 0..R-1).
+The spread of the replicate estimates gives the variance of every reported
+statistic — champion %, mean points, per-race win and podium %. The gain
+is plain's variance × time over the mode's, so 2.0 means plain sampling
+would need twice the compute for the same precision. The rms z column
+checks statistical equivalence: the gap between each statistic's mean
+estimate under the mode and under plain, in standard errors — about 1
+when both estimate the same thing.
+
+The last table is common random numbers: the variance of a what-if change
+(scenario minus baseline) when both runs share a seed, against
+independent seeds.
+
+    cd backend
+    python -m simulation.bench_sampling
+    python -m simulation.bench_sampling --replicates 40 --sims 8192
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from simulation.engine import SAMPLING_MODES, simulate_season
+from simulation.scenario import apply_overrides
+from tools.data_loader import snapshot
+
+# What-if used for the common random numbers comparison
+CRN_SCENARIO = {"dnf_rate": {"Ferrari": 0.05}}
+
+
+def estimates(sim: dict) -> dict:
+    """Every reported statistic of one run, flattened per family."""
+    pts = sim["sim_points"]
+    n, n_drivers = pts.shape
+    pos = sim["pos_distribution"]
+    return {
+        "champ_pct"    : np.bincount(np.argmax(pts, axis=1), minlength=n_drivers) / n * 100,
+        "avg_points"   : pts.mean(axis=0),
+        "race_win_pct" : (pos[:, :, 0] / n * 100).ravel(),
+        "podium_pct"   : (pos[:, :, :3].sum(axis=2) / n * 100).ravel(),
+    }
+
+
+def replicate(inputs: dict, sampling: str, n_sims: int, n_reps: int, seed0: int = 0) -> tuple[dict, float]:
+    """Stacked (n_reps, ...) estimates per family and the mean wall time per run."""
+    runs, elapsed = [], 0.0
+    for rep in range(n_reps):
+        started = time.perf_counter()
+        sim = simulate_season(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"],
+                              n_sims, seed=seed0 + rep, sampling=sampling)
+        elapsed += time.perf_counter() - started
+        runs.append(estimates(sim))
+    return {k: np.stack([r[k] for r in runs]) for k in runs[0]}, elapsed / n_reps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--replicates", type=int, default=24)
+    parser.add_argument("--sims", type=int, default=4096)
+    args = parser.parse_args()
+
+    snap = snapshot()
+    inputs = snap.sim_inputs()
+    # Warm-up: SciPy import and first-call allocations stay out of the timings
+    for mode in SAMPLING_MODES:
+        simulate_season(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"], 256, sampling=mode)
+
+    results = {mode: replicate(inputs, mode, args.sims, args.replicates) for mode in SAMPLING_MODES}
+    plain, t_plain = results["plain"]
+    # Statistics that vary at all under plain sampling (skips events no sim produced)
+    live = {k: plain[k].var(axis=0, ddof=1) > 0 for k in plain}
+
+    print(f"{args.replicates} replicates × {args.sims:,} sims\n")
+    print(f"{'mode':>11} {'time/run':>9}   " + "  ".join(f"{k:>14}" for k in plain) + f"  {'rms z':>6}")
+    for mode, (est, t) in results.items():
+        gains, zs = [], []
+        for k in plain:
+            var_p = plain[k].var(axis=0, ddof=1)[live[k]]
+            var_m = est[k].var(axis=0, ddof=1)[live[k]]
+            gains.append(np.median(var_p * t_plain / np.maximum(var_m * t, 1e-300)))
+            se = np.sqrt((var_p + var_m) / args.replicates)
+            zs.append((est[k].mean(0) - plain[k].mean(0))[live[k]] / se)
+        rms_z = float(np.sqrt(np.mean(np.square(np.concatenate(zs))))) if mode != "plain" else 0.0
+        print(f"{mode:>11} {t * 1e3:>7.0f}ms   " + "  ".join(f"{g:>13.2f}×" for g in gains) + f"  {rms_z:>6.2f}")
+    print("\n(median variance-per-second gain over each family's statistics; plain = 1)")
+
+    # ── Common random numbers ───────────────────────────────────
+    scenario, _ = apply_overrides(inputs, snap.drivers, snap.rounds, snap.race_names, snap.team_map,
+                                  **CRN_SCENARIO)
+    base, _ = replicate(inputs, "plain", args.sims, args.replicates)
+    same, _ = replicate(scenario, "plain", args.sims, args.replicates)
+    indep, _ = replicate(scenario, "plain", args.sims, args.replicates, seed0=10_000)
+
+    print(f"\nWhat-if {CRN_SCENARIO} — variance of the change, independent seeds ÷ shared seed")
+    for k in ("champ_pct", "avg_points"):
+        var_crn = (same[k] - base[k]).var(axis=0, ddof=1)
+        var_ind = (indep[k] - base[k]).var(axis=0, ddof=1)
+        moved = var_crn > 0
+        ratio = np.full(len(snap.drivers), np.nan)
+        ratio[moved] = var_ind[moved] / var_crn[moved]
+        top = int(np.argmax(np.abs(same[k].mean(0) - base[k].mean(0))))
+        print(f"  {k:<11} median {np.nanmedian(ratio):>6.1f}×   "
+              f"most affected ({snap.drivers[top]}): {ratio[top]:.1f}×")
+
+
+if __name__ == "__main__":
+    main()
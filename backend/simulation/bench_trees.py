@@ -0,0 +1,101 @@
+"""
+bench_trees.py
+Parity and timing for simulation.trees against LGBMRegressor.predict.
+
+Parity runs on the training rows, on random rows spread over (and past)
+each feature's training range, and on the same rows with a tenth of the
+values set to NaN. Timings cover batch sizes 1 to 10^6 rows: both
+evaluators on a DataFrame (as build_base_predictions calls them), and the
+NumPy one on a plain array too.
+
+    cd backend
+    python -m simulation.bench_trees                                  # models/lgbm_regressor.pkl
+    python -m simulation.bench_trees --sizes 1 100 10000 1000000
+"""
+
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from simulation import trees
+from tools import raw_store
+
+MODELS_DIR = raw_store.DATA_DIR.parent / "models"
+
+# Notebook 04's documented Optuna result — used when no model has been saved yet
+FALLBACK_PARAMS = {'n_estimators': 457, 'learning_rate': 0.125, 'max_depth': 10, 'num_leaves': 22}
+
+
+def _model():
+    path = MODELS_DIR / "lgbm_regressor.pkl"
+    if path.exists():
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        with open(MODELS_DIR / "feature_cols.pkl", "rb") as f:
+            return model, pickle.load(f), path.name
+    from training import search
+    df = raw_store.read_frame(raw_store.DATA_DIR / "master_features_all.csv")
+    model, feature_cols = search.fit_final(df, FALLBACK_PARAMS)
+    return model, feature_cols, f"fresh fit {FALLBACK_PARAMS}"
+
+
+def parity_rows(feature_cols, n: int = 20_000, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    df = raw_store.read_frame(raw_store.DATA_DIR / "master_features_all.csv")
+    train = df.reindex(columns=feature_cols).astype(np.float64)
+    lo, hi = train.min().to_numpy(), train.max().to_numpy()
+    span = np.where(hi > lo, hi - lo, 1.0)
+    wide = pd.DataFrame(rng.uniform(lo - 0.2 * span, hi + 0.2 * span, (n, len(feature_cols))), columns=feature_cols)
+    holes = wide.mask(rng.random(wide.shape) < 0.1)
+    return {"training rows": train, "random rows": wide, "random + NaN": holes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", nargs="*", type=int, default=[1, 10, 100, 1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    model, feature_cols, source = _model()
+    started = time.perf_counter()
+    ensemble = trees.export(model, feature_cols)
+    print(f"Model: {source} — {ensemble.n_trees} trees, {len(ensemble.value)} nodes, depth ≤ {ensemble.max_depth}, "
+          f"exported in {time.perf_counter() - started:.2f}s")
+
+    worst = 0.0
+    for label, rows in parity_rows(feature_cols).items():
+        diff = float(np.max(np.abs(model.predict(rows) - ensemble.predict(rows))))
+        worst = max(worst, diff)
+        print(f"Parity on {label:<14} ({len(rows):>6} rows): max abs difference {diff:.2e}")
+    assert worst < 1e-9, "tree evaluator disagrees with LightGBM"
+
+    rng = np.random.default_rng(1)
+    base = parity_rows(feature_cols)["random rows"]
+    print(f"\n{'rows':>9} {'lightgbm':>10} {'numpy':>10} {'speed-up':>9} {'ndarray in':>11}")
+    for n in args.sizes:
+        X = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        repeat = max(1, min(200, 20_000 // n))
+        t_lgb = _best(lambda: model.predict(X), repeat)
+        t_np  = _best(lambda: ensemble.predict(X), repeat)
+        arr = X.to_numpy()
+        t_arr = _best(lambda: ensemble.predict(arr), repeat)
+        print(f"{n:>9} {_ms(t_lgb):>10} {_ms(t_np):>10} {t_lgb / t_np:>8.1f}× {_ms(t_arr):>11}")
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1e3:.3f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+if __name__ == "__main__":
+    main()
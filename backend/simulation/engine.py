@@ -0,0 +1,336 @@
+"""
+engine.py
+Vectorised Monte Carlo season engine.
+
+Replaces the sims × rounds Python loop from 04_model_training.ipynb with
+batched NumPy: one noise tensor per chunk of simulations over
+(sims, rounds, drivers), one argsort over the driver axis, a points lookup
+table and bincount histogramming. Chunks keep memory bounded. Draws come
+from fixed streams of STREAM_SIZE sims, each with its own generator spawned
+from a single SeedSequence, so a fixed seed reproduces the outputs bit for
+bit whatever the chunk size.
+
+Sampling modes (all draw the same per-(sim, round, driver) normal noise and
+uniform retirement draw, so every output keeps its meaning):
+  plain      — independent draws (the default; bit-identical to earlier runs)
+  antithetic — the second half of each chunk mirrors the first (z → -z,
+               u → 1 - u), which cancels much of the noise in smooth
+               statistics such as mean points
+  sobol      — one scrambled Sobol point per sim over every (round, driver)
+               draw, mapped through the normal inverse CDF; each stream is an
+               independent scramble (needs SciPy)
+Common random numbers need no mode of their own: two runs with the same
+seed and mode share every draw, so a scenario compared with
+its baseline differs only through the inputs (see tools/whatif_tools.py).
+"""
+
+import warnings
+
+import numpy as np
+
+# ── MODEL CONSTANTS (match 04_model_training.ipynb) ───────────
+MODEL_MAE    = 0.632   # CV MAE — base noise scale per race
+SC_NOISE     = 2.0     # extra noise per unit of safety car probability
+DNF_PENALTY  = 15      # positions added to a driver who retires
+N_POSITIONS  = 20      # classified positions tracked per race
+
+POINTS_MAP = {1:25, 2:18, 3:15, 4:12, 5:10, 6:8, 7:6, 8:4, 9:2, 10:1}
+
+# Points lookup table indexed by finishing position - 1
+POINTS_TABLE = np.array(
+    [POINTS_MAP.get(pos, 0) for pos in range(1, N_POSITIONS + 1)],
+    dtype=np.float64,
+)
+N_SCORING = int(np.count_nonzero(POINTS_TABLE))
+
+DEFAULT_SEED       = 42
+DEFAULT_CHUNK_SIZE = 4096   # sims per chunk — ~20 MB of noise at 24 × 22
+STREAM_SIZE        = 4096   # sims per random stream — fixed, so chunking never changes the draws
+SAMPLING_MODES     = ("plain", "antithetic", "sobol")
+
+
+def noise_scales(sc_probs) -> np.ndarray:
+    """Per-round noise standard deviation, scaled by safety car probability."""
+    return MODEL_MAE + np.asarray(sc_probs, dtype=np.float64) * SC_NOISE
+
+
+def chunk_sizes(n_sims: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[int]:
+    """Split n_sims into consecutive chunks of at most chunk_size."""
+    full, rest = divmod(n_sims, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def chunk_generators(seed, n_chunks: int) -> list[np.random.Generator]:
+    """One independent generator per chunk, spawned from a single SeedSequence."""
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in root.spawn(n_chunks)]
+
+
+def chunk_draws(seed, n_sims: int, shape: tuple, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                sampling: str = "plain"):
+    """
+    Yield (noise, uniforms) for consecutive chunks of chunk_size sims, each
+    (size, *shape). Sims are drawn STREAM_SIZE at a time, stream k from
+    generator k, and handed out in sim order — a sim gets the same draws
+    whichever chunk it lands in.
+    """
+    sizes   = chunk_sizes(n_sims, STREAM_SIZE)
+    streams = zip(chunk_generators(seed, len(sizes)), sizes)
+    z = u = np.empty((0, *shape))   # undelivered rest of the current stream
+    for size in chunk_sizes(n_sims, chunk_size):
+        zs, us = [], []
+        while size:
+            if not len(z):
+                rng, stream_size = next(streams)
+                z, u = draw_noise(rng, (stream_size, *shape), sampling)
+            k = min(size, len(z))
+            zs.append(z[:k])
+            us.append(u[:k])
+            z, u, size = z[k:], u[k:], size - k
+        yield (zs[0], us[0]) if len(zs) == 1 else (np.concatenate(zs), np.concatenate(us))
+
+
+def check_sampling(sampling: str) -> str:
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling '{sampling}' — use one of {SAMPLING_MODES}")
+    return sampling
+
+
+def draw_noise(rng: np.random.Generator, shape: tuple,
+               sampling: str = "plain") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Standard normal noise and retirement uniforms (both float64), of shape
+    (n_sims, n_rounds, n_drivers), drawn with the given mode.
+    """
+    n_sims = shape[0]
+    if sampling == "plain":
+        return rng.standard_normal(shape), rng.random(shape)
+
+    if sampling == "antithetic":
+        half = (n_sims + 1) // 2
+        z = rng.standard_normal((half, *shape[1:]))
+        u = rng.random((half, *shape[1:]))
+        return np.concatenate([z, -z])[:n_sims], np.concatenate([u, 1 - u])[:n_sims]
+
+    check_sampling(sampling)
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+
+    dims = int(np.prod(shape[1:]))
+    sobol = qmc.Sobol(d=2 * dims, scramble=True, seed=rng)
+    with warnings.catch_warnings():
+        # Chunks are powers of two except the last; its points are still valid
+        warnings.filterwarnings("ignore", message=".*balance properties.*")
+        points = sobol.random(n_sims)
+    eps = np.finfo(np.float64).eps
+    z = ndtri(np.clip(points[:, :dims], eps, 1 - eps)).reshape(shape)
+    u = points[:, dims:].reshape(shape)
+    return z, u
+
+
+def simulate_chunk(rng: np.random.Generator, base_preds: np.ndarray,
+                   scales: np.ndarray, dnf_rates: np.ndarray, n_sims: int,
+                   keep_positions: bool = False, sampling: str = "plain") -> dict:
+    """Simulate n_sims seasons in one batch, drawing their noise from rng (see simulate_draws)."""
+    noise, uniforms = draw_noise(rng, (n_sims, *base_preds.shape), sampling)
+    return simulate_draws(noise, uniforms, base_preds, scales, dnf_rates, keep_positions)
+
+
+def simulate_draws(noise: np.ndarray, uniforms: np.ndarray, base_preds: np.ndarray,
+                   scales: np.ndarray, dnf_rates: np.ndarray, keep_positions: bool = False) -> dict:
+    """
+    Simulate one batch of seasons from drawn standard normal noise and
+    retirement uniforms, both (n_sims, n_rounds, n_drivers); noise is
+    scaled in place.
+    base_preds is (n_rounds, n_drivers) predicted finish position,
+    scales is (n_rounds,) noise std, dnf_rates is (n_drivers,).
+    Returns partial sim_points, sim_wins and pos_distribution, plus every
+    finishing position as (n_sims, n_rounds, n_drivers) uint8 with
+    keep_positions.
+    """
+    n_sims = len(noise)
+    n_rounds, n_drivers = base_preds.shape
+    n_pos = min(N_POSITIONS, n_drivers)
+
+    noise *= scales[None, :, None]
+    dnf   = uniforms < dnf_rates[None, None, :]
+
+    preds  = noise
+    preds += base_preds[None, :, :]
+    preds += dnf * DNF_PENALTY
+
+    # Driver index at each classified position: (sims, rounds, n_pos)
+    order  = np.argsort(preds, axis=-1)
+    ranked = order[..., :n_pos]
+
+    # Season points — only the scoring positions need accumulating
+    flat  = ranked[..., :N_SCORING] + 0
+    flat += (np.arange(n_sims) * n_drivers)[:, None, None]
+    pts   = np.broadcast_to(POINTS_TABLE[:N_SCORING], flat.shape)
+    sim_points = np.bincount(
+        flat.ravel(), weights=pts.ravel(), minlength=n_sims * n_drivers,
+    ).reshape(n_sims, n_drivers)
+
+    # Position histogram — flat index over (driver, round, position)
+    flat  = ranked * (n_rounds * N_POSITIONS)
+    flat += (np.arange(n_rounds)[:, None] * N_POSITIONS + np.arange(n_pos)[None, :])[None]
+    pos_distribution = np.bincount(
+        flat.ravel(), minlength=n_drivers * n_rounds * N_POSITIONS
+    ).reshape(n_drivers, n_rounds, N_POSITIONS).astype(np.int32)
+
+    sim_wins = np.bincount(ranked[..., 0].ravel(), minlength=n_drivers).astype(np.float64)
+
+    part = {
+        "sim_points"       : sim_points,
+        "sim_wins"         : sim_wins,
+        "pos_distribution" : pos_distribution,
+    }
+    if keep_positions:
+        part["positions"] = finishing_positions(order)
+    return part
+
+
+def finishing_positions(order: np.ndarray) -> np.ndarray:
+    """Inverse of a (..., n_drivers) finishing order: 1-based position per driver, uint8."""
+    positions = np.empty(order.shape, dtype=np.uint8)
+    ranks = np.arange(1, order.shape[-1] + 1, dtype=np.uint8)
+    np.put_along_axis(positions, order, np.broadcast_to(ranks, order.shape), axis=-1)
+    return positions
+
+
+def simulate_season(base_preds, sc_probs, dnf_rates, n_sims: int,
+                    seed=DEFAULT_SEED, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    keep_positions: bool = False, sampling: str = "plain") -> dict:
+    """
+    Run n_sims Monte Carlo seasons in memory-bounded chunks. The output
+    depends on the seed and sampling, not on chunk_size.
+
+    base_preds : (n_rounds, n_drivers) model-predicted finish positions
+    sc_probs   : (n_rounds,) safety car probability per round
+    dnf_rates  : (n_drivers,) per-race retirement probability
+
+    Returns sim_points (n_sims, n_drivers), sim_wins (n_drivers,) and
+    pos_distribution (n_drivers, n_rounds, 20) — the sim_data.pkl arrays —
+    plus positions (n_sims, n_rounds, n_drivers) uint8 with keep_positions
+    (~5 MB at 10k sims; the other arrays are unchanged). sampling is one
+    of SAMPLING_MODES.
+    """
+    check_sampling(sampling)
+    base_preds = np.asarray(base_preds, dtype=np.float64)
+    dnf_rates  = np.asarray(dnf_rates, dtype=np.float64)
+    scales     = noise_scales(sc_probs)
+    n_rounds, n_drivers = base_preds.shape
+
+    sim_points       = np.zeros((n_sims, n_drivers))
+    sim_wins         = np.zeros(n_drivers)
+    pos_distribution = np.zeros((n_drivers, n_rounds, N_POSITIONS), dtype=np.int32)
+    positions        = np.empty((n_sims, n_rounds, n_drivers), dtype=np.uint8) if keep_positions else None
+
+    start = 0
+    for noise, uniforms in chunk_draws(seed, n_sims, (n_rounds, n_drivers), chunk_size, sampling):
+        part = simulate_draws(noise, uniforms, base_preds, scales, dnf_rates, keep_positions)
+        size = len(noise)
+        sim_points[start:start + size] = part["sim_points"]
+        sim_wins         += part["sim_wins"]
+        pos_distribution += part["pos_distribution"]
+        if keep_positions:
+            positions[start:start + size] = part["positions"]
+        start += size
+
+    result = {
+        "sim_points"       : sim_points,
+        "sim_wins"         : sim_wins,
+        "pos_distribution" : pos_distribution,
+    }
+    if keep_positions:
+        result["positions"] = positions
+    return result
+
+
+def simulate_conditioned(base_preds, sc_probs, dnf_rates, n_sims: int,
+                         completed_positions, seed=DEFAULT_SEED,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         keep_positions: bool = False, sampling: str = "plain") -> dict:
+    """
+    Season Monte Carlo conditioned on rounds already run.
+
+    completed_positions : (n_done, n_drivers) actual finishing position for the
+                          first n_done rounds, 0 where a driver didn't start
+
+    Completed rounds contribute fixed points, wins and position counts in
+    every sim; only rounds n_done+1.. are simulated, so the cost scales with
+    the rounds left. Returns the same arrays as simulate_season (positions
+    repeat the actual results, 0 included, in the completed rounds).
+    """
+    base_preds = np.asarray(base_preds, dtype=np.float64)
+    sc_probs   = np.asarray(sc_probs, dtype=np.float64)
+    done       = np.asarray(completed_positions, dtype=np.int64).reshape(-1, base_preds.shape[1])
+    n_done     = len(done)
+    n_rounds, n_drivers = base_preds.shape
+
+    if n_done < n_rounds:
+        rest = simulate_season(base_preds[n_done:], sc_probs[n_done:], dnf_rates, n_sims,
+                               seed=seed, chunk_size=chunk_size, keep_positions=keep_positions,
+                               sampling=sampling)
+    else:
+        rest = {
+            "sim_points"       : np.zeros((n_sims, n_drivers)),
+            "sim_wins"         : np.zeros(n_drivers),
+            "pos_distribution" : np.zeros((n_drivers, 0, N_POSITIONS), dtype=np.int32),
+            "positions"        : np.zeros((n_sims, 0, n_drivers), dtype=np.uint8),
+        }
+
+    # Fixed contribution of the completed rounds
+    classified = (done >= 1) & (done <= N_POSITIONS)
+    actual_pts = np.where(classified, POINTS_TABLE[np.clip(done, 1, N_POSITIONS) - 1], 0.0).sum(axis=0)
+    actual_wins = (done == 1).sum(axis=0).astype(np.float64)
+
+    done_dist = np.zeros((n_drivers, n_done, N_POSITIONS), dtype=np.int32)
+    d_idx, r_idx = np.nonzero(classified.T)
+    done_dist[d_idx, r_idx, done.T[d_idx, r_idx] - 1] = n_sims
+
+    result = {
+        "sim_points"       : rest["sim_points"] + actual_pts[None, :],
+        "sim_wins"         : rest["sim_wins"] + actual_wins * n_sims,
+        "pos_distribution" : np.concatenate([done_dist, rest["pos_distribution"]], axis=1),
+    }
+    if keep_positions:
+        done_pos = np.broadcast_to(done.astype(np.uint8), (n_sims, n_done, n_drivers))
+        result["positions"] = np.concatenate([done_pos, rest["positions"]], axis=1)
+    return result
+
+
+def build_base_predictions(model, df_pred, df_calendar, feature_cols) -> np.ndarray:
+    """
+    Model-predicted finish position for every driver at every round, ONCE.
+    Mirrors the 2026 feature mapping from 04_model_training.ipynb.
+    model is the LGBMRegressor or its simulation.trees export; every
+    (round, driver) row is scored in a single predict call.
+    Returns (n_rounds, n_drivers) ordered by df_calendar round.
+    """
+    sc_probs = df_calendar.sort_values("round")["safety_car_probability"].to_numpy()
+    n_rounds, n_drivers = len(sc_probs), len(df_pred)
+
+    race_df = df_pred.iloc[np.tile(np.arange(n_drivers), n_rounds)].reset_index(drop=True)
+    race_df["safety_car_probability"]       = np.repeat(sc_probs, n_drivers)
+    race_df["grid_position"]                = 1 + (race_df["combined_pace_gap_s"] / 0.3)
+    race_df["quali_position"]               = race_df["grid_position"]
+    race_df["rolling_avg_quali_5"]          = race_df["grid_position"]
+    race_df["rolling_avg_finish_5"]         = race_df["grid_position"]
+    race_df["constructor_rolling_points_5"] = race_df["team_reliability_score"] * 100
+    return np.asarray(model.predict(race_df[feature_cols])).reshape(n_rounds, n_drivers)
+
+
+def build_sim_data(drivers, rounds, race_names, result: dict, n_sims: int) -> dict:
+    """Package engine output in the sim_data.pkl structure data_loader expects."""
+    return {
+        "drivers"          : list(drivers),
+        "rounds"           : list(rounds),
+        "race_names"       : dict(race_names),
+        "pos_distribution" : result["pos_distribution"],   # (n_drivers, n_rounds, 20)
+        "sim_points"       : result["sim_points"],         # (N_SIMULATIONS, n_drivers)
+        "sim_wins"         : result["sim_wins"],
+        "N_SIMULATIONS"    : n_sims,
+    } | {key: result[key] for key in ("positions",          # (N_SIMULATIONS, n_rounds, n_drivers) uint8
+                                      "precision")         # run_adaptive's stopping report
+         if key in result}
@@ -0,0 +1,213 @@
+"""
+outcomes.py
+Conditional and joint queries over every simulated finishing order.
+
+The engine's positions tensor — (n_sims, n_rounds, n_drivers) uint8, 1-based,
+0 where a driver didn't start — keeps the full result of every sim, so any
+event over races and the final standings is a boolean mask over sims and
+P(A | B) is a pair of counts. An event is a small JSON structure:
+
+    {"driver": "LEC", "race": "Monaco Grand Prix", "position": 1}   wins Monaco
+    {"driver": "NOR", "race": 9, "top": 3}                          podium in round 9
+    {"driver": "PIA", "ahead_of": "NOR", "races": ["British Grand Prix",
+                                                   "Belgian Grand Prix"]}
+    {"driver": "PIA", "ahead_of": "NOR"}                            final standings
+    {"driver": "LEC", "top": 3}                                     top 3 in the championship
+    {"driver": "VER", "champion": true}
+    {"all": [...]}, {"any": [...]}, {"not": {...}}
+
+A race is a full GP name, a unique part of one ("Monaco") or a round
+number; "races" requires the condition in every race listed. Without a
+race the condition applies to the final championship order (points, ties
+going to the earlier driver — the same rule as np.argmax in the summary).
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+from simulation.engine import POINTS_TABLE, finishing_positions
+
+MAX_TERMS  = 64        # conditions per query — bounds the work one request can ask for
+CHUNK_SIMS = 16384     # sims per block when points are rebuilt from positions
+
+# Points by finishing position byte: 0 (didn't start) and P11+ score nothing
+_POINTS_BY_POS = np.zeros(256)
+_POINTS_BY_POS[1:len(POINTS_TABLE) + 1] = POINTS_TABLE
+
+_DNS = np.uint8(255)   # sorts a non-starter behind every classified driver
+
+
+class Outcomes:
+    """
+    Query engine over one positions tensor. sim_points, when given, must
+    come from the same run (the sim store keeps both); otherwise it is
+    rebuilt from positions on first use.
+    """
+
+    def __init__(self, positions: np.ndarray, drivers, rounds, race_names: dict,
+                 sim_points: np.ndarray | None = None, resolve_driver=None):
+        self.positions  = positions
+        self.drivers    = list(drivers)
+        self.rounds     = list(rounds)
+        self.race_names = dict(race_names)
+        self.n_sims     = positions.shape[0]
+        if positions.shape[1:] != (len(self.rounds), len(self.drivers)):
+            raise ValueError(f"positions shape {positions.shape} does not match "
+                             f"{len(self.rounds)} rounds × {len(self.drivers)} drivers")
+        if sim_points is not None:
+            self.__dict__["sim_points"] = sim_points
+        self._resolve_driver = resolve_driver
+        self._driver_index   = {d: i for i, d in enumerate(self.drivers)}
+        self._round_index    = {r: i for i, r in enumerate(self.rounds)}
+
+    # ── Season totals ────────────────────────────────────────────
+    @cached_property
+    def sim_points(self) -> np.ndarray:
+        """(n_sims, n_drivers) season points, summed from positions in blocks."""
+        points = np.empty((self.n_sims, len(self.drivers)))
+        for start in range(0, self.n_sims, CHUNK_SIMS):
+            block = self.positions[start:start + CHUNK_SIMS]
+            points[start:start + len(block)] = _POINTS_BY_POS[block].sum(axis=1)
+        return points
+
+    @cached_property
+    def standings(self) -> np.ndarray:
+        """(n_sims, n_drivers) final championship position, uint8, 1 = champion."""
+        order = np.argsort(-np.asarray(self.sim_points), axis=1, kind="stable")
+        return finishing_positions(order)
+
+    # ── Queries ──────────────────────────────────────────────────
+    def probability(self, event: dict, given: dict | None = None) -> dict:
+        """
+        P(event), or P(event | given) with given. Counts are over sims;
+        std_error is the binomial standard error of the estimate.
+        Raises ValueError for a malformed event or one given never holds.
+        """
+        budget = [MAX_TERMS]
+        hit, text = self._evaluate(event, budget)
+        result = {"event": text, "n_sims": self.n_sims}
+
+        if given is None:
+            matches, base = int(np.count_nonzero(hit)), self.n_sims
+        else:
+            cond, cond_text = self._evaluate(given, budget)
+            base = int(np.count_nonzero(cond))
+            if base == 0:
+                raise ValueError(f"'{cond_text}' never happens in {self.n_sims} simulations")
+            matches = int(np.count_nonzero(hit & cond))
+            result.update({
+                "given"                    : cond_text,
+                "given_matches"            : base,
+                "given_probability"        : base / self.n_sims,
+                "unconditional_probability": float(np.count_nonzero(hit)) / self.n_sims,
+            })
+
+        p = matches / base
+        result.update({
+            "matches"     : matches,
+            "probability" : p,
+            "std_error"   : float(np.sqrt(p * (1 - p) / base)),
+        })
+        return result
+
+    def mask(self, event: dict) -> np.ndarray:
+        """Boolean (n_sims,) — the sims in which event happens."""
+        return self._evaluate(event, [MAX_TERMS])[0]
+
+    # ── Evaluation ───────────────────────────────────────────────
+    def _evaluate(self, event, budget: list) -> tuple[np.ndarray, str]:
+        if not isinstance(event, dict) or not event:
+            raise ValueError(f"Event must be a non-empty object, got {event!r}")
+
+        for op in ("all", "any"):
+            if op in event:
+                parts = event[op]
+                if not isinstance(parts, list) or not parts:
+                    raise ValueError(f"'{op}' takes a non-empty list of events")
+                evaluated = [self._evaluate(part, budget) for part in parts]
+                combine = np.logical_and if op == "all" else np.logical_or
+                hit = combine.reduce([m for m, _ in evaluated])
+                joiner = " and " if op == "all" else " or "
+                return hit, "(" + joiner.join(t for _, t in evaluated) + ")"
+
+        if "not" in event:
+            hit, text = self._evaluate(event["not"], budget)
+            return ~hit, f"not {text}"
+
+        races = event.get("races", [event["race"]] if "race" in event else [])
+        if not isinstance(races, list):
+            raise ValueError("'races' takes a list of races")
+        if not races:
+            return self._condition(event, None, budget)
+        evaluated = [self._condition(event, race, budget) for race in races]
+        hit = np.logical_and.reduce([m for m, _ in evaluated])
+        return hit, " and ".join(t for _, t in evaluated)
+
+    def _condition(self, event: dict, race, budget: list) -> tuple[np.ndarray, str]:
+        budget[0] -= 1
+        if budget[0] < 0:
+            raise ValueError(f"Query has more than {MAX_TERMS} conditions")
+
+        d = self._driver(event.get("driver"))
+        code = self.drivers[d]
+        if race is None:
+            where, pos = "in the championship", self.standings[:, d]
+        else:
+            r, name = self._race(race)
+            where, pos = f"at {name}", self.positions[:, r, d]
+
+        if event.get("champion"):
+            if race is not None:
+                raise ValueError("'champion' applies to the season, not a race")
+            return pos == 1, f"{code} champion"
+        if "position" in event:
+            k = _int(event, "position")
+            return pos == k, f"{code} P{k} {where}"
+        if "top" in event:
+            k = _int(event, "top")
+            return (pos >= 1) & (pos <= k), f"{code} top {k} {where}"
+        if "ahead_of" in event:
+            o = self._driver(event["ahead_of"])
+            if race is None:
+                other = self.standings[:, o]
+            else:
+                other = self.positions[:, r, o]
+                pos, other = _started(pos), _started(other)
+            return pos < other, f"{code} ahead of {self.drivers[o]} {where}"
+        raise ValueError("Condition needs one of 'position', 'top', 'ahead_of' or 'champion'")
+
+    def _driver(self, query) -> int:
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Each condition needs a 'driver'")
+        code = query.upper().strip()
+        if code not in self._driver_index and self._resolve_driver:
+            code = self._resolve_driver(query)
+        if code not in self._driver_index:
+            raise ValueError(f"Driver '{query}' not found")
+        return self._driver_index[code]
+
+    def _race(self, query) -> tuple[int, str]:
+        if isinstance(query, int) and not isinstance(query, bool):
+            if query in self._round_index:
+                return self._round_index[query], self.race_names[query]
+            raise ValueError(f"No round {query} — rounds are {self.rounds[0]}–{self.rounds[-1]}")
+        if isinstance(query, str) and query.strip():
+            q = query.strip().lower()
+            exact = [rnd for rnd, name in self.race_names.items() if name.lower() == q]
+            partial = exact or [rnd for rnd, name in self.race_names.items() if q in name.lower()]
+            if len(partial) == 1:
+                rnd = partial[0]
+                return self._round_index[rnd], self.race_names[rnd]
+        raise ValueError(f"Race '{query}' not found")
+
+
+def _int(event: dict, key: str) -> int:
+    value = event[key]
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"'{key}' must be a positive integer, got {value!r}")
+    return value
+
+
+def _started(pos: np.ndarray) -> np.ndarray:
+    return np.where(pos == 0, _DNS, pos)
@@ -0,0 +1,301 @@
+"""
+parallel.py
+Multi-core sharded runner for the season Monte Carlo.
+
+N simulations are split into fixed-size shards. Shard k always draws from
+child k of one SeedSequence and covers the same slice of sim_points, so the
+merged output depends only on (seed, shard_size) — never on how many worker
+processes ran it. With shard_size = engine.STREAM_SIZE (the default) it
+is also identical to engine.simulate_season at any chunk_size.
+
+run_adaptive draws the same shards and checks its stopping rule after
+each one, in shard order, until every reported statistic's confidence
+interval is inside its tolerance (or max_sims is reached). Where it stops
+depends only on (seed, shard_size), and a run that stopped at n sims is
+identical to run_parallel(n).
+"""
+
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from simulation.engine import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_SEED, N_POSITIONS,
+    build_sim_data, check_sampling, chunk_sizes, noise_scales, simulate_chunk,
+)
+from simulation.summary import DEFAULT_CONFIDENCE, interval_arrays, z_value
+
+# ± half-width targets for run_adaptive — percentage points, and points for the mean
+DEFAULT_TOLERANCES = {
+    "champ_pct"    : 0.5,
+    "race_win_pct" : 0.5,
+    "podium_pct"   : 0.5,
+    "avg_points"   : 1.0,
+}
+DEFAULT_MAX_SIMS = 200_000
+
+# Antithetic and Sobol sims aren't independent within a shard, so their
+# intervals are rescaled by the variance the per-shard estimates show
+MIN_REPLICATES = 4
+
+# ── WORKER STATE ──────────────────────────────────────────────
+# Inputs are sent once per worker via the pool initializer, not per shard
+_inputs: dict = {}
+
+def _init_worker(base_preds, scales, dnf_rates, keep_positions=False, sampling="plain"):
+    _inputs["base_preds"]     = base_preds
+    _inputs["scales"]         = scales
+    _inputs["dnf_rates"]      = dnf_rates
+    _inputs["keep_positions"] = keep_positions
+    _inputs["sampling"]       = sampling
+
+def _run_shard(task) -> tuple[int, dict]:
+    shard_idx, size, seed_seq = task
+    rng = np.random.default_rng(seed_seq)
+    part = simulate_chunk(rng, _inputs["base_preds"], _inputs["scales"],
+                          _inputs["dnf_rates"], size, _inputs["keep_positions"], _inputs["sampling"])
+    return shard_idx, part
+
+
+def shard_tasks(n_sims: int, seed=DEFAULT_SEED,
+                shard_size: int = DEFAULT_CHUNK_SIZE) -> list[tuple]:
+    """(shard_idx, size, SeedSequence) for every shard, in sim order."""
+    sizes = chunk_sizes(n_sims, shard_size)
+    root  = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [(k, size, child) for k, (size, child) in enumerate(zip(sizes, root.spawn(len(sizes))))]
+
+
+def run_parallel(base_preds, sc_probs, dnf_rates, n_sims: int,
+                 seed=DEFAULT_SEED, shard_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: int | None = None, keep_positions: bool = False,
+                 sampling: str = "plain") -> dict:
+    """
+    Run n_sims seasons across a process pool and merge the partial results.
+    workers defaults to every core; workers=1 runs in-process.
+    Returns sim_points, sim_wins and pos_distribution, plus the uint8
+    positions tensor with keep_positions.
+    """
+    check_sampling(sampling)
+    base_preds = np.asarray(base_preds, dtype=np.float64)
+    dnf_rates  = np.asarray(dnf_rates, dtype=np.float64)
+    scales     = noise_scales(sc_probs)
+    n_rounds, n_drivers = base_preds.shape
+
+    tasks   = shard_tasks(n_sims, seed, shard_size)
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    starts  = np.cumsum([0] + [size for _, size, _ in tasks])
+
+    sim_points       = np.zeros((n_sims, n_drivers))
+    sim_wins         = np.zeros(n_drivers)
+    pos_distribution = np.zeros((n_drivers, n_rounds, N_POSITIONS), dtype=np.int32)
+    positions        = np.empty((n_sims, n_rounds, n_drivers), dtype=np.uint8) if keep_positions else None
+
+    def merge(shard_idx, part):
+        nonlocal sim_wins, pos_distribution
+        start = starts[shard_idx]
+        sim_points[start:start + len(part["sim_points"])] = part["sim_points"]
+        sim_wins         += part["sim_wins"]
+        pos_distribution += part["pos_distribution"]
+        if keep_positions:
+            positions[start:start + len(part["positions"])] = part["positions"]
+
+    if workers == 1:
+        _init_worker(base_preds, scales, dnf_rates, keep_positions, sampling)
+        for task in tasks:
+            merge(*_run_shard(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(base_preds, scales, dnf_rates, keep_positions, sampling)) as pool:
+            for shard_idx, part in pool.map(_run_shard, tasks):
+                merge(shard_idx, part)
+
+    result = {
+        "sim_points"       : sim_points,
+        "sim_wins"         : sim_wins,
+        "pos_distribution" : pos_distribution,
+    }
+    if keep_positions:
+        result["positions"] = positions
+    return result
+
+
+def run_sim_data(drivers, rounds, race_names, base_preds, sc_probs, dnf_rates,
+                 n_sims: int, seed=DEFAULT_SEED, shard_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: int | None = None, keep_positions: bool = False,
+                 sampling: str = "plain") -> dict:
+    """Sharded run packaged in the sim_data.pkl structure data_loader loads."""
+    result = run_parallel(base_preds, sc_probs, dnf_rates, n_sims, seed=seed, shard_size=shard_size,
+                          workers=workers, keep_positions=keep_positions, sampling=sampling)
+    sim_data = build_sim_data(drivers, rounds, race_names, result, n_sims)
+    sim_data["seed"]       = seed
+    sim_data["shard_size"] = shard_size
+    sim_data["sampling"]   = sampling
+    return sim_data
+
+
+def run_adaptive(base_preds, sc_probs, dnf_rates, tolerances: dict | None = None,
+                 confidence: float = DEFAULT_CONFIDENCE, min_sims: int = DEFAULT_CHUNK_SIZE,
+                 max_sims: int = DEFAULT_MAX_SIMS, seed=DEFAULT_SEED,
+                 shard_size: int = DEFAULT_CHUNK_SIZE, workers: int | None = None,
+                 keep_positions: bool = False, sampling: str = "plain", progress=None) -> dict:
+    """
+    Simulate shard by shard until the widest interval of every statistic
+    in tolerances (DEFAULT_TOLERANCES keys, partial dicts override) is
+    within its target, or max_sims is spent. Workers run the next shards
+    ahead, but the rule is checked after each shard in order, so the
+    stopping point doesn't depend on the worker count. progress, if given,
+    is called with the precision report after every shard.
+
+    Plain sims use binomial (Wilson) and normal intervals over all sims.
+    The other sampling modes scale those by each family's design effect —
+    the mean ratio of the variance seen between shards to the iid one —
+    and run at least MIN_REPLICATES shards before stopping.
+
+    Returns run_parallel's arrays for the sims actually run, plus n_sims
+    and precision: confidence, tolerances, converged, n_shards and the
+    widest half-width per statistic (max_ci).
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    unknown = set(tolerances) - set(DEFAULT_TOLERANCES)
+    if unknown:
+        raise ValueError(f"Unknown tolerance(s) {sorted(unknown)} — use {sorted(DEFAULT_TOLERANCES)}")
+    check_sampling(sampling)
+    if sampling != "plain":
+        min_sims = max(min_sims, MIN_REPLICATES * shard_size)
+
+    base_preds = np.asarray(base_preds, dtype=np.float64)
+    dnf_rates  = np.asarray(dnf_rates, dtype=np.float64)
+    scales     = noise_scales(sc_probs)
+    n_rounds, n_drivers = base_preds.shape
+    workers = workers or os.cpu_count() or 1
+
+    # shard_tasks spawns children in order, so shard k matches run_parallel's shard k
+    tasks = iter(shard_tasks(max_sims, seed, shard_size))
+
+    parts            = []
+    replicates       = []
+    champ_counts     = np.zeros(n_drivers, dtype=np.int64)
+    points_sum       = np.zeros(n_drivers)
+    points_sq_sum    = np.zeros(n_drivers)
+    sim_wins         = np.zeros(n_drivers)
+    pos_distribution = np.zeros((n_drivers, n_rounds, N_POSITIONS), dtype=np.int32)
+    n_sims = n_shards = 0
+    report = {}
+
+    def merge(part):
+        nonlocal n_sims, champ_counts, points_sum, points_sq_sum, sim_wins, pos_distribution
+        parts.append(part)
+        pts = part["sim_points"]
+        champs = np.bincount(np.argmax(pts, axis=1), minlength=n_drivers)
+        replicates.append(_shard_estimates(champs, part["pos_distribution"], pts))
+        champ_counts  += champs
+        points_sum    += pts.sum(axis=0)
+        points_sq_sum += np.square(pts).sum(axis=0)
+        sim_wins         += part["sim_wins"]
+        pos_distribution += part["pos_distribution"]
+        n_sims += len(pts)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(base_preds, scales, dnf_rates, keep_positions, sampling))
+    else:
+        _init_worker(base_preds, scales, dnf_rates, keep_positions, sampling)
+
+    def shard_results():
+        """Shard results in shard order, with up to `workers` shards in flight."""
+        if pool is None:
+            yield from map(_run_shard, tasks)
+            return
+        in_flight = deque(pool.submit(_run_shard, task) for task in islice(tasks, workers))
+        while in_flight:
+            done = in_flight.popleft().result()
+            for task in islice(tasks, 1):
+                in_flight.append(pool.submit(_run_shard, task))
+            yield done
+
+    try:
+        for _, part in shard_results():
+            merge(part)
+            n_shards += 1
+
+            mean = points_sum / n_sims
+            std  = np.sqrt(np.maximum(points_sq_sum / n_sims - mean * mean, 0.0))
+            ci   = interval_arrays(champ_counts, pos_distribution, std, n_sims, confidence)
+            if sampling != "plain":
+                ci = _design_effect_intervals(ci, replicates, confidence)
+            max_ci = {k: float(v.max()) for k, v in ci.items()}
+            converged = all(max_ci[k] <= tol for k, tol in tolerances.items())
+            report = {
+                "confidence" : confidence,
+                "tolerances" : tolerances,
+                "converged"  : converged,
+                "n_shards"   : n_shards,
+                "max_ci"     : max_ci,
+            }
+            if progress:
+                progress(n_sims, report)
+            if converged and n_sims >= min_sims:
+                break
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    result = {
+        "sim_points"       : np.concatenate([p["sim_points"] for p in parts]),
+        "sim_wins"         : sim_wins,
+        "pos_distribution" : pos_distribution,
+        "n_sims"           : n_sims,
+        "precision"        : {**report, "sampling": sampling},
+    }
+    if keep_positions:
+        result["positions"] = np.concatenate([p["positions"] for p in parts])
+    return result
+
+
+def _shard_estimates(champ_counts, pos_dist, sim_points) -> dict:
+    n = len(sim_points)
+    return {
+        "champ_pct"    : champ_counts / n * 100,
+        "avg_points"   : sim_points.mean(axis=0),
+        "race_win_pct" : pos_dist[:, :, 0] / n * 100,
+        "podium_pct"   : pos_dist[:, :, :3].sum(axis=2) / n * 100,
+    }
+
+
+def _design_effect_intervals(iid_ci: dict, replicates: list, confidence: float) -> dict:
+    """
+    Scale iid half-widths by the mean, over each family's statistics, of
+    (standard error between shards / iid standard error)². Pooling over the
+    family keeps the estimate stable with only a few shards; per statistic
+    it would be too noisy to stop on (and a median would be biased low at
+    few degrees of freedom). Events no sim has produced keep their Wilson
+    bound.
+    """
+    k = len(replicates)
+    if k < 2:
+        return {key: np.full(np.shape(v), np.inf) for key, v in iid_ci.items()}
+    z = z_value(confidence)
+    ci = {}
+    for key, half_width in iid_ci.items():
+        est = np.stack([r[key] for r in replicates])
+        rep_se = est.std(axis=0, ddof=1) / np.sqrt(k)
+        iid_se = half_width / z
+        seen = est.any(axis=0) & (iid_se > 0)
+        deff = np.mean((rep_se[seen] / iid_se[seen]) ** 2) if seen.any() else 1.0
+        ci[key] = np.where(seen, half_width * np.sqrt(deff), half_width)
+    return ci
+
+
+def save_sim_data(sim_data: dict, path) -> Path:
+    """Write sim_data to disk as a pickle (the format data_loader reads)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(sim_data, f)
+    return path
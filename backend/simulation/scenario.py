@@ -0,0 +1,130 @@
+"""
+scenario.py
+Simulation inputs and what-if overrides.
+
+A scenario is the set of engine inputs — base_preds, sc_probs, dnf_rates —
+plus the combined_pace_gap_s that drove the base predictions. Overrides are
+applied to a copy of the cached baseline and re-simulated with the engine.
+"""
+
+import numpy as np
+
+from simulation.engine import N_POSITIONS, simulate_season
+
+# Pace gap → grid proxy used for the 2026 features: grid = 1 + gap / 0.3
+PACE_GAP_PER_POSITION = 0.3
+
+CALIBRATION_SIMS  = 4000
+CALIBRATION_ITERS = 6
+
+
+def expected_positions(pos_dist: np.ndarray, n_sims: int) -> np.ndarray:
+    """
+    Mean finishing position per (round, driver) from a position histogram.
+    Unclassified finishes (outside the top 20) count as P21.
+    Returns (n_rounds, n_drivers).
+    """
+    positions   = np.arange(1, N_POSITIONS + 1)
+    classified  = pos_dist.sum(axis=2)
+    mean_pos    = (pos_dist @ positions + (n_sims - classified) * (N_POSITIONS + 1)) / n_sims
+    return mean_pos.T
+
+
+def calibrate_base_preds(pos_dist: np.ndarray, n_sims: int, sc_probs, dnf_rates,
+                         seed: int = 0) -> np.ndarray:
+    """
+    Recover base predictions for sim data saved without them.
+    Starts from the expected positions in pos_dist and nudges each base
+    until a short re-simulation reproduces those expected positions.
+    """
+    target = expected_positions(pos_dist, n_sims)
+    base   = target.copy()
+    for _ in range(CALIBRATION_ITERS):
+        sim  = simulate_season(base, sc_probs, dnf_rates, CALIBRATION_SIMS, seed=seed)
+        base = base + (target - expected_positions(sim["pos_distribution"], CALIBRATION_SIMS))
+    return base
+
+
+def _driver_indices(key: str, drivers: list, team_map: dict) -> list[int]:
+    """Indices a key refers to — a driver code or every driver in a team."""
+    k = key.strip()
+    if k.upper() in drivers:
+        return [drivers.index(k.upper())]
+    return [i for i, d in enumerate(drivers) if team_map.get(d, "").lower() == k.lower()]
+
+
+def _number(key: str, value, shape=()) -> np.ndarray:
+    """value as finite float64 of the given shape (a scalar by default)."""
+    try:
+        arr = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}: expected a number, got {value!r}") from None
+    if arr.shape != shape:
+        want = f"a list of {shape[0]} values (one per round)" if shape else "a number"
+        raise ValueError(f"{key}: expected {want}, got shape {arr.shape}")
+    if not np.all(np.isfinite(arr)):
+        raise ValueError(f"{key}: values must be finite")
+    return arr
+
+
+def apply_overrides(inputs: dict, drivers: list, rounds: list, race_names: dict,
+                    team_map: dict, base_predictions: dict | None = None,
+                    dnf_rate: dict | None = None,
+                    combined_pace_gap_s: dict | None = None,
+                    safety_car_probability: dict | None = None) -> tuple[dict, list]:
+    """
+    Apply what-if overrides to a copy of the baseline inputs.
+
+    base_predictions       : {driver/team: position or [position per round]}
+    dnf_rate               : {driver/team: per-race retirement probability}
+    combined_pace_gap_s    : {driver/team: new gap to fastest (s)} — shifts the
+                             base by the gap change / 0.3 positions
+    safety_car_probability : {race name: probability}
+
+    Returns (new inputs, list of keys that matched nothing). Raises
+    ValueError for a non-finite value or a per-round list of the wrong length.
+    """
+    base_preds = inputs["base_preds"].copy()
+    dnf_rates  = inputs["dnf_rates"].copy()
+    sc_probs   = inputs["sc_probs"].copy()
+    pace_gaps  = inputs["pace_gaps"].copy()
+    unknown    = []
+
+    for key, value in (base_predictions or {}).items():
+        idx = _driver_indices(key, drivers, team_map)
+        if not idx:
+            unknown.append(key)
+            continue
+        pred = _number(key, value, (len(rounds),) if np.ndim(value) else ())
+        base_preds[:, idx] = pred.reshape(-1, 1) if pred.ndim else float(pred)
+
+    for key, value in (dnf_rate or {}).items():
+        idx = _driver_indices(key, drivers, team_map)
+        if not idx:
+            unknown.append(key)
+            continue
+        dnf_rates[idx] = float(np.clip(_number(key, value), 0.0, 1.0))
+
+    for key, value in (combined_pace_gap_s or {}).items():
+        idx = _driver_indices(key, drivers, team_map)
+        if not idx:
+            unknown.append(key)
+            continue
+        gap = float(_number(key, value))
+        base_preds[:, idx] += (gap - pace_gaps[idx]) / PACE_GAP_PER_POSITION
+        pace_gaps[idx] = gap
+
+    race_index = {name.lower(): rounds.index(rnd) for rnd, name in race_names.items()}
+    for key, value in (safety_car_probability or {}).items():
+        r_idx = race_index.get(key.strip().lower())
+        if r_idx is None:
+            unknown.append(key)
+            continue
+        sc_probs[r_idx] = float(np.clip(_number(key, value), 0.0, 1.0))
+
+    return {
+        "base_preds" : base_preds,
+        "dnf_rates"  : dnf_rates,
+        "sc_probs"   : sc_probs,
+        "pace_gaps"  : pace_gaps,
+    }, unknown
@@ -0,0 +1,215 @@
+"""
+store.py
+Versioned on-disk format for simulation outputs.
+
+A store is a directory holding a manifest.json (drivers, rounds, race
+names, N_SIMULATIONS, any scalar metadata, a content hash and the array
+files) and one v-<digest>/ directory of .npy files per publish. A publish
+writes a fresh version directory and then atomically replaces the
+manifest, so readers see the old store or the new one, never a mix;
+version files are never rewritten in place. Arrays are opened with
+np.load(mmap_mode="r"), so every API worker shares the same pages through
+the OS page cache and startup cost doesn't grow with the number of
+simulations. Nothing is unpickled.
+
+Convert an existing pickle:
+    python -m simulation.store data/predictions/sim_data.pkl data/predictions/sim_store
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_NAME    = "poleposition-sim"
+FORMAT_VERSION = 1
+MANIFEST       = "manifest.json"
+
+# Keys stored in the manifest rather than as arrays
+_META_KEYS = ("drivers", "rounds", "race_names", "N_SIMULATIONS")
+
+# Version directories are named after their arrays' hashes
+_VERSION_PREFIX = "v-"
+
+
+def _array_hash(arr: np.ndarray) -> str:
+    h = hashlib.sha256()
+    h.update(f"{arr.dtype.str}{arr.shape}".encode())
+    h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def save_sim_store(sim_data: dict, path) -> dict:
+    """
+    Publish sim_data (the sim_data.pkl structure) to a store directory.
+    champ_winners is derived and saved too, so loaders never scan sim_points.
+    The arrays go to a new version directory and the manifest switches to
+    it in one os.replace; older versions are pruned, keeping the one just
+    replaced for readers that opened its manifest a moment ago.
+    Returns the manifest.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    arrays = {k: np.asarray(v) for k, v in sim_data.items() if isinstance(v, np.ndarray)}
+    if "sim_points" in arrays and "champ_winners" not in arrays:
+        arrays["champ_winners"] = np.argmax(arrays["sim_points"], axis=1).astype(np.int16)
+    extra = {k: v for k, v in sim_data.items()
+             if k not in _META_KEYS and k not in arrays}
+
+    hashes = {name: _array_hash(arr) for name, arr in sorted(arrays.items())}
+    version = _VERSION_PREFIX + hashlib.sha256(json.dumps(hashes).encode()).hexdigest()[:16]
+    _write_version(path / version, arrays)
+
+    entries = {
+        name: {
+            "file"   : f"{version}/{name}.npy",
+            "dtype"  : arrays[name].dtype.str,
+            "shape"  : list(arrays[name].shape),
+            "sha256" : digest,
+        }
+        for name, digest in hashes.items()
+    }
+
+    manifest = {
+        "format"        : FORMAT_NAME,
+        "version"       : FORMAT_VERSION,
+        "drivers"       : list(sim_data["drivers"]),
+        "rounds"        : [int(r) for r in sim_data["rounds"]],
+        "race_names"    : {str(k): v for k, v in sim_data["race_names"].items()},
+        "N_SIMULATIONS" : int(sim_data["N_SIMULATIONS"]),
+        "extra"         : json.loads(json.dumps(extra, default=_json_default)),
+        "arrays"        : entries,
+    }
+    manifest["content_hash"] = _content_hash(manifest)
+
+    try:
+        previous = _version_dirs(read_manifest(path))
+    except (FileNotFoundError, ValueError):
+        previous = set()
+
+    # The switch: one atomic rename of a manifest naming only complete files
+    tmp = path / f".{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path / MANIFEST)
+
+    _prune(path, keep=previous | {version})
+    return manifest
+
+
+def _write_version(target: Path, arrays: dict):
+    """Write arrays into a scratch directory, then rename it to target (skipped if already published)."""
+    if target.is_dir():
+        return  # same arrays, same hashes
+    scratch = target.parent / f".{target.name}.{os.getpid()}.tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    scratch.mkdir()
+    try:
+        for name, arr in arrays.items():
+            with open(scratch / f"{name}.npy", "wb") as f:
+                np.save(f, arr, allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+        os.rename(scratch, target)
+    except OSError:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not target.is_dir():  # lost a race to an identical publish otherwise
+            raise
+
+
+def _version_dirs(manifest: dict) -> set:
+    """Version directories a manifest's arrays live in ("" for the flat pre-versioning layout)."""
+    return {Path(entry["file"]).parent.name for entry in manifest["arrays"].values()}
+
+
+def _prune(path: Path, keep: set):
+    """Remove version directories (and flat-layout .npy files) not in keep. Best effort."""
+    for child in path.iterdir():
+        if child.is_dir() and child.name.startswith(_VERSION_PREFIX) and child.name not in keep:
+            shutil.rmtree(child, ignore_errors=True)
+        elif child.suffix == ".npy" and "" not in keep:
+            try:
+                child.unlink()
+            except OSError:
+                pass
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.random.SeedSequence):
+        return value.entropy
+    raise TypeError(f"Cannot store {type(value).__name__} in the manifest")
+
+
+def _content_hash(manifest: dict) -> str:
+    body = {k: v for k, v in manifest.items() if k != "content_hash"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def read_manifest(path) -> dict:
+    """Read and validate a store manifest."""
+    path = Path(path)
+    manifest_path = path / MANIFEST
+    if not manifest_path.exists():
+        if path.suffix == ".pkl":
+            raise ValueError(
+                f"{path} is a pickle — convert it first: "
+                f"python -m simulation.store {path} <store_dir>"
+            )
+        raise FileNotFoundError(f"No simulation store at {path}")
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"{manifest_path} is not a {FORMAT_NAME} manifest")
+    if manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Store version {manifest['version']} is newer than supported ({FORMAT_VERSION})")
+    return manifest
+
+
+def load_sim_store(path, verify: bool = False) -> dict:
+    """
+    Open a store as a sim_data dict. Arrays are read-only memory maps of the
+    files the manifest names, which a publish never rewrites — so a load
+    during a publish gets the old version or the new one whole.
+    verify=True re-hashes every array against the manifest (reads all pages).
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+
+    sim_data = {
+        "drivers"       : manifest["drivers"],
+        "rounds"        : manifest["rounds"],
+        "race_names"    : {int(k): v for k, v in manifest["race_names"].items()},
+        "N_SIMULATIONS" : manifest["N_SIMULATIONS"],
+        "version"       : manifest["content_hash"],
+        **manifest.get("extra", {}),
+    }
+    for name, entry in manifest["arrays"].items():
+        arr = np.load(path / entry["file"], mmap_mode="r", allow_pickle=False)
+        if list(arr.shape) != entry["shape"] or arr.dtype.str != entry["dtype"]:
+            raise ValueError(f"{entry['file']} does not match the manifest")
+        if verify and _array_hash(arr) != entry["sha256"]:
+            raise ValueError(f"{entry['file']} content hash mismatch")
+        sim_data[name] = arr
+    return sim_data
+
+
+def convert_pickle(pkl_path, store_path) -> dict:
+    """One-shot converter from a trusted legacy sim_data.pkl."""
+    with open(pkl_path, "rb") as f:
+        sim_data = pickle.load(f)
+    return save_sim_store(sim_data, store_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m simulation.store <sim_data.pkl> <store_dir>")
+        sys.exit(1)
+    m = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"✅ Wrote {sys.argv[2]} — {m['N_SIMULATIONS']:,} sims, version {m['content_hash']}")
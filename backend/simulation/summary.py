@@ -0,0 +1,172 @@
+"""
+summary.py
+Immutable snapshot of everything the tools report, computed once from the
+raw simulation arrays.
+
+Per-driver season stats, bincount-based champion counts, a team membership
+matrix for constructor totals and per-(driver, race) probability tables
+mean tool calls are lookups, whatever N_SIMS is. Every reported
+percentage and mean carries a confidence-interval half-width, so answers
+can say how much of a gap is sampling noise.
+"""
+
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_CONFIDENCE = 0.95
+
+
+@dataclass(frozen=True)
+class SimSummary:
+    drivers       : tuple
+    teams         : tuple          # first-appearance order over drivers
+    team_drivers  : dict           # team → tuple of driver codes
+    n_sims        : int
+    n_rounds      : int
+
+    # Drivers championship — (n_drivers,)
+    champ_counts  : np.ndarray
+    champ_pct     : np.ndarray
+    avg_points    : np.ndarray
+    min_points    : np.ndarray
+    max_points    : np.ndarray
+    std_points    : np.ndarray
+    win_pct       : np.ndarray     # race wins / (n_sims × n_rounds)
+
+    # Per race — (n_drivers, n_rounds[, 20]) in percent
+    pos_pct       : np.ndarray
+    race_win_pct  : np.ndarray
+    podium_pct    : np.ndarray
+    points_pct    : np.ndarray
+    likely_pos    : np.ndarray
+
+    # Constructors — (n_teams,)
+    team_matrix      : np.ndarray  # (n_drivers, n_teams) membership
+    team_avg_points  : np.ndarray
+    team_min_points  : np.ndarray
+    team_max_points  : np.ndarray
+    team_champ_pct   : np.ndarray
+
+    # Head to head — beats_pct[i, j] = % of sims driver i outscores driver j
+    beats_pct     : np.ndarray | None = None
+
+    # ± half-widths at `confidence`, same units and shapes as the stats above
+    confidence      : float = DEFAULT_CONFIDENCE
+    champ_pct_ci    : np.ndarray | None = None
+    avg_points_ci   : np.ndarray | None = None
+    race_win_pct_ci : np.ndarray | None = None
+    podium_pct_ci   : np.ndarray | None = None
+
+
+def z_value(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def proportion_ci(counts, n: int, confidence: float = DEFAULT_CONFIDENCE) -> np.ndarray:
+    """
+    Wilson score half-width, in percent, of counts/n. Unlike the normal
+    approximation it stays above zero for events never seen yet.
+    """
+    z = z_value(confidence)
+    p = np.asarray(counts, dtype=np.float64) / n
+    return z / (1 + z * z / n) * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) * 100
+
+
+def mean_ci(std, n: int, confidence: float = DEFAULT_CONFIDENCE) -> np.ndarray:
+    """Normal half-width of a mean over n sims."""
+    return z_value(confidence) * np.asarray(std, dtype=np.float64) / np.sqrt(n)
+
+
+def interval_arrays(champ_counts, pos_dist, std_points, n_sims: int,
+                    confidence: float = DEFAULT_CONFIDENCE) -> dict:
+    """Half-widths for champion %, mean points and per-race win / podium %."""
+    return {
+        "champ_pct"    : proportion_ci(champ_counts, n_sims, confidence),
+        "avg_points"   : mean_ci(std_points, n_sims, confidence),
+        "race_win_pct" : proportion_ci(pos_dist[:, :, 0], n_sims, confidence),
+        "podium_pct"   : proportion_ci(pos_dist[:, :, :3].sum(axis=2), n_sims, confidence),
+    }
+
+
+def _column_stats(values: np.ndarray) -> tuple:
+    """mean/min/max/std per column, each reduced over a contiguous row."""
+    cols = np.ascontiguousarray(values.T)
+    return cols.mean(axis=1), cols.min(axis=1), cols.max(axis=1), cols.std(axis=1)
+
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr = np.array(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+def build_summary(sim_points, sim_wins, pos_dist, drivers, team_map: dict,
+                  champ_winners=None, pairwise: bool = True,
+                  confidence: float = DEFAULT_CONFIDENCE) -> SimSummary:
+    """
+    Reduce raw simulation arrays to a SimSummary.
+    pairwise=False skips the (n_drivers × n_drivers) head-to-head table,
+    which is the only part that scans sim_points more than once.
+    """
+    sim_points = np.asarray(sim_points, dtype=np.float64)
+    pos_dist   = np.asarray(pos_dist)
+    n_sims, n_drivers = sim_points.shape
+    n_rounds   = pos_dist.shape[1]
+
+    if champ_winners is None:
+        champ_winners = np.argmax(sim_points, axis=1)
+    champ_counts = np.bincount(np.asarray(champ_winners, dtype=np.int64), minlength=n_drivers)
+    avg, lo, hi, std = _column_stats(sim_points)
+
+    pos_pct    = pos_dist / n_sims * 100
+    cum_pct    = np.cumsum(pos_pct, axis=2)
+
+    # ── Constructors ──────────────────────────────────────────
+    teams = tuple(dict.fromkeys(team_map.get(d, "Unknown") for d in drivers))
+    team_matrix = np.zeros((n_drivers, len(teams)))
+    for i, d in enumerate(drivers):
+        team_matrix[i, teams.index(team_map.get(d, "Unknown"))] = 1.0
+    team_points = sim_points @ team_matrix
+    t_avg, t_lo, t_hi, _ = _column_stats(team_points)
+    team_champ  = np.bincount(np.argmax(team_points, axis=1), minlength=len(teams))
+
+    beats = None
+    if pairwise:
+        cols  = np.ascontiguousarray(sim_points.T)
+        beats = np.stack([(cols[i][None, :] > cols).sum(axis=1) for i in range(n_drivers)])
+        beats = beats / n_sims * 100
+
+    ci = interval_arrays(champ_counts, pos_dist, std, n_sims, confidence)
+
+    return SimSummary(
+        drivers      = tuple(drivers),
+        teams        = teams,
+        team_drivers = {t: tuple(d for d in drivers if team_map.get(d) == t) for t in teams},
+        n_sims       = n_sims,
+        n_rounds     = n_rounds,
+        champ_counts = _frozen(champ_counts),
+        champ_pct    = _frozen(champ_counts / n_sims * 100),
+        avg_points   = _frozen(avg),
+        min_points   = _frozen(lo),
+        max_points   = _frozen(hi),
+        std_points   = _frozen(std),
+        win_pct      = _frozen(np.asarray(sim_wins, dtype=np.float64) / (n_sims * n_rounds) * 100),
+        pos_pct      = _frozen(pos_pct),
+        race_win_pct = _frozen(pos_pct[:, :, 0]),
+        podium_pct   = _frozen(cum_pct[:, :, 2]),
+        points_pct   = _frozen(cum_pct[:, :, 9]),
+        likely_pos   = _frozen(pos_pct.argmax(axis=2) + 1),
+        team_matrix     = _frozen(team_matrix),
+        team_avg_points = _frozen(t_avg),
+        team_min_points = _frozen(t_lo),
+        team_max_points = _frozen(t_hi),
+        team_champ_pct  = _frozen(team_champ / n_sims * 100),
+        beats_pct    = None if beats is None else _frozen(beats),
+        confidence      = confidence,
+        champ_pct_ci    = _frozen(ci["champ_pct"]),
+        avg_points_ci   = _frozen(ci["avg_points"]),
+        race_win_pct_ci = _frozen(ci["race_win_pct"]),
+        podium_pct_ci   = _frozen(ci["podium_pct"]),
+    )
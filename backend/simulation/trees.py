@@ -0,0 +1,299 @@
+"""
+trees.py
+The trained LightGBM regressor as flat NumPy arrays, scored without
+LightGBM.
+
+export() walks the booster's trees once and lays every node of every tree
+out in shared arrays (pre-order, so a subtree is a contiguous range): split
+feature, threshold, left/right child, default direction for missing values
+and leaf value.
+
+predict() scores QuickScorer-style. A split's thresholds come from
+LightGBM's feature bins, so each feature has at most max_bin distinct ones.
+For each feature, a table holds, per number of thresholds below x, the AND
+over every tree of "leaves still reachable" bitmasks: each split x exceeds
+removes its left subtree's leaves. One searchsorted per feature and an AND
+of the looked-up rows leaves each tree's exit leaf as its lowest set bit.
+Rows with NaNs, zero-as-missing splits and trees over 64 leaves use a plain
+traversal instead. Leaves point at themselves there, so every (tree, row)
+pair advances one level per step for max_depth steps, following LightGBM's
+missing-value rules. Rows are scored in chunks so the (trees × rows) arrays
+stay small whatever the batch size.
+
+The API loads the .npz with allow_pickle=False; only the exporter needs
+LightGBM (to unpickle the model).
+
+    cd backend
+    python -m simulation.trees ../models/lgbm_regressor.pkl ../models/feature_cols.pkl ../models/lgbm_trees.npz
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_NAME    = "poleposition-trees"
+FORMAT_VERSION = 1
+
+# LightGBM missing_type per split
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+K_ZERO_THRESHOLD = 1e-35          # LightGBM's kZeroThreshold
+
+# Objectives whose prediction is the raw sum of leaf values
+_IDENTITY_OBJECTIVES = {"regression", "regression_l1", "huber", "fair", "quantile", "mape"}
+
+CHUNK_NODES = 1 << 16             # (trees × rows) cells per chunk — keeps the masks in cache
+MAX_BITVECTOR_LEAVES = 64
+
+
+@dataclass(frozen=True)
+class TreeEnsemble:
+    feature_names : tuple
+    roots         : np.ndarray     # (n_trees,) node index of each tree's root
+    feature       : np.ndarray     # (n_nodes,) split feature, 0 at leaves
+    threshold     : np.ndarray     # (n_nodes,) go left if x <= threshold; +inf at leaves
+    left          : np.ndarray     # (n_nodes,) child node indices; leaves point at themselves
+    right         : np.ndarray
+    default_left  : np.ndarray     # (n_nodes,) bool — direction for missing values
+    missing       : np.ndarray     # (n_nodes,) MISSING_* per split
+    value         : np.ndarray     # (n_nodes,) leaf value, 0 at splits
+    max_depth     : int
+    average       : bool = False   # random-forest mode: mean instead of sum
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict(self, X, chunk_nodes: int = CHUNK_NODES) -> np.ndarray:
+        """
+        Predictions for a (rows, features) array in feature_names order, or
+        any frame with those columns (same call as LGBMRegressor.predict).
+        """
+        if hasattr(X, "columns"):
+            # Column by column: cheaper than pandas' multi-column selection
+            X = np.column_stack([X[c].to_numpy(np.float64) for c in self.feature_names])
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {X.shape[1]}")
+
+        out = np.empty(len(X))
+        step = max(1, chunk_nodes // max(self.n_trees, 1))
+        for start in range(0, len(X), step):
+            chunk = X[start:start + step]
+            if self._tables is not None and not np.isnan(chunk).any():
+                out[start:start + step] = self._score_bitvector(chunk)
+            else:
+                out[start:start + step] = self._score(chunk)
+        return out / self.n_trees if self.average else out
+
+    def _score_bitvector(self, X: np.ndarray) -> np.ndarray:
+        thresholds, tables, leaf_values = self._tables
+        reachable = None
+        for f, (t, table) in enumerate(zip(thresholds, tables)):
+            if table is None:
+                continue
+            rows = np.take(table, np.searchsorted(t, X[:, f], side="left"), axis=0)   # (rows, trees)
+            if reachable is None:
+                reachable = rows
+            else:
+                np.bitwise_and(reachable, rows, out=reachable)
+        if reachable is None:                                          # only single-leaf trees
+            return np.full(len(X), leaf_values[:, 0].sum())
+        lowest = reachable & (~reachable + reachable.dtype.type(1))
+        leaf = np.log2(lowest.astype(np.float64)).astype(np.intp)      # exact for powers of two
+        return leaf_values.ravel()[leaf + self._leaf_offsets].sum(axis=1)
+
+    @cached_property
+    def _leaf_offsets(self) -> np.ndarray:
+        return np.arange(self.n_trees) * self._tables[2].shape[1]
+
+    def _score(self, X: np.ndarray) -> np.ndarray:
+        n = len(X)
+        node = np.repeat(self.roots[:, None], n, axis=1)          # (trees, rows)
+        flat = X.ravel()
+        offset = (np.arange(n) * X.shape[1])[None, :]
+        simple = not self._has_zero_splits and not np.isnan(flat).any()
+        for _ in range(self.max_depth):
+            x = flat[offset + self.feature[node]]
+            if simple:
+                go_left = x <= self.threshold[node]
+            else:
+                go_left = self._decide(x, node)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=0)
+
+    def _decide(self, x: np.ndarray, node: np.ndarray) -> np.ndarray:
+        """LightGBM's NumericalDecision, including its missing-value rules."""
+        missing = self.missing[node]
+        nan = np.isnan(x)
+        x = np.where(nan & (missing != MISSING_NAN), 0.0, x)
+        to_default = ((missing == MISSING_ZERO) & (np.abs(x) <= K_ZERO_THRESHOLD)) | \
+                     ((missing == MISSING_NAN) & nan)
+        return np.where(to_default, self.default_left[node], x <= self.threshold[node])
+
+    @property
+    def _has_zero_splits(self) -> bool:
+        return bool((self.missing == MISSING_ZERO).any())
+
+    @cached_property
+    def _tables(self):
+        """
+        (sorted thresholds per feature, prefix-AND mask table per feature,
+        (trees, leaves) leaf values), or None when a tree has too many
+        leaves or zero-as-missing splits.
+        """
+        n_nodes = len(self.value)
+        is_leaf = self.left == np.arange(n_nodes)
+        ends = np.append(self.roots[1:], n_nodes)
+        leaves_before = np.concatenate([[0], np.cumsum(is_leaf)])      # global leaf ordinal at each node
+        base = leaves_before[self.roots]
+        n_leaves = leaves_before[ends] - base
+        if n_leaves.max() > MAX_BITVECTOR_LEAVES or self._has_zero_splits:
+            return None
+
+        tree_of = np.repeat(np.arange(self.n_trees), ends - self.roots)
+        leaf_values = np.zeros((self.n_trees, int(n_leaves.max())))
+        leaf_nodes = np.flatnonzero(is_leaf)
+        leaf_values[tree_of[leaf_nodes], leaves_before[leaf_nodes] - base[tree_of[leaf_nodes]]] = self.value[leaf_nodes]
+
+        # Going right removes the left subtree's leaves: nodes [left, right) in pre-order
+        splits = np.flatnonzero(~is_leaf)
+        lo = (leaves_before[self.left[splits]] - base[tree_of[splits]]).astype(np.uint64)
+        hi = (leaves_before[self.right[splits]] - base[tree_of[splits]]).astype(np.uint64)
+        ones = np.uint64(0xFFFFFFFFFFFFFFFF)
+        below = lambda n: np.where(n >= 64, ones, (np.uint64(1) << np.minimum(n, 63)) - np.uint64(1))
+        keep = ~(below(hi) ^ below(lo))
+
+        # Masks as narrow as the widest tree allows: half the memory traffic at ≤ 32 leaves
+        mask_type = np.uint32 if n_leaves.max() <= 32 else np.uint64
+        thresholds, tables = [], []
+        for f in range(len(self.feature_names)):
+            on_f = splits[self.feature[splits] == f]
+            if not len(on_f):
+                thresholds.append(np.empty(0))
+                tables.append(None)
+                continue
+            t, rank = np.unique(self.threshold[on_f], return_inverse=True)
+            table = np.full((len(t) + 1, self.n_trees), ones)
+            # Row r + 1 applies every split with threshold t[r]; accumulate so row r = all t < x
+            np.bitwise_and.at(table, (rank + 1, tree_of[on_f]), keep[np.searchsorted(splits, on_f)])
+            thresholds.append(t)
+            tables.append(np.bitwise_and.accumulate(table, axis=0).astype(mask_type))
+        return thresholds, tables, leaf_values
+
+    # ── Persistence ──────────────────────────────────────────────
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "feature_names": list(self.feature_names),
+                "max_depth": self.max_depth, "average": self.average}
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+                     **{k: getattr(self, k) for k in _ARRAYS})
+        os.replace(tmp, path)
+        return path
+
+
+_ARRAYS = ("roots", "feature", "threshold", "left", "right", "default_left", "missing", "value")
+
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr = np.array(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+def load(path) -> TreeEnsemble:
+    """Read an exported ensemble (no pickles, no LightGBM)."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(data["meta"].tobytes())
+        if meta.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} is not a {FORMAT_NAME} file")
+        if meta.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Tree file version {meta['version']} is newer than supported ({FORMAT_VERSION})")
+        arrays = {k: _frozen(data[k]) for k in _ARRAYS}
+    return TreeEnsemble(feature_names=tuple(meta["feature_names"]), max_depth=int(meta["max_depth"]),
+                        average=bool(meta["average"]), **arrays)
+
+
+def export(model, feature_names=None) -> TreeEnsemble:
+    """
+    Flatten a fitted LGBMRegressor (or lgb.Booster) into a TreeEnsemble.
+    feature_names defaults to the model's own; pass feature_cols.pkl's list
+    to check the two agree.
+    """
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()
+    objective = dump.get("objective", "regression").split()[0]
+    if objective not in _IDENTITY_OBJECTIVES:
+        raise ValueError(f"Objective {objective!r} needs an output transform — not supported")
+    names = tuple(dump["feature_names"])
+    if feature_names is not None and tuple(feature_names) != names:
+        raise ValueError(f"feature_cols {list(feature_names)} differ from the model's {list(names)}")
+
+    cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing", "value")}
+    roots, max_depth = [], 0
+
+    def add(node: dict, depth: int) -> int:
+        nonlocal max_depth
+        idx = len(cols["value"])
+        for k in cols:
+            cols[k].append(None)
+        if "leaf_value" in node:
+            max_depth = max(max_depth, depth)
+            cols["feature"][idx], cols["threshold"][idx] = 0, np.inf
+            cols["left"][idx] = cols["right"][idx] = idx
+            cols["default_left"][idx], cols["missing"][idx] = True, MISSING_NONE
+            cols["value"][idx] = node["leaf_value"]
+            return idx
+        if node["decision_type"] != "<=":
+            raise ValueError(f"Split type {node['decision_type']!r} (categorical) is not supported")
+        cols["feature"][idx]      = node["split_feature"]
+        cols["threshold"][idx]    = node["threshold"]
+        cols["default_left"][idx] = node["default_left"]
+        cols["missing"][idx]      = _MISSING[node["missing_type"]]
+        cols["value"][idx]        = 0.0
+        cols["left"][idx]  = add(node["left_child"], depth + 1)
+        cols["right"][idx] = add(node["right_child"], depth + 1)
+        return idx
+
+    for tree in dump["tree_info"]:
+        roots.append(add(tree["tree_structure"], 0))
+
+    dtypes = {"feature": np.int32, "threshold": np.float64, "left": np.int32, "right": np.int32,
+              "default_left": np.bool_, "missing": np.uint8, "value": np.float64}
+    return TreeEnsemble(
+        feature_names = names,
+        roots         = _frozen(np.array(roots, dtype=np.int32)),
+        max_depth     = max_depth,
+        average       = bool(dump.get("average_output", False)),
+        **{k: _frozen(np.array(v, dtype=dtypes[k])) for k, v in cols.items()},
+    )
+
+
+def export_file(model_path, feature_cols_path, out_path) -> TreeEnsemble:
+    """models/lgbm_regressor.pkl + feature_cols.pkl → a tree file."""
+    import pickle
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    with open(feature_cols_path, "rb") as f:
+        feature_cols = pickle.load(f)
+    ensemble = export(model, feature_cols)
+    ensemble.save(out_path)
+    return ensemble
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        sys.exit("usage: python -m simulation.trees <lgbm_regressor.pkl> <feature_cols.pkl> <out.npz>")
+    ens = export_file(*sys.argv[1:])
+    print(f"✅ {ens.n_trees} trees, {len(ens.value)} nodes, depth ≤ {ens.max_depth} → {sys.argv[3]}")
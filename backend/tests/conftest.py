@@ -0,0 +1,23 @@
+"""
+Shared test setup. Run from backend/:
+
+    python -m pytest -q
+
+Modules import as the API does (tools.*, simulation.*, agents.*), with the
+repo root on the path too for fetch_missing_data.py. The chat runs on the
+stub model and nothing starts background warm-ups or watchers.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BACKEND), str(BACKEND.parent)]
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["CHAT_MODEL"]           = "stub"
+os.environ["STUB_MODEL_DELAY"]     = "0"
+os.environ["CAREER_WARMUP"]        = "0"
+os.environ["CHAT_WARMUP"]          = "0"
+os.environ["SIM_WATCH_INTERVAL_S"] = "0"
@@ -0,0 +1,84 @@
+"""career_tools against the in-process Jolpica mock (tools/jolpica_mock.py)."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from tools import career_tools, jolpica_mock
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    """Empty memory and SQLite caches, a fast limiter and a clean mock for every test."""
+    monkeypatch.setattr(career_tools, "CAREER_CACHE_PATH", tmp_path / "career.sqlite")
+    monkeypatch.setattr(career_tools, "JOLPICA_RATE", 1000.0)
+    monkeypatch.setattr(career_tools, "_career_cache", {})
+    monkeypatch.setattr(career_tools, "_inflight", {})
+    monkeypatch.setattr(jolpica_mock, "MOCK_RATE_LIMIT", 0)
+    monkeypatch.setattr(jolpica_mock, "_window", {"start": 0.0, "count": 0})
+    jolpica_mock.REQUESTS.clear()
+
+
+def run(coro_fn):
+    """Run coro_fn() on a fresh loop with the client pointed at the mock."""
+    async def main():
+        await career_tools.reset_client(httpx.ASGITransport(app=jolpica_mock.app))
+        try:
+            return await coro_fn()
+        finally:
+            await career_tools.reset_client(None)
+    return asyncio.run(main())
+
+
+def jolpica_requests() -> int:
+    return sum(n for path, n in jolpica_mock.REQUESTS.items() if path.startswith("/ergast"))
+
+
+def test_concurrent_lookups_share_one_fetch():
+    single = run(lambda: career_tools.get_career_stats("LEC"))
+    per_lookup = jolpica_requests()
+    assert single["starts"] > 0 and per_lookup > 0
+
+    career_tools._career_cache.clear()
+    career_tools._db_clear()
+    jolpica_mock.REQUESTS.clear()
+    results = run(lambda: asyncio.gather(*(career_tools.get_career_stats("LEC") for _ in range(8))))
+
+    assert jolpica_requests() == per_lookup
+    assert all(r == single for r in results)
+
+
+def test_sqlite_cache_survives_a_restart():
+    first = run(lambda: career_tools.get_career_stats("VER"))
+    assert jolpica_requests() > 0
+
+    # A new process: empty memory cache, same SQLite file
+    career_tools._career_cache.clear()
+    jolpica_mock.REQUESTS.clear()
+    again = run(lambda: career_tools.get_career_stats("VER"))
+
+    assert again == first
+    assert jolpica_requests() == 0
+
+
+def test_warm_up_completes_under_the_mock_rate_limit(monkeypatch):
+    drivers = {code: career_tools.DRIVER_ID_MAP[code] for code in ("LEC", "NOR", "PIA", "RUS")}
+    monkeypatch.setattr(career_tools, "DRIVER_ID_MAP", drivers)
+    monkeypatch.setattr(career_tools, "JOLPICA_RATE", 4.0)
+    monkeypatch.setattr(jolpica_mock, "MOCK_RATE_LIMIT", 4)
+
+    assert run(career_tools.warm_career_cache) == len(drivers)
+    for code in drivers:
+        assert career_tools._db_get(code) is not None
+
+
+def test_failed_fetch_is_not_cached(monkeypatch):
+    monkeypatch.setattr(career_tools, "JOLPICA_RETRIES", 0)
+    monkeypatch.setattr(jolpica_mock, "MOCK_RATE_LIMIT", 1)
+
+    # Three requests at once: the limit answers 429 to all but one
+    assert run(lambda: career_tools.get_career_stats("HAM")) is None
+    assert jolpica_mock.REQUESTS["429"] > 0
+    assert career_tools._db_get("HAM") is None
+    assert "HAM" not in career_tools._career_cache
@@ -0,0 +1,143 @@
+"""chat.run_turn with the real orchestrator on the local StubModel (CHAT_MODEL=stub)."""
+
+import asyncio
+
+import pytest
+
+from agents import answer_cache
+from agents.orchestrator import create_orchestrator
+from agents.stub_model import StubModel
+from chat import ChatAdmission, ChatBusy, run_turn
+
+# Not a fast-path question, so it goes through the orchestrator and two specialists
+QUESTION = "Explain the 2026 aero rules and which driver benefits"
+
+
+@pytest.fixture(autouse=True)
+def no_answer_cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", False)
+
+
+class FailingModel(StubModel):
+    """Calls tools as usual, then fails while answering — leaving a toolUse in the history."""
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        if any("toolResult" in c for c in messages[-1]["content"]):
+            raise RuntimeError("model went away")
+        async for event in super().stream(messages, tool_specs, system_prompt, **kwargs):
+            yield event
+
+
+def recorder():
+    events = []
+
+    async def send(event):
+        events.append(event)
+    return events, send
+
+
+def test_llm_turn_streams_in_order():
+    events, send = recorder()
+    agent = create_orchestrator()
+    asyncio.run(run_turn(agent, QUESTION, send, ChatAdmission(1, 1)))
+
+    kinds = [e["type"] for e in events]
+    assert kinds[0] == "thinking" and kinds[-1] == "response"
+    assert set(kinds[1:-1]) == {"progress", "token"}
+    # Each specialist reports started → tool calls → done
+    for name in {e["agent"] for e in events if e["type"] == "progress"}:
+        statuses = [e["status"] for e in events if e["type"] == "progress" and e["agent"] == name]
+        assert statuses[0] == "started" and statuses[-1] == "done" and "tool" in statuses
+    # The tokens are the final answer, in order (str(AgentResult) adds a newline)
+    response = events[-1]
+    assert response["source"] == "llm"
+    assert "".join(e["text"] for e in events if e["type"] == "token") == response["message"].rstrip("\n")
+    assert response["message"].startswith(f"Stub answer to: {QUESTION}")
+    assert [m["role"] for m in agent.messages] == ["user", "assistant", "user", "assistant"]
+
+
+def test_cancelled_turn_leaves_history_as_it_was():
+    events, send = recorder()
+    agent = create_orchestrator()
+
+    async def main():
+        await run_turn(agent, QUESTION, send, ChatAdmission(1, 1))
+        history = list(agent.messages)
+
+        agent.model.update_config(delay=5.0)
+        turn = asyncio.create_task(run_turn(agent, "And who loses out under them?", send, ChatAdmission(1, 1)))
+        while len(agent.messages) == len(history):
+            await asyncio.sleep(0.01)
+        turn.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+        assert agent.messages == history
+
+        # The next turn runs normally on the restored history
+        agent.model.update_config(delay=0.0)
+        events.clear()
+        await run_turn(agent, QUESTION, send, ChatAdmission(1, 1))
+
+    asyncio.run(main())
+    assert events[-1]["type"] == "response"
+
+
+def test_failed_turn_rolls_back_history():
+    events, send = recorder()
+    agent = create_orchestrator()
+
+    async def main():
+        await run_turn(agent, QUESTION, send, ChatAdmission(1, 1))
+        history = list(agent.messages)
+
+        agent.model = FailingModel()
+        events.clear()
+        await run_turn(agent, "And who loses out under them?", send, ChatAdmission(1, 1))
+        assert events[-1]["type"] == "error" and events[-1]["message"].startswith("Chat failed:")
+        assert agent.messages == history
+
+        agent.model = StubModel()
+        events.clear()
+        await run_turn(agent, QUESTION, send, ChatAdmission(1, 1))
+
+    asyncio.run(main())
+    assert events[-1]["type"] == "response"
+
+
+def test_admission_queues_then_turns_away():
+    admission = ChatAdmission(max_active=1, max_queued=1)
+    events, send = recorder()
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.slot(send):
+                await release.wait()
+
+        async def wait_for_slot():
+            async with admission.slot(send):
+                return admission.active
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait_for_slot())
+        await asyncio.sleep(0)
+        assert (admission.active, admission.waiting) == (1, 1)
+        assert events == [{"type": "queued", "position": 1}]
+
+        with pytest.raises(ChatBusy):
+            async with admission.slot(send):
+                pass
+
+        # A full queue reaches the client as an error, with the history untouched
+        agent = create_orchestrator()
+        await run_turn(agent, QUESTION, send, admission)
+        assert events[-1]["type"] == "error" and agent.messages == []
+
+        release.set()
+        await holder
+        assert await waiter == 1
+        assert (admission.active, admission.waiting) == (0, 0)
+
+    asyncio.run(main())
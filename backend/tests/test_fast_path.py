@@ -0,0 +1,37 @@
+import pytest
+
+from agents.fast_path import FAST_PATH_EXAMPLES, LLM_ONLY_EXAMPLES, classify, question_key
+
+
+@pytest.mark.parametrize("question, intent", FAST_PATH_EXAMPLES.items())
+def test_fast_path_examples_route_to_their_intent(question, intent):
+    assert classify(question)[0] == intent
+
+
+@pytest.mark.parametrize("question", LLM_ONLY_EXAMPLES)
+def test_llm_only_examples_fall_back(question):
+    assert classify(question) is None
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Who'll win the title?", "who wins the 2026 championship"),
+    ("How will Norris do at Silverstone?", "How will Lando Norris do at the British GP?"),
+    ("How will Norris do at the Red Bull Ring?", "How will NOR do in Austria?"),
+    ("Compare LEC and VER", "compare Leclerc vs Verstappen"),
+])
+def test_rewordings_share_a_key(a, b):
+    assert question_key(a) == question_key(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Will Ferrari beat McLaren in the constructors?", "Will McLaren beat Ferrari in the constructors?"),
+    ("Who wins the championship if Leclerc wins Monaco?", "Who wins Monaco if Leclerc wins the championship?"),
+    # "red" and "bull" are Red Bull Ring alias words, but only a matched alias is replaced
+    ("Will Red Bull win the constructors?", "Will win the constructors?"),
+])
+def test_different_questions_get_different_keys(a, b):
+    assert question_key(a) != question_key(b)
+
+
+def test_follow_ups_are_not_keyed():
+    assert question_key("What about him at Monaco?") is None
@@ -0,0 +1,132 @@
+"""fetch_missing_data.py and tools/rate_limit.py against the in-process Jolpica mock."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+import fetch_missing_data as fetch
+from tools import jolpica_mock, raw_store
+from tools.rate_limit import TokenBucket, retry_after
+
+YEAR = 2024
+
+
+@pytest.fixture(autouse=True)
+def clean_mock(monkeypatch):
+    monkeypatch.setattr(jolpica_mock, "MOCK_RATE_LIMIT", 0)
+    monkeypatch.setattr(jolpica_mock, "_window", {"start": 0.0, "count": 0})
+    jolpica_mock.REQUESTS.clear()
+
+
+def run(coro_fn, rate: float = 1000.0, burst: int = 1000):
+    """Run coro_fn(client, bucket) on a fresh loop with a client pointed at the mock."""
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=jolpica_mock.app)) as client:
+            return await coro_fn(client, TokenBucket(rate, burst))
+    return asyncio.run(main())
+
+
+def fill(data_dir):
+    return run(lambda client, bucket: fetch.fill_missing(client, bucket, asyncio.Semaphore(4), data_dir, YEAR))
+
+
+def round_requests() -> dict:
+    return {path: n for path, n in jolpica_mock.REQUESTS.items() if path.startswith(f"/ergast/f1/{YEAR}/")}
+
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+
+def test_token_bucket_paces_after_the_burst():
+    async def take(n):
+        bucket = TokenBucket(rate=50, burst=5)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(n)))
+        return time.monotonic() - started
+
+    assert asyncio.run(take(5)) < 0.1
+    assert asyncio.run(take(25)) >= 20 / 50 * 0.95
+
+
+def test_token_bucket_pause_holds_everyone():
+    async def main():
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.3)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.29
+
+
+def test_retry_after_header_forms():
+    def response(value=None):
+        return httpx.Response(429, headers={"Retry-After": value} if value is not None else {})
+
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert retry_after(response("7"), default=1) == 7
+    assert 25 < retry_after(response(when), default=1) <= 30
+    assert retry_after(response(), default=3) == 3
+    assert retry_after(response("soon"), default=3) == 3
+
+
+def test_429_pauses_for_retry_after_and_succeeds(monkeypatch):
+    monkeypatch.setattr(jolpica_mock, "MOCK_RATE_LIMIT", 2)
+
+    async def burst(client, bucket):
+        started = time.monotonic()
+        results = await asyncio.gather(*(fetch.get(client, bucket, f"{YEAR}/{rnd}/results.json")
+                                         for rnd in range(1, 5)))
+        return results, time.monotonic() - started
+
+    results, elapsed = run(burst)
+    assert all(r["MRData"]["RaceTable"]["Races"] for r in results)
+    assert jolpica_mock.REQUESTS["429"] >= 2
+    # The mock's Retry-After is the rest of its one-second window
+    assert elapsed >= 0.5
+
+# ── Schedule and filling ──────────────────────────────────────────────────────
+
+def test_schedule_comes_from_the_api():
+    schedule = run(lambda client, bucket: fetch.fetch_schedule(client, bucket, YEAR))
+    source = raw_store.read_table("race_results", years=[YEAR], columns=["round", "race_name"])
+    assert schedule == dict(source.drop_duplicates("round").itertuples(index=False))
+
+
+def test_fills_an_empty_store(tmp_path):
+    fill(tmp_path)
+    for kind in fetch.KINDS:
+        source = raw_store.read_table(kind, years=[YEAR])
+        filled = raw_store.read_table(kind, years=[YEAR], data_dir=tmp_path)
+        assert len(filled) == len(source)
+        assert set(filled["round"]) == set(source["round"])
+    results = raw_store.read_table("race_results", years=[YEAR], data_dir=tmp_path)
+    source  = raw_store.read_table("race_results", years=[YEAR])
+    key = ["round", "finish_position"]
+    assert (results.sort_values(key)[["driver", "points"]].to_numpy()
+            == source.sort_values(key)[["driver", "points"]].to_numpy()).all()
+
+
+def test_resumes_from_existing_round_partitions(tmp_path):
+    done = [1, 2, 3]
+    for kind in fetch.KINDS:
+        source = raw_store.read_table(kind, years=[YEAR])
+        for rnd in done:
+            raw_store.append_round(kind, YEAR, rnd, source[source["round"] == rnd], tmp_path)
+
+    fill(tmp_path)
+
+    fetched = round_requests()
+    n_rounds = raw_store.read_table("race_results", years=[YEAR], columns=["round"])["round"].nunique()
+    assert not any(path.startswith(tuple(f"/ergast/f1/{YEAR}/{rnd}/" for rnd in done)) for path in fetched)
+    assert sum(fetched.values()) == len(fetch.KINDS) * (n_rounds - len(done))
+    for kind in fetch.KINDS:
+        assert len(raw_store.read_table(kind, years=[YEAR], data_dir=tmp_path)) == \
+            len(raw_store.read_table(kind, years=[YEAR]))
+
+    # Nothing is left to fetch on a rerun
+    jolpica_mock.REQUESTS.clear()
+    fill(tmp_path)
+    assert not round_requests()
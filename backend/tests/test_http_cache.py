@@ -0,0 +1,72 @@
+"""http_cache.ResponseCache: ETags per representation, 304s and version turnover."""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_cache import GZIP_MIN_BYTES, ResponseCache
+
+version = {"current": "v1"}
+
+
+@pytest.fixture
+def client():
+    version["current"] = "v1"
+    cache = ResponseCache(lambda: version["current"])
+    app = FastAPI()
+
+    @app.get("/big")
+    def big(request: Request):
+        return cache.respond(request, ("big",), lambda: {"rows": ["x" * 40] * GZIP_MIN_BYTES})
+
+    @app.get("/small")
+    def small(request: Request):
+        return cache.respond(request, ("small",), lambda: {"ok": True})
+
+    return TestClient(app)
+
+
+def get(client, path, encoding, etag=None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(path, headers=headers)
+
+
+def test_gzip_and_identity_bodies_have_distinct_etags(client):
+    plain  = get(client, "/big", "identity")
+    zipped = get(client, "/big", "gzip")
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gz"'
+    for response in (plain, zipped):
+        assert response.headers["Vary"] == "Accept-Encoding"
+    assert zipped.json() == plain.json()
+
+
+def test_each_representation_revalidates_with_its_own_etag(client):
+    plain_tag  = get(client, "/big", "identity").headers["ETag"]
+    zipped_tag = get(client, "/big", "gzip").headers["ETag"]
+
+    assert get(client, "/big", "identity", plain_tag).status_code == 304
+    assert get(client, "/big", "gzip", zipped_tag).status_code == 304
+    assert get(client, "/big", "gzip", f"W/{zipped_tag}").status_code == 304
+    # A tag for the other representation is not a match
+    assert get(client, "/big", "identity", zipped_tag).status_code == 200
+    stale = get(client, "/big", "gzip", plain_tag)
+    assert stale.status_code == 200 and stale.headers["ETag"] == zipped_tag
+
+
+def test_small_bodies_are_never_gzipped(client):
+    response = get(client, "/small", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gz"')
+    assert get(client, "/small", "gzip", response.headers["ETag"]).status_code == 304
+
+
+def test_new_version_changes_the_etag(client):
+    before = get(client, "/big", "gzip").headers["ETag"]
+    version["current"] = "v2"
+    response = get(client, "/big", "gzip", before)
+    assert response.status_code == 200 and response.headers["ETag"] != before
+    assert response.json()["rows"]
@@ -0,0 +1,50 @@
+"""simulation.parallel: the merged output depends on (seed, shard_size), never on the worker count."""
+
+import numpy as np
+import pytest
+
+from simulation import engine, parallel, store
+
+N_SIMS = 6000
+SEED   = 7
+
+rng = np.random.default_rng(0)
+BASE_PREDS = rng.uniform(1, 20, (6, 12))
+SC_PROBS   = rng.uniform(0, 1, 6)
+DNF_RATES  = rng.uniform(0, 0.2, 12)
+
+
+def run(**kwargs):
+    return parallel.run_parallel(BASE_PREDS, SC_PROBS, DNF_RATES, N_SIMS, seed=SEED, **kwargs)
+
+
+def assert_same(a, b):
+    assert a.keys() == b.keys()
+    for name, arr in a.items():
+        np.testing.assert_array_equal(b[name], arr, err_msg=name)
+
+
+@pytest.mark.parametrize("sampling", ["plain", "antithetic"])
+def test_worker_count_does_not_change_the_output(sampling):
+    one = run(workers=1, shard_size=1000, keep_positions=True, sampling=sampling)
+    assert_same(one, run(workers=3, shard_size=1000, keep_positions=True, sampling=sampling))
+    assert one["sim_points"].shape == (N_SIMS, 12)
+
+
+def test_default_shards_match_the_engine():
+    assert_same(engine.simulate_season(BASE_PREDS, SC_PROBS, DNF_RATES, N_SIMS, seed=SEED, chunk_size=1500),
+                run(workers=2))
+
+
+def test_sim_data_has_the_loader_structure(tmp_path):
+    sim_data = parallel.run_sim_data([f"D{i:02}" for i in range(12)], list(range(1, 7)),
+                                     {r: f"Race {r}" for r in range(1, 7)},
+                                     BASE_PREDS, SC_PROBS, DNF_RATES, N_SIMS, seed=SEED, workers=2)
+    assert sim_data["N_SIMULATIONS"] == N_SIMS and sim_data["seed"] == SEED
+    assert sim_data["pos_distribution"].shape == (12, 6, engine.N_POSITIONS)
+    assert sim_data["sim_wins"].sum() == N_SIMS * 6
+
+    store.save_sim_store(sim_data, tmp_path)
+    loaded = store.load_sim_store(tmp_path, verify=True)
+    for name in ("sim_points", "sim_wins", "pos_distribution"):
+        np.testing.assert_array_equal(loaded[name], sim_data[name])
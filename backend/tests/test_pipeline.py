@@ -0,0 +1,61 @@
+"""features.pipeline against the notebook's original build_year_features (features/bench.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import bench, pipeline
+
+
+def _reference_lagged_mean(values, keys, window):
+    return values.groupby(keys).transform(lambda x: x.shift(1).rolling(window, min_periods=1).mean())
+
+
+@pytest.mark.parametrize("window", [1, 3, 5, 10])
+def test_lagged_rolling_mean_matches_groupby(window):
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.integers(1, 21, 400).astype(float))
+    values[rng.random(400) < 0.1] = np.nan
+    keys = pd.Series(rng.choice(["VER", "LEC", "NOR", "PIA", None], 400))
+
+    expected = _reference_lagged_mean(values, keys, window)
+    np.testing.assert_allclose(pipeline.lagged_rolling_mean(values, keys, window), expected, rtol=0, atol=1e-12)
+
+
+def test_group_cumcount_matches_groupby():
+    keys = pd.Series(["b", "a", "b", "c", "a", "b"])
+    assert pipeline.group_cumcount(keys).tolist() == keys.to_frame().groupby(0).cumcount().tolist()
+
+
+def test_dnf_flag():
+    status = pd.Series(["Finished", "+1 Lap", "+3 Laps", "Accident", "Engine", "Disqualified", None])
+    expected = status.apply(lambda x: 0 if x == 'Finished' or '+' in str(x) else 1)
+    assert pipeline.dnf_flag(status).tolist() == expected.tolist() == [0, 0, 0, 1, 1, 1, 1]
+
+
+def test_home_race_flag():
+    df = pd.DataFrame({
+        'driver' : ["LEC", "LEC", "VER", "XXX"],
+        'circuit': ["Circuit de Monaco", "Silverstone Circuit", "Circuit Zandvoort", "Circuit de Monaco"],
+    })
+    assert pipeline.home_race_flag(df).tolist() == [1, 0, 1, 0]
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    """Four seasons replayed from the real raw store, so one source season appears under two years."""
+    data_dir = tmp_path_factory.mktemp("raw")
+    return bench.synthesise(data_dir, 4), data_dir
+
+
+def test_build_master_matches_the_notebook(history):
+    years, data_dir = history
+    ref = bench.reference_build_master(years, data_dir)
+    new = pipeline.build_master(years, data_dir=data_dir, workers=1)
+    assert pipeline.max_difference(ref, new) < 1e-9
+
+
+def test_parallel_chunks_match_one_pass(history):
+    years, data_dir = history
+    one = pipeline.build_master(years, data_dir=data_dir, workers=1)
+    pd.testing.assert_frame_equal(pipeline.build_master(years, data_dir=data_dir, workers=2), one)
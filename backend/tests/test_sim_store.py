@@ -0,0 +1,109 @@
+"""simulation.store publishes: versioned array directories behind an atomically replaced manifest."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from simulation import store
+
+
+def _sim_data(seed: int, n_sims: int = 200) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        "drivers"          : ["LEC", "NOR", "VER"],
+        "rounds"           : [1, 2],
+        "race_names"       : {1: "Australian Grand Prix", 2: "Chinese Grand Prix"},
+        "N_SIMULATIONS"    : n_sims,
+        "sim_points"       : rng.integers(0, 50, (n_sims, 3)).astype(np.float32),
+        "sim_wins"         : rng.integers(0, 2, (n_sims, 3)).astype(np.int16),
+        "pos_distribution" : rng.random((3, 2, 3)),
+        "seed"             : seed,
+    }
+
+
+def _assert_loads(path, sim_data):
+    loaded = store.load_sim_store(path, verify=True)
+    for name in ("sim_points", "sim_wins", "pos_distribution"):
+        np.testing.assert_array_equal(loaded[name], sim_data[name])
+    assert loaded["seed"] == sim_data["seed"]
+    return loaded
+
+
+def _versions(path) -> set:
+    return {p.name for p in path.iterdir() if p.is_dir()}
+
+
+def test_round_trip(tmp_path):
+    data = _sim_data(1)
+    manifest = store.save_sim_store(data, tmp_path)
+    loaded = _assert_loads(tmp_path, data)
+    assert loaded["version"] == manifest["content_hash"]
+    np.testing.assert_array_equal(loaded["champ_winners"], np.argmax(data["sim_points"], axis=1))
+    assert len(_versions(tmp_path)) == 1
+
+
+def test_republishing_the_same_arrays_reuses_their_version(tmp_path):
+    first = store.save_sim_store(_sim_data(1), tmp_path)
+    again = store.save_sim_store(_sim_data(1), tmp_path)
+    assert again == first and len(_versions(tmp_path)) == 1
+
+
+def test_crash_before_the_switch_leaves_the_old_store(tmp_path, monkeypatch):
+    old = _sim_data(1)
+    store.save_sim_store(old, tmp_path)
+
+    def crash(src, dst):
+        raise OSError("power cut")
+    monkeypatch.setattr(store.os, "replace", crash)
+    with pytest.raises(OSError):
+        store.save_sim_store(_sim_data(2), tmp_path)
+
+    # The new arrays are on disk, but nothing points at them
+    assert len(_versions(tmp_path)) == 2
+    _assert_loads(tmp_path, old)
+
+
+def test_publish_keeps_the_replaced_version_for_readers_mid_load(tmp_path):
+    first = store.save_sim_store(_sim_data(1), tmp_path)
+    store.save_sim_store(_sim_data(2), tmp_path)
+    first_dirs = store._version_dirs(first)
+    assert first_dirs <= _versions(tmp_path)
+
+    third = _sim_data(3)
+    store.save_sim_store(third, tmp_path)
+    assert not first_dirs & _versions(tmp_path)
+    assert len(_versions(tmp_path)) == 2
+    _assert_loads(tmp_path, third)
+
+
+def test_flat_store_loads_and_is_pruned_after_two_publishes(tmp_path):
+    # The layout before version directories: arrays next to the manifest
+    legacy = _sim_data(1)
+    manifest = store.save_sim_store(legacy, tmp_path)
+    (version,) = _versions(tmp_path)
+    for entry in manifest["arrays"].values():
+        os.replace(tmp_path / entry["file"], tmp_path / os.path.basename(entry["file"]))
+        entry["file"] = os.path.basename(entry["file"])
+    (tmp_path / version).rmdir()
+    (tmp_path / store.MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+    _assert_loads(tmp_path, legacy)
+
+    store.save_sim_store(_sim_data(2), tmp_path)
+    assert list(tmp_path.glob("*.npy"))
+    newest = _sim_data(3)
+    store.save_sim_store(newest, tmp_path)
+    assert not list(tmp_path.glob("*.npy"))
+    _assert_loads(tmp_path, newest)
+
+
+def test_every_publish_changes_the_watch_stamp(tmp_path, monkeypatch):
+    from tools import data_loader
+    monkeypatch.setattr(data_loader, "SIM_PATH", tmp_path)
+
+    store.save_sim_store(_sim_data(1), tmp_path)
+    seen = data_loader.watch_stamp()
+    # Same sizes, likely the same mtime tick — the replaced manifest is a new inode
+    store.save_sim_store(_sim_data(2), tmp_path)
+    assert data_loader.watch_stamp() != seen
@@ -0,0 +1,74 @@
+"""simulation.trees parity with LGBMRegressor.predict on small synthetic models."""
+
+import numpy as np
+import pytest
+
+lightgbm = pytest.importorskip("lightgbm")
+
+from simulation import trees  # noqa: E402
+
+N_FEATURES = 6
+
+
+def _data(n: int, seed: int = 0, nan_frac: float = 0.0, zero_frac: float = 0.0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, N_FEATURES))
+    X[rng.random(X.shape) < zero_frac] = 0.0
+    X[rng.random(X.shape) < nan_frac] = np.nan
+    y = np.nan_to_num(X[:, 0] * 3 - X[:, 1] ** 2 + np.sin(X[:, 2] * 2) + X[:, 3] * X[:, 4]) \
+        + rng.normal(scale=0.1, size=n)
+    return X, y
+
+
+def _fit(X, y, **params):
+    model = lightgbm.LGBMRegressor(n_estimators=40, min_child_samples=5, verbose=-1, **params)
+    return model.fit(X, y)
+
+
+def _assert_parity(model, X):
+    # Same leaves everywhere; only the order the leaf values are summed in differs
+    ensemble = trees.export(model)
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X), rtol=0, atol=1e-12)
+
+
+def test_plain_rows():
+    X, y = _data(2000)
+    _assert_parity(_fit(X, y, num_leaves=31), _data(3000, seed=1)[0])
+
+
+def test_nan_inputs():
+    X, y = _data(2000, nan_frac=0.1)
+    model = _fit(X, y, num_leaves=31)
+    X_test, _ = _data(3000, seed=1, nan_frac=0.2)
+    _assert_parity(model, X_test)
+    # NaN in a feature that had none at training time follows the default direction
+    X_test[:, 0] = np.nan
+    _assert_parity(model, X_test)
+
+
+def test_zero_as_missing():
+    X, y = _data(2000, zero_frac=0.15, nan_frac=0.05)
+    model = _fit(X, y, num_leaves=31, zero_as_missing=True)
+    _assert_parity(model, _data(3000, seed=1, zero_frac=0.2, nan_frac=0.05)[0])
+
+
+def test_trees_over_64_leaves():
+    X, y = _data(6000)
+    model = _fit(X, y, num_leaves=120, max_depth=-1)
+    assert max(t["num_leaves"] for t in model.booster_.dump_model()["tree_info"]) > 64
+    _assert_parity(model, _data(3000, seed=1, nan_frac=0.05)[0])
+
+
+def test_random_forest_averaging():
+    X, y = _data(2000)
+    model = _fit(X, y, boosting_type="rf", num_leaves=31, bagging_fraction=0.7, bagging_freq=1)
+    _assert_parity(model, _data(3000, seed=1)[0])
+
+
+def test_saved_ensemble_predicts_the_same(tmp_path):
+    X, y = _data(2000, nan_frac=0.05)
+    model = _fit(X, y, num_leaves=31)
+    ensemble = trees.export(model)
+    loaded = trees.load(ensemble.save(tmp_path / "trees.npz"))
+    X_test = _data(500, seed=1, nan_frac=0.1)[0]
+    np.testing.assert_array_equal(loaded.predict(X_test), ensemble.predict(X_test))
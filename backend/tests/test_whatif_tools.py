@@ -0,0 +1,16 @@
+"""tools.whatif_tools argument checks."""
+
+import pytest
+
+from tools.whatif_tools import simulate_what_if
+
+
+@pytest.mark.parametrize("seed", [True, False, -1, 1.5, "7", None])
+def test_bad_seeds_are_rejected(seed):
+    result = simulate_what_if(dnf_rate={"Ferrari": 0.05}, n_sims=100, seed=seed)
+    assert result["error"].startswith("seed must be a non-negative integer")
+
+
+def test_seed_zero_runs():
+    result = simulate_what_if(dnf_rate={"Ferrari": 0.05}, n_sims=100, seed=0)
+    assert "error" not in result
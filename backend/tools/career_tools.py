@@ -2,16 +2,53 @@
 career_tools.py
 Fetches career stats from the Jolpica F1 API (free, no auth required).
 Aggregates: wins, podiums, poles, fastest laps, points, starts, DNFs, championships.
-Results are cached in memory — career stats don't change mid-session.
+
+Lookups go memory → SQLite → Jolpica:
+  • one long-lived pooled httpx client (keep-alive, bounded connections),
+    paced by a token bucket at JOLPICA_RATE requests/s per process; a 429
+    pauses every request for its Retry-After, and 429s, 5xx and transport
+    errors are retried up to JOLPICA_RETRIES times
+  • concurrent lookups for the same driver share one fetch (single-flight)
+  • per-season totals persist in SQLite, so restarts and other workers
+    reuse them; fresh for CAREER_TTL_S, then served stale for up to
+    CAREER_STALE_S while a background refresh re-fetches just the current
+    season (and whenever Jolpica is failing)
+  • warm_career_cache() prefetches every DRIVER_ID_MAP entry at startup
+Point JOLPICA_BASE at tools/jolpica_mock.py to run offline.
 """
 
-import httpx
 import asyncio
-from functools import lru_cache
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
 from typing import Optional
 
+import httpx
+
+from metrics import CACHE_REQUESTS, JOLPICA_RESPONSES, JOLPICA_SECONDS, timed_tool
+from tools.rate_limit import TokenBucket, retry_after
+
 # ── JOLPICA BASE URL ──────────────────────────────────────────
-BASE = "https://api.jolpi.ca/ergast/f1"
+BASE = os.getenv("JOLPICA_BASE", "https://api.jolpi.ca/ergast/f1")
+PAGE_LIMIT = 100   # Jolpica's maximum page size
+
+# ── CACHE SETTINGS ────────────────────────────────────────────
+CAREER_CACHE_PATH = Path(os.getenv(
+    "CAREER_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent.parent / "data" / "cache" / "career_stats.sqlite"),
+))
+CAREER_TTL_S               = float(os.getenv("CAREER_TTL_S", str(24 * 3600)))
+CAREER_STALE_S             = float(os.getenv("CAREER_STALE_S", str(7 * 24 * 3600)))
+JOLPICA_MAX_CONNECTIONS    = int(os.getenv("JOLPICA_MAX_CONNECTIONS", "8"))
+# Jolpica allows 4 req/s — per process, so lower it when running several workers
+JOLPICA_RATE               = float(os.getenv("JOLPICA_RATE", "4"))
+JOLPICA_RETRIES            = int(os.getenv("JOLPICA_RETRIES", "4"))
+JOLPICA_MAX_RETRY_WAIT_S   = 30.0   # longest Retry-After honoured before giving up
+CAREER_WARMUP_CONCURRENCY  = int(os.getenv("CAREER_WARMUP_CONCURRENCY", "4"))
+CURRENT_SEASON             = int(os.getenv("CURRENT_SEASON", str(date.today().year)))
 
 # ── DRIVER CODE → JOLPICA ID MAP ─────────────────────────────
 # Jolpica uses full surname slugs, not 3-letter codes
@@ -67,76 +104,306 @@ DRIVER_META = {
     "LIN": {"number": 6,  "nationality": "British",    "dob": "2007-05-06", "debut": 2026, "name": "Arvid Lindblad"},
 }
 
-# ── IN-MEMORY CACHE ───────────────────────────────────────────
-_career_cache: dict = {}
+class CareerFetchError(Exception):
+    """Raised when Jolpica can't supply a driver's full career."""
+
 
-async def fetch_json(client: httpx.AsyncClient, url: str) -> dict:
-    """Fetch JSON from Jolpica with timeout and error handling."""
+# ── HTTP CLIENT ───────────────────────────────────────────────
+_client: httpx.AsyncClient | None = None
+_client_loop = None
+_transport = None
+_bucket: TokenBucket | None = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared pooled client and rate limiter, (re)created for the running event loop."""
+    global _client, _client_loop, _bucket
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=JOLPICA_MAX_CONNECTIONS,
+                                max_keepalive_connections=JOLPICA_MAX_CONNECTIONS),
+            transport=_transport,
+        )
+        _bucket = TokenBucket(JOLPICA_RATE, max(1, int(JOLPICA_RATE)))
+        _client_loop = loop
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+async def reset_client(transport: httpx.AsyncBaseTransport | None = None):
+    """Swap the transport the client uses (e.g. httpx.ASGITransport over the mock)."""
+    global _transport
+    await close_client()
+    _transport = transport
+
+
+async def _get(url: str) -> httpx.Response | None:
+    """One paced request, timed; None on a transport error."""
+    client = get_client()
+    await _bucket.acquire()
+    started, status = time.perf_counter(), "error"
     try:
-        r = await client.get(url, timeout=10.0)
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        print(f"[career_tools] fetch error: {url} → {e}")
-        return {}
+        r = await client.get(url)
+        status = str(r.status_code)
+        return r
+    except httpx.TransportError as e:
+        print(f"[career_tools] fetch error: {url} → {e!r}")
+        return None
+    finally:
+        JOLPICA_SECONDS.observe(time.perf_counter() - started)
+        JOLPICA_RESPONSES.inc(status)
 
-async def get_career_stats(driver_code: str) -> Optional[dict]:
+async def fetch_json(url: str) -> dict | None:
     """
-    Fetch and aggregate career stats for a driver from Jolpica.
-    Returns cached result if available.
+    Fetch JSON from Jolpica. 429s (after their Retry-After, which pauses
+    every request), 5xx and transport errors are retried; None once the
+    retries run out or on any other error.
     """
-    code = driver_code.upper()
+    for attempt in range(JOLPICA_RETRIES + 1):
+        r = await _get(url)
+        if r is not None and r.status_code == 429:
+            wait = retry_after(r, default=2.0 * (attempt + 1))
+            if wait > JOLPICA_MAX_RETRY_WAIT_S:
+                break
+            _bucket.pause(wait)   # the next acquire() waits it out
+            continue
+        if r is None or r.status_code >= 500:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            continue
+        try:
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            print(f"[career_tools] fetch error: {url} → {e}")
+            return None
+    print(f"[career_tools] fetch failed after {attempt + 1} attempts: {url}")
+    return None
+
+async def fetch_all(url: str) -> list:
+    """Every race on a paged Jolpica endpoint — first page, then the rest concurrently."""
+    first = await fetch_json(f"{url}?limit={PAGE_LIMIT}")
+    if first is None:
+        raise CareerFetchError(url)
+    pages = [first]
+    total = int(first.get("MRData", {}).get("total", 0))
+    if total > PAGE_LIMIT:
+        rest = await asyncio.gather(*(
+            fetch_json(f"{url}?limit={PAGE_LIMIT}&offset={offset}")
+            for offset in range(PAGE_LIMIT, total, PAGE_LIMIT)
+        ))
+        if any(page is None for page in rest):
+            raise CareerFetchError(url)
+        pages += rest
+    return pages
+
 
-    # Return cached if available
-    if code in _career_cache:
-        return _career_cache[code]
+# ── PERSISTENT CACHE (SQLite) ─────────────────────────────────
+# One row per driver-season. Finished seasons never change, so a refresh
+# only re-fetches the seasons still in progress and folds them in.
+SEASON_FIELDS = ("wins", "podiums", "poles", "fastest_laps", "points", "starts", "dnfs")
 
-    jolpica_id = DRIVER_ID_MAP.get(code)
+def _db() -> sqlite3.Connection:
+    CAREER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CAREER_CACHE_PATH, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS career_season (code TEXT NOT NULL, season INTEGER NOT NULL, "
+        + ", ".join(f"{f} {'REAL' if f == 'points' else 'INTEGER'} NOT NULL" for f in SEASON_FIELDS)
+        + ", champion INTEGER NOT NULL, complete INTEGER NOT NULL, PRIMARY KEY (code, season))"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS career_fetch (code TEXT PRIMARY KEY, fetched_at REAL NOT NULL)")
+    return conn
+
+def _db_get(code: str) -> tuple[float, dict] | None:
+    with _db() as conn:
+        fetched = conn.execute("SELECT fetched_at FROM career_fetch WHERE code = ?", (code,)).fetchone()
+        if fetched is None:
+            return None
+        rows = conn.execute(
+            f"SELECT season, {', '.join(SEASON_FIELDS)}, champion, complete "
+            "FROM career_season WHERE code = ?", (code,)
+        ).fetchall()
+    seasons = {}
+    for season, *values in rows:
+        totals = dict(zip(SEASON_FIELDS, values[:-2]))
+        totals["champion"], totals["complete"] = bool(values[-2]), bool(values[-1])
+        seasons[season] = totals
+    return fetched[0], seasons
+
+def _db_put(code: str, fetched_at: float, seasons: dict):
+    """Upsert the given seasons and stamp the driver's fetch time."""
+    with _db() as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO career_season VALUES ({', '.join('?' * (len(SEASON_FIELDS) + 4))})",
+            [(code, season, *(t[f] for f in SEASON_FIELDS), int(t["champion"]), int(t["complete"]))
+             for season, t in seasons.items()],
+        )
+        conn.execute("INSERT OR REPLACE INTO career_fetch VALUES (?, ?)", (code, fetched_at))
+
+def _db_clear():
+    with _db() as conn:
+        conn.execute("DELETE FROM career_season")
+        conn.execute("DELETE FROM career_fetch")
+
+
+# ── CACHE LOOKUP ──────────────────────────────────────────────
+_career_cache: dict = {}              # code → (fetched_at, {season: totals})
+_inflight: dict = {}                  # code → asyncio.Task
+
+async def _refresh(code: str) -> dict:
+    entry = _career_cache.get(code)
+    known = entry[1] if entry else {}
+    updated = await _fetch_seasons(code, known)
+    seasons = {**known, **updated}
+    fetched_at = time.time()
+    _career_cache[code] = (fetched_at, seasons)
+    await asyncio.to_thread(_db_put, code, fetched_at, updated)
+    return seasons
+
+def _single_flight(code: str) -> asyncio.Task:
+    """The in-flight refresh for code, starting one if there isn't any."""
+    task = _inflight.get(code)
+    if task is None:
+        task = asyncio.create_task(_refresh(code))
+        _inflight[code] = task
+
+        def done(t: asyncio.Task):
+            _inflight.pop(code, None)
+            if not t.cancelled() and t.exception() is not None:
+                print(f"[career_tools] refresh failed for {code}: {t.exception()!r}")
+        task.add_done_callback(done)
+    return task
+
+@timed_tool
+async def get_career_stats(driver_code: str) -> Optional[dict]:
+    """
+    Career stats for a driver, summed from per-season aggregates.
+    Serves cached results while fresh, stale ones while refreshing.
+    """
+    code = driver_code.upper()
     meta = DRIVER_META.get(code, {})
 
     # Rookies with no Jolpica data yet
-    if not jolpica_id or meta.get("debut", 2026) >= 2026:
-        result = _rookie_stats(code, meta)
-        _career_cache[code] = result
-        return result
-
-    async with httpx.AsyncClient() as client:
-        # Fetch race results (up to 1000) and qualifying results in parallel
-        results_url = f"{BASE}/drivers/{jolpica_id}/results.json?limit=1000"
-        quali_url   = f"{BASE}/drivers/{jolpica_id}/qualifying.json?limit=1000"
-        champ_url   = f"{BASE}/drivers/{jolpica_id}/driverStandings/1.json"  # seasons they finished P1
-
-        results_data, quali_data, champ_data = await asyncio.gather(
-            fetch_json(client, results_url),
-            fetch_json(client, quali_url),
-            fetch_json(client, champ_url),
+    if not DRIVER_ID_MAP.get(code) or meta.get("debut", 2026) >= 2026:
+        return _rookie_stats(code, meta)
+
+    entry = _career_cache.get(code)
+    if entry is None:
+        entry = await asyncio.to_thread(_db_get, code)
+        if entry is not None:
+            _career_cache[code] = entry
+
+    age = time.time() - entry[0] if entry else None
+    if age is not None and age < CAREER_TTL_S:
+        CACHE_REQUESTS.inc("career", "hit")
+        return _career_from_seasons(code, entry[1])
+    if age is not None and age < CAREER_TTL_S + CAREER_STALE_S:
+        CACHE_REQUESTS.inc("career", "stale")
+        _single_flight(code)             # revalidate in the background
+        return _career_from_seasons(code, entry[1])
+
+    CACHE_REQUESTS.inc("career", "miss")
+
+    try:
+        return _career_from_seasons(code, await asyncio.shield(_single_flight(code)))
+    except CareerFetchError:
+        return _career_from_seasons(code, entry[1]) if entry else None
+
+
+@timed_tool
+async def get_all_career_stats(concurrency: int = CAREER_WARMUP_CONCURRENCY) -> list:
+    """Career stats for every DRIVER_ID_MAP driver, at most `concurrency` fetching at a time."""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(code: str) -> Optional[dict]:
+        async with gate:
+            return await get_career_stats(code)
+
+    return await asyncio.gather(*(one(code) for code in DRIVER_ID_MAP))
+
+
+async def warm_career_cache(concurrency: int = CAREER_WARMUP_CONCURRENCY) -> int:
+    """Prefetch every DRIVER_ID_MAP driver. Returns how many loaded."""
+    return sum(c is not None for c in await get_all_career_stats(concurrency))
+
+
+# ── JOLPICA → PER-SEASON TOTALS ───────────────────────────────
+def _empty_season() -> dict:
+    return {**dict.fromkeys(SEASON_FIELDS, 0), "points": 0.0, "champion": False, "complete": False}
+
+def _season_totals(results_pages: list, quali_pages: list) -> dict:
+    """{season: totals} from paged results and qualifying responses."""
+    seasons: dict = {}
+    for page in results_pages:
+        for race in _race_list(page):
+            totals = seasons.setdefault(int(race["season"]), _empty_season())
+            for r in race.get("Results", []):
+                status = r.get("status", "")
+                totals["starts"]       += 1
+                totals["wins"]         += r.get("position") == "1"
+                totals["podiums"]      += r.get("position") in ("1", "2", "3")
+                totals["points"]       += float(r.get("points", 0))
+                totals["dnfs"]         += status.lower() != "finished" and not status.startswith("+")
+                totals["fastest_laps"] += r.get("FastestLap", {}).get("rank") == "1"
+    for page in quali_pages:
+        for race in _race_list(page):
+            totals = seasons.setdefault(int(race["season"]), _empty_season())
+            # Pole = P1 in qualifying
+            totals["poles"] += sum(1 for q in race.get("QualifyingResults", []) if q.get("position") == "1")
+    return seasons
+
+async def _fetch_seasons(code: str, known: dict) -> dict:
+    """
+    Per-season totals from Jolpica: the whole career on first load, then
+    only CURRENT_SEASON plus any season stored before it had finished.
+    Raises CareerFetchError if any part fails.
+    """
+    jolpica_id = DRIVER_ID_MAP[code]
+
+    if not known:
+        # Race results and qualifying (every page) and titles in parallel
+        results_pages, quali_pages, champ_data = await asyncio.gather(
+            fetch_all(f"{BASE}/drivers/{jolpica_id}/results.json"),
+            fetch_all(f"{BASE}/drivers/{jolpica_id}/qualifying.json"),
+            fetch_json(f"{BASE}/drivers/{jolpica_id}/driverStandings/1.json"),  # seasons they finished P1
         )
+        if champ_data is None:
+            raise CareerFetchError(f"driverStandings for {jolpica_id}")
+        seasons = _season_totals(results_pages, quali_pages)
+        titles  = {int(s) for s in _extract_seasons(champ_data)}
+        for season, totals in seasons.items():
+            totals["champion"] = season in titles
+    else:
+        pending = sorted({s for s, t in known.items() if not t["complete"]} | {CURRENT_SEASON})
 
-    # ── Aggregate race results ────────────────────────────────
-    races      = _extract_races(results_data)
-    wins       = sum(1 for r in races if r.get("position") == "1")
-    podiums    = sum(1 for r in races if r.get("position") in ("1", "2", "3"))
-    points_sum = sum(float(r.get("points", 0)) for r in races)
-    starts     = len(races)
-    dnfs       = sum(
-        1 for r in races
-        if r.get("status", "").lower() not in ("finished",)
-        and not r.get("status", "").startswith("+")
-    )
-    fastest_laps = sum(
-        1 for r in races
-        if r.get("FastestLap", {}).get("rank") == "1"
-    )
+        async def one(season: int) -> dict:
+            results_pages, quali_pages, standing = await asyncio.gather(
+                fetch_all(f"{BASE}/{season}/drivers/{jolpica_id}/results.json"),
+                fetch_all(f"{BASE}/{season}/drivers/{jolpica_id}/qualifying.json"),
+                fetch_json(f"{BASE}/{season}/drivers/{jolpica_id}/driverStandings.json"),
+            )
+            if standing is None:
+                raise CareerFetchError(f"{season} driverStandings for {jolpica_id}")
+            totals = _season_totals(results_pages, quali_pages).get(season, _empty_season())
+            totals["champion"] = _standing_position(standing) == "1"
+            return totals
 
-    # ── Aggregate qualifying (pole = P1) ──────────────────────
-    quali_races = _extract_quali(quali_data)
-    poles = sum(1 for q in quali_races if q.get("position") == "1")
+        seasons = dict(zip(pending, await asyncio.gather(*(one(s) for s in pending))))
 
-    # ── Championships ─────────────────────────────────────────
-    seasons_p1 = _extract_seasons(champ_data)
-    championships = len(seasons_p1)
+    for season, totals in seasons.items():
+        totals["complete"] = season < CURRENT_SEASON
+    return seasons
 
-    result = {
+def _career_from_seasons(code: str, seasons: dict) -> dict:
+    meta   = DRIVER_META.get(code, {})
+    totals = {f: sum(s[f] for s in seasons.values()) for f in SEASON_FIELDS}
+    starts, wins, podiums = totals["starts"], totals["wins"], totals["podiums"]
+    return {
         "code":          code,
         "name":          meta.get("name", code),
         "number":        meta.get("number"),
@@ -144,21 +411,23 @@ async def get_career_stats(driver_code: str) -> Optional[dict]:
         "dob":           meta.get("dob"),
         "debut":         meta.get("debut"),
         # Career stats
-        "championships": championships,
+        "championships": sum(s["champion"] for s in seasons.values()),
         "wins":          wins,
         "podiums":       podiums,
-        "poles":         poles,
-        "fastest_laps":  fastest_laps,
-        "points":        round(points_sum, 1),
+        "poles":         totals["poles"],
+        "fastest_laps":  totals["fastest_laps"],
+        "points":        round(totals["points"], 1),
         "starts":        starts,
-        "dnfs":          dnfs,
+        "dnfs":          totals["dnfs"],
         "win_rate":      round(wins / starts * 100, 1) if starts > 0 else 0,
         "podium_rate":   round(podiums / starts * 100, 1) if starts > 0 else 0,
+        "seasons":       [
+            {"season": season, **{f: seasons[season][f] for f in SEASON_FIELDS},
+             "points": round(seasons[season]["points"], 1), "champion": seasons[season]["champion"]}
+            for season in sorted(seasons)
+        ],
     }
 
-    _career_cache[code] = result
-    return result
-
 
 def _rookie_stats(code: str, meta: dict) -> dict:
     """Return zeroed stats for rookies with no Jolpica history."""
@@ -179,48 +448,16 @@ def _rookie_stats(code: str, meta: dict) -> dict:
         "dnfs":          0,
         "win_rate":      0,
         "podium_rate":   0,
+        "seasons":       [],
     }
 
 
-def _extract_races(data: dict) -> list:
+def _race_list(data: dict) -> list:
     try:
         return data["MRData"]["RaceTable"]["Races"]
     except (KeyError, TypeError):
         return []
 
-    # Flatten results from each race
-    flat = []
-    for race in _extract_races(data):
-        for res in race.get("Results", []):
-            flat.append(res)
-    return flat
-
-
-def _extract_races(data: dict) -> list:
-    """Extract flat list of result objects from Jolpica race response."""
-    try:
-        races = data["MRData"]["RaceTable"]["Races"]
-    except (KeyError, TypeError):
-        return []
-    flat = []
-    for race in races:
-        for res in race.get("Results", []):
-            flat.append(res)
-    return flat
-
-
-def _extract_quali(data: dict) -> list:
-    """Extract flat list of qualifying objects from Jolpica quali response."""
-    try:
-        races = data["MRData"]["RaceTable"]["Races"]
-    except (KeyError, TypeError):
-        return []
-    flat = []
-    for race in races:
-        for res in race.get("QualifyingResults", []):
-            flat.append(res)
-    return flat
-
 
 def _extract_seasons(data: dict) -> list:
     """Extract list of seasons where driver finished P1 in championship."""
@@ -231,7 +468,15 @@ def _extract_seasons(data: dict) -> list:
         return []
 
 
+def _standing_position(data: dict) -> str | None:
+    """Driver's championship position from a single-season standings response."""
+    try:
+        return data["MRData"]["StandingsTable"]["StandingsLists"][0]["DriverStandings"][0]["position"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
 def clear_cache():
-    """Clear the career cache (e.g. after a race weekend)."""
-    global _career_cache
-    _career_cache = {}
\ No newline at end of file
+    """Clear the career cache, in memory and on disk (forces a full re-fetch)."""
+    _career_cache.clear()
+    _db_clear()
@@ -1,70 +1,82 @@
-from strands import tool
-from .data_loader import (
-    DRIVERS, RACE_NAMES, SIM_POINTS, SIM_WINS,
-    N_SIMS, TEAM_MAP, DRIVER_NAMES, CHAMP_WINNERS
-)
-import numpy as np
+from .data_loader import DataSnapshot, snapshot
+from simulation.summary import SimSummary
+from metrics import timed_tool
 
-@tool
-def get_championship_standings() -> dict:
-    """
-    Returns the full 2026 predicted drivers championship standings.
-    Includes avg points, championship win %, race win %, floor and ceiling.
-    """
+def standings_from_summary(summary: SimSummary, snap: DataSnapshot) -> list:
+    """Driver standings rows from a simulation summary, sorted by avg points."""
     results = []
-    for i, driver in enumerate(DRIVERS):
-        champ_wins = int(np.sum(CHAMP_WINNERS == i))
+    for i, driver in enumerate(snap.drivers):
         results.append({
-            "position"   : 0,
-            "driver"     : driver,
-            "full_name"  : DRIVER_NAMES.get(driver, driver),
-            "team"       : TEAM_MAP.get(driver, "Unknown"),
-            "avg_points" : round(float(SIM_POINTS[:, i].mean()), 1),
-            "champ_pct"  : round(champ_wins / N_SIMS * 100, 1),
-            "win_pct"    : round(float(SIM_WINS[i]) / (N_SIMS * 24) * 100, 1),
-            "min_points" : round(float(SIM_POINTS[:, i].min()), 0),
-            "max_points" : round(float(SIM_POINTS[:, i].max()), 0),
-            "std"        : round(float(SIM_POINTS[:, i].std()), 1),
+            "position"      : 0,
+            "driver"        : driver,
+            "full_name"     : snap.driver_names.get(driver, driver),
+            "team"          : snap.team_map.get(driver, "Unknown"),
+            "avg_points"    : round(float(summary.avg_points[i]), 1),
+            "champ_pct"     : round(float(summary.champ_pct[i]), 1),
+            "win_pct"       : round(float(summary.win_pct[i]), 1),
+            "avg_points_ci" : round(float(summary.avg_points_ci[i]), 1),
+            "champ_pct_ci"  : round(float(summary.champ_pct_ci[i]), 2),
+            "min_points"    : round(float(summary.min_points[i]), 0),
+            "max_points"    : round(float(summary.max_points[i]), 0),
+            "std"           : round(float(summary.std_points[i]), 1),
         })
 
     results.sort(key=lambda x: x["avg_points"], reverse=True)
     for i, r in enumerate(results):
         r["position"] = i + 1
+    return results
 
-    return {"standings": results}
 
+def precision_from_summary(summary: SimSummary, report: dict | None = None) -> dict:
+    """How many sims back the numbers, and the confidence level of the ± fields."""
+    return {
+        "n_sims"     : summary.n_sims,
+        "confidence" : summary.confidence,
+        **({"converged": report["converged"], "tolerances": report["tolerances"]} if report else {}),
+    }
 
-@tool
-def get_constructors_standings() -> dict:
+
+@timed_tool
+def get_championship_standings(after_round: int | None = None) -> dict:
     """
-    Returns the 2026 predicted constructors championship standings.
+    Returns the full 2026 predicted drivers championship standings.
+    Includes avg points, championship win %, race win %, floor and ceiling;
+    *_ci fields are the ± sampling error (95% unless precision says otherwise).
+    Pass after_round=N once the season has started to fix rounds 1..N to the
+    actual results and simulate only the remaining races.
     """
-    team_points = {}
-    team_wins   = {}
+    snap = snapshot()
+    try:
+        after_round = snap.conditioned_round(after_round)
+        sim = snap.sim_results(after_round) if after_round else None
+    except ValueError as e:
+        return {"error": str(e)}
+    if not after_round:
+        return {"standings": standings_from_summary(snap.summary, snap),
+                "precision": precision_from_summary(snap.summary, snap.precision)}
 
-    for i, driver in enumerate(DRIVERS):
-        team = TEAM_MAP.get(driver, "Unknown")
-        if team not in team_points:
-            team_points[team] = np.zeros(N_SIMS)
-            team_wins[team]   = 0
-        team_points[team] += SIM_POINTS[:, i]
-        team_wins[team]   += int(SIM_WINS[i])
+    return {
+        "after_round" : after_round,
+        "standings"   : standings_from_summary(sim["summary"], snap),
+        "precision"   : precision_from_summary(sim["summary"]),
+    }
 
-    stacked = np.stack(list(team_points.values()), axis=1)
-    team_champ_idx = np.argmax(stacked, axis=1)
-    team_list = list(team_points.keys())
 
+@timed_tool
+def get_constructors_standings() -> dict:
+    """
+    Returns the 2026 predicted constructors championship standings.
+    """
+    summary = snapshot().summary
     results = []
-    for idx, team in enumerate(team_list):
-        pts = team_points[team]
-        champ_count = int(np.sum(team_champ_idx == idx))
+    for idx, team in enumerate(summary.teams):
         results.append({
             "team"       : team,
-            "avg_points" : round(float(pts.mean()), 1),
-            "champ_pct"  : round(champ_count / N_SIMS * 100, 1),
-            "min_points" : round(float(pts.min()), 0),
-            "max_points" : round(float(pts.max()), 0),
-            "drivers"    : [d for d in DRIVERS if TEAM_MAP.get(d) == team],
+            "avg_points" : round(float(summary.team_avg_points[idx]), 1),
+            "champ_pct"  : round(float(summary.team_champ_pct[idx]), 1),
+            "min_points" : round(float(summary.team_min_points[idx]), 0),
+            "max_points" : round(float(summary.team_max_points[idx]), 0),
+            "drivers"    : list(summary.team_drivers[team]),
         })
 
     results.sort(key=lambda x: x["avg_points"], reverse=True)
@@ -74,23 +86,25 @@ def get_constructors_standings() -> dict:
     return {"constructors": results}
 
 
-@tool
+@timed_tool
 def get_title_contenders() -> dict:
     """
     Returns drivers with a realistic championship probability > 0%.
     """
+    snap = snapshot()
+    summary = snap.summary
     contenders = []
-    for i, driver in enumerate(DRIVERS):
-        champ_wins = int(np.sum(CHAMP_WINNERS == i))
-        if champ_wins > 0:
+    for i, driver in enumerate(snap.drivers):
+        if summary.champ_counts[i] > 0:
             contenders.append({
-                "driver"     : driver,
-                "full_name"  : DRIVER_NAMES.get(driver, driver),
-                "team"       : TEAM_MAP.get(driver, "Unknown"),
-                "champ_pct"  : round(champ_wins / N_SIMS * 100, 1),
-                "avg_points" : round(float(SIM_POINTS[:, i].mean()), 1),
-                "win_pct"    : round(float(SIM_WINS[i]) / (N_SIMS * 24) * 100, 1),
+                "driver"       : driver,
+                "full_name"    : snap.driver_names.get(driver, driver),
+                "team"         : snap.team_map.get(driver, "Unknown"),
+                "champ_pct"    : round(float(summary.champ_pct[i]), 1),
+                "champ_pct_ci" : round(float(summary.champ_pct_ci[i]), 2),
+                "avg_points"   : round(float(summary.avg_points[i]), 1),
+                "win_pct"      : round(float(summary.win_pct[i]), 1),
             })
 
     contenders.sort(key=lambda x: x["champ_pct"], reverse=True)
-    return {"contenders": contenders}
\ No newline at end of file
+    return {"contenders": contenders, "precision": precision_from_summary(summary, snap.precision)}
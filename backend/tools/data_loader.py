@@ -1,76 +1,408 @@
 # ================================================================
 # SHARED DATA LOADER — all agents import from here
 # ================================================================
-import pickle
+# Everything loaded from disk lives in one immutable DataSnapshot. Tools
+# take snapshot() once per call and read only from it, so a reload swaps
+# in a complete new snapshot atomically: calls already running finish on
+# the old one, and caches keyed by snapshot().version drop themselves.
+import csv
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future
 import numpy as np
-import pandas as pd
 from pathlib import Path
 import os
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
+logger = logging.getLogger(__name__)
+
 # ── Resolve data directory relative to this file (backend/tools/data_loader.py)
 # Works regardless of the working directory uvicorn is launched from
 _HERE     = Path(__file__).resolve().parent          # backend/tools/
 _DATA_DIR = _HERE.parent.parent / "data"             # project_root/data/
 
-# ── Load simulation data ─────────────────────────────────────────
-SIM_PATH = Path(os.getenv("SIM_DATA_PATH", str(_DATA_DIR / "predictions" / "sim_data.pkl")))
-
-with open(SIM_PATH, "rb") as f:
-    sim_data = pickle.load(f)
+# Memory-mapped store (see simulation/store.py) — workers share pages via
+# the OS page cache and nothing is unpickled from a configurable path
+from simulation.store import MANIFEST, load_sim_store
+# Parquet sibling when present (tools/raw_store.py), only the columns used
+from tools import raw_store
+from simulation.summary import DEFAULT_CONFIDENCE, build_summary
 
-DRIVERS          = sim_data["drivers"]
-ROUNDS           = sim_data["rounds"]
-RACE_NAMES       = sim_data["race_names"]        # {round: name}
-POS_DIST         = sim_data["pos_distribution"]  # (22, 24, 20)
-SIM_POINTS       = sim_data["sim_points"]        # (10000, 22)
-SIM_WINS         = sim_data["sim_wins"]
-N_SIMS           = sim_data["N_SIMULATIONS"]
-
-POINTS_MAP = {1:25, 2:18, 3:15, 4:12, 5:10, 6:8, 7:6, 8:4, 9:2, 10:1}
-
-# ── Pull team map directly from 2026 features ───────────────────
+SIM_PATH           = Path(os.getenv("SIM_DATA_PATH", str(_DATA_DIR / "predictions" / "sim_store")))
 FEATURES_2026_PATH = Path(os.getenv("FEATURES_2026_PATH", str(_DATA_DIR / "features_2026.csv")))
-df_2026 = pd.read_csv(FEATURES_2026_PATH)
-TEAM_MAP = dict(zip(df_2026['driver'], df_2026['team_2026']))
-
+DRIVER_NAMES_YEAR  = int(os.getenv("DRIVER_NAMES_YEAR", "2025"))
+MASTER_FEATURES_PATH = Path(os.getenv("MASTER_FEATURES_PATH", str(_DATA_DIR / "master_features_all.csv")))
+# Same schema as race_results_YYYY.csv; only year/round/driver/finish_position are used
+ACTUAL_RESULTS_PATH = Path(os.getenv("ACTUAL_RESULTS_PATH", str(_DATA_DIR / "race_results_2026.csv")))
 
-# ── Pull driver names from 2025 race results ─────────────────────
-RESULTS_PATH = Path(os.getenv("RESULTS_PATH", str(_DATA_DIR / "race_results_2025.csv")))
-df_results = pd.read_csv(RESULTS_PATH)
-DRIVER_NAMES = dict(zip(df_results['driver'], df_results['driver_name']))
+POINTS_MAP = {1:25, 2:18, 3:15, 4:12, 5:10, 6:8, 7:6, 8:4, 9:2, 10:1}
 
 # ── Add manually only what's missing (BOT, PER from 2024) ────────
-DRIVER_NAMES.update({
+EXTRA_DRIVER_NAMES = {
     "BOT": "Valtteri Bottas",
     "PER": "Sergio Perez",
     "LIN": "Arvid Lindblad",   # rookie, not in 2025 data
-})
+}
+
+# ── Simulation inputs for what-if runs ───────────────────────────
+# Career DNF rates used by 04_model_training.ipynb (f1versus.com)
+CAREER_DNF_RATES = {
+    "LEC": 0.156, "HAM": 0.097, "NOR": 0.092, "PIA": 0.071, "RUS": 0.132,
+    "ANT": 0.167, "VER": 0.142, "HAD": 0.125, "ALO": 0.185, "STR": 0.168,
+    "GAS": 0.157, "COL": 0.148, "ALB": 0.178, "SAI": 0.194, "HUL": 0.201,
+    "BOR": 0.208, "OCO": 0.144, "BEA": 0.111, "LAW": 0.171, "BOT": 0.114,
+    "PER": 0.145, "LIN": 0.150,
+}
+
+# Circuits without 2025 data (Madrid is a new street circuit)
+SC_PROB_FALLBACK = {"Madrid Grand Prix": 0.7}
+
+
+class DataSnapshot:
+    """
+    One consistent load of the simulation store, the 2026 team map and the
+    driver names, plus everything derived from them. version changes with
+    any of its inputs; derived runs (engine inputs, conditioned sims,
+    outcome queries) are built lazily and cached on the snapshot itself.
+    verify re-hashes the store's arrays, catching files damaged on disk.
+    """
+
+    def __init__(self, sim_path=SIM_PATH, features_path=FEATURES_2026_PATH, data_dir=_DATA_DIR,
+                 verify: bool = False):
+        sim_data = load_sim_store(sim_path, verify=verify)
+        self.sim_data    = sim_data
+        self.drivers     = sim_data["drivers"]
+        self.rounds      = sim_data["rounds"]
+        self.race_names  = sim_data["race_names"]        # {round: name}
+        self.pos_dist    = sim_data["pos_distribution"]  # (22, 24, 20)
+        self.sim_points  = sim_data["sim_points"]        # (10000, 22)
+        self.sim_wins    = sim_data["sim_wins"]
+        self.n_sims      = sim_data["N_SIMULATIONS"]
+        self.precision   = sim_data.get("precision", {}) # run_adaptive's stopping report, if it made this run
+
+        # ── Team map directly from 2026 features ─────────────────
+        self.features_2026 = raw_store.read_frame_arrow(
+            features_path, columns=["driver", "team_2026", "combined_pace_gap_s"]).to_pydict()
+        self.team_map = dict(zip(self.features_2026["driver"], self.features_2026["team_2026"]))
+
+        # ── Driver names from 2025 race results ──────────────────
+        # Raw store: one year partition, two columns (legacy CSV until migrated)
+        names = raw_store.read_arrow("race_results", years=[DRIVER_NAMES_YEAR],
+                                     columns=["driver", "driver_name"], data_dir=data_dir).to_pydict()
+        self.driver_names = {**dict(zip(names["driver"], names["driver_name"])), **EXTRA_DRIVER_NAMES}
+
+        # ── Championship winner per simulation ───────────────────
+        self.champ_winners = sim_data["champ_winners"] if "champ_winners" in sim_data \
+            else np.argmax(self.sim_points, axis=1)
+
+        # ── Precomputed summary — tools serve lookups from this ─
+        self.summary = build_summary(self.sim_points, self.sim_wins, self.pos_dist, self.drivers,
+                                     self.team_map, self.champ_winners,
+                                     confidence=self.precision.get("confidence", DEFAULT_CONFIDENCE))
+
+        # Store content hash (from the manifest) + a digest of the team/pace data
+        features = hashlib.blake2b(json.dumps(self.features_2026, sort_keys=True, default=str).encode(),
+                                   digest_size=4).hexdigest()
+        self.version = f"{sim_data['version']}-{features}"
+
+        self._lock        = threading.Lock()
+        self._sim_inputs  = None
+        self._conditioned = {}     # (after_round, results mtime) → Future of the run
+        self._completed   = None   # (results mtime, last completed round)
+        self._outcomes    = None
+
+    # ── Fuzzy driver match ───────────────────────────────────────
+    def find_driver(self, query: str) -> str | None:
+        q = query.upper().strip()
+        if q in self.drivers:
+            return q
+        for code, name in self.driver_names.items():
+            if q in name.upper() or name.upper().split()[0] in q:
+                return code
+        for d in self.drivers:
+            if q[:3] in d:
+                return d
+        return None
+
+    def find_race(self, query: str) -> tuple[int | None, str | None]:
+        q = query.strip()
+        for rnd, name in self.race_names.items():
+            if q.lower() == name.lower():
+                return rnd, name
+        return None, None
+
+    # ── Simulation inputs for what-if runs ───────────────────────
+    def sim_inputs(self) -> dict:
+        """
+        Baseline engine inputs (base_preds, sc_probs, dnf_rates, pace_gaps),
+        built once on first use. Newer sim data stores them alongside the
+        results; older files are back-filled from the CSVs and calibrated
+        against pos_dist.
+        """
+        with self._lock:
+            if self._sim_inputs is None:
+                self._sim_inputs = self._build_sim_inputs()
+            return self._sim_inputs
+
+    def _build_sim_inputs(self) -> dict:
+        from simulation.scenario import calibrate_base_preds
+        sim_data = self.sim_data
+
+        if "dnf_rates" in sim_data:
+            dnf_rates = np.asarray(sim_data["dnf_rates"], dtype=np.float64)
+        else:
+            dnf_rates = np.array([CAREER_DNF_RATES.get(d, 0.15) for d in self.drivers])
+
+        if "sc_probs" in sim_data:
+            sc_probs = np.asarray(sim_data["sc_probs"], dtype=np.float64)
+        else:
+            df_master = raw_store.read_frame(MASTER_FEATURES_PATH, columns=["year", "race_name", "safety_car_probability"])
+            sc_map = df_master[df_master["year"] == df_master["year"].max()] \
+                .groupby("race_name")["safety_car_probability"].first().to_dict()
+            sc_map = {**SC_PROB_FALLBACK, **sc_map}
+            default = float(np.mean(list(sc_map.values())))
+            sc_probs = np.array([sc_map.get(self.race_names[rnd], default) for rnd in self.rounds])
+
+        if "base_preds" in sim_data:
+            base_preds = np.asarray(sim_data["base_preds"], dtype=np.float64)
+        else:
+            base_preds = calibrate_base_preds(self.pos_dist, self.n_sims, sc_probs, dnf_rates)
+
+        pace_map  = dict(zip(self.features_2026["driver"], self.features_2026["combined_pace_gap_s"]))
+        pace_gaps = np.array([float(pace_map.get(d, np.nan)) for d in self.drivers])
 
-# ── Championship winner per simulation ───────────────────────────
-def get_champ_winners():
-    return np.argmax(SIM_POINTS, axis=1)
+        return {
+            "base_preds" : base_preds,   # (n_rounds, n_drivers)
+            "sc_probs"   : sc_probs,     # (n_rounds,)
+            "dnf_rates"  : dnf_rates,    # (n_drivers,)
+            "pace_gaps"  : pace_gaps,    # (n_drivers,)
+        }
 
-CHAMP_WINNERS = get_champ_winners()
+    # ── In-season conditioning on actual results ─────────────────
+    def load_actual_positions(self, after_round: int) -> np.ndarray:
+        """
+        Actual finishing positions for every round <= after_round, as a
+        (n_completed, n_drivers) array — 0 where a driver didn't race.
+        Raises ValueError if a completed round is missing from the results file.
+        """
+        import pandas as pd
 
-# ── Fuzzy driver match ───────────────────────────────────────────
+        done_rounds = [rnd for rnd in self.rounds if rnd <= after_round]
+        if not ACTUAL_RESULTS_PATH.exists():
+            raise ValueError(f"No actual results file at {ACTUAL_RESULTS_PATH}")
+
+        df = pd.read_csv(ACTUAL_RESULTS_PATH, usecols=["round", "driver", "finish_position"])
+        df = df[df["round"].isin(done_rounds)]
+        missing = sorted(set(done_rounds) - set(df["round"].astype(int)))
+        if missing:
+            raise ValueError(f"Actual results missing for round(s) {missing}")
+
+        positions = np.zeros((len(done_rounds), len(self.drivers)), dtype=np.int64)
+        d_index = {d: i for i, d in enumerate(self.drivers)}
+        for rnd, driver, pos in df.itertuples(index=False):
+            if driver in d_index and pd.notna(pos):
+                positions[done_rounds.index(int(rnd)), d_index[driver]] = int(pos)
+        return positions
+
+    def completed_round(self) -> int:
+        """Last round of the calendar in the actual results file (0 before the season)."""
+        mtime = ACTUAL_RESULTS_PATH.stat().st_mtime if ACTUAL_RESULTS_PATH.exists() else None
+        cached = self._completed
+        if cached is None or cached[0] != mtime:
+            done = set()
+            if mtime is not None:
+                with open(ACTUAL_RESULTS_PATH, newline="") as f:
+                    done = {int(row["round"]) for row in csv.DictReader(f) if row.get("round")}
+            cached = self._completed = (mtime, max(done & set(self.rounds), default=0))
+        return cached[1]
+
+    def conditioned_round(self, after_round: int | None) -> int:
+        """
+        The round sim_results(after_round) conditions on: after_round clamped
+        to the last completed round, 0 for none. Raises ValueError if negative.
+        """
+        if after_round is None:
+            return 0
+        after_round = int(after_round)
+        if after_round < 0:
+            raise ValueError(f"after_round must be 0 or more, got {after_round}")
+        return min(after_round, self.completed_round()) if after_round else 0
+
+    def sim_results(self, after_round: int | None = None) -> dict:
+        """
+        Simulation arrays the tools read from. With after_round, rounds up to and
+        including it (clamped by conditioned_round) are fixed to the actual
+        results and only the remaining rounds are simulated — once per round
+        and results file, outside the snapshot lock; concurrent callers for the
+        same round wait for the one run.
+        """
+        after_round = self.conditioned_round(after_round)
+        if not after_round:
+            return {
+                "sim_points"       : self.sim_points,
+                "sim_wins"         : self.sim_wins,
+                "pos_distribution" : self.pos_dist,
+                "champ_winners"    : self.champ_winners,
+                "n_sims"           : self.n_sims,
+                "summary"          : self.summary,
+                "after_round"      : 0,
+            }
+
+        mtime = ACTUAL_RESULTS_PATH.stat().st_mtime if ACTUAL_RESULTS_PATH.exists() else None
+        key = (after_round, mtime)
+        with self._lock:
+            future = self._conditioned.get(key)
+            owner = future is None
+            if owner:
+                # Drop runs built from an older version of the results file
+                for stale in [k for k in self._conditioned if k[1] != mtime]:
+                    del self._conditioned[stale]
+                future = self._conditioned[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            sim = self._simulate_conditioned(after_round)
+        except BaseException as e:
+            with self._lock:
+                self._conditioned.pop(key, None)   # let the next call retry
+            future.set_exception(e)
+            raise
+        future.set_result(sim)
+        return sim
+
+    def _simulate_conditioned(self, after_round: int) -> dict:
+        from simulation.engine import DEFAULT_SEED, simulate_conditioned
+
+        inputs = self.sim_inputs()
+        positions = self.load_actual_positions(after_round)
+        sim = simulate_conditioned(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"],
+                                   self.n_sims, positions, seed=self.sim_data.get("seed", DEFAULT_SEED),
+                                   keep_positions=True, sampling=self.sim_data.get("sampling", "plain"))
+        sim["champ_winners"] = np.argmax(sim["sim_points"], axis=1)
+        sim["n_sims"]        = self.n_sims
+        sim["summary"]       = build_summary(sim["sim_points"], sim["sim_wins"], sim["pos_distribution"],
+                                             self.drivers, self.team_map, sim["champ_winners"])
+        sim["after_round"]   = after_round
+        return sim
+
+    # ── Full outcomes for conditional queries ────────────────────
+    def outcomes(self, after_round: int | None = None):
+        """
+        Query engine over every simulated finishing order (simulation/outcomes.py).
+        Stores written with positions are queried in place (memory-mapped);
+        older stores have them re-simulated once from the baseline inputs with
+        the store's seed, so those answers come from a fresh run of the same
+        model rather than the exact sims behind sim_points.
+        """
+        from simulation.outcomes import Outcomes
+
+        if self.conditioned_round(after_round):
+            sim = self.sim_results(after_round)
+            with self._lock:
+                if "outcomes" not in sim:
+                    sim["outcomes"] = Outcomes(sim["positions"], self.drivers, self.rounds, self.race_names,
+                                               sim_points=sim["sim_points"], resolve_driver=self.find_driver)
+                return sim["outcomes"]
+
+        if "positions" in self.sim_data:
+            positions, points = self.sim_data["positions"], self.sim_points
+        else:
+            positions = points = None
+            inputs = self.sim_inputs()
+        with self._lock:
+            if self._outcomes is None:
+                if positions is None:
+                    from simulation.engine import DEFAULT_SEED, simulate_season
+                    sim = simulate_season(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"],
+                                          self.n_sims, seed=self.sim_data.get("seed", DEFAULT_SEED),
+                                          keep_positions=True, sampling=self.sim_data.get("sampling", "plain"))
+                    positions, points = sim["positions"], sim["sim_points"]
+                self._outcomes = Outcomes(positions, self.drivers, self.rounds, self.race_names,
+                                          sim_points=points, resolve_driver=self.find_driver)
+            return self._outcomes
+
+
+# ── Active snapshot + reload ─────────────────────────────────────
+_snapshot: DataSnapshot = DataSnapshot()
+_reload_lock = threading.Lock()
+
+def snapshot() -> DataSnapshot:
+    """The active snapshot. Take it once per request and read only from it."""
+    return _snapshot
+
+def sim_version() -> str:
+    return _snapshot.version
+
+def reload(force: bool = False) -> dict:
+    """
+    Build a new snapshot from disk and swap it in. The old one stays valid
+    for whoever still holds it. A load that fails (half-written store, bad
+    CSV) raises and leaves the active snapshot untouched. Without force, a
+    snapshot whose version matches the active one is discarded.
+    """
+    global _snapshot
+    with _reload_lock:
+        old = _snapshot
+        new = DataSnapshot(verify=True)
+        swapped = force or new.version != old.version
+        if swapped:
+            _snapshot = new
+            logger.info("Simulation data %s → %s", old.version, new.version)
+        return {"previous": old.version, "version": _snapshot.version, "swapped": swapped}
+
+def watch_stamp() -> tuple:
+    """
+    (inode, mtime_ns, size) of every file a snapshot is built from — cheap
+    change detection. Publishes replace files by rename, so the inode
+    changes even when the mtime and size don't.
+    """
+    paths = (SIM_PATH / MANIFEST, FEATURES_2026_PATH, FEATURES_2026_PATH.with_suffix(".parquet"))
+    stamp = []
+    for path in paths:
+        try:
+            st = path.stat()
+            stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+# ── Module-level access (always the active snapshot) ─────────────
 def find_driver(query: str) -> str | None:
-    q = query.upper().strip()
-    if q in DRIVERS:
-        return q
-    for code, name in DRIVER_NAMES.items():
-        if q in name.upper() or name.upper().split()[0] in q:
-            return code
-    for d in DRIVERS:
-        if q[:3] in d:
-            return d
-    return None
+    return _snapshot.find_driver(query)
 
 def find_race(query: str) -> tuple[int | None, str | None]:
-    q = query.strip()
-    for rnd, name in RACE_NAMES.items():
-        if q.lower() == name.lower():
-            return rnd, name
-    return None, None
\ No newline at end of file
+    return _snapshot.find_race(query)
+
+def get_sim_inputs() -> dict:
+    return _snapshot.sim_inputs()
+
+def load_actual_positions(after_round: int) -> np.ndarray:
+    return _snapshot.load_actual_positions(after_round)
+
+def get_sim_results(after_round: int | None = None) -> dict:
+    return _snapshot.sim_results(after_round)
+
+def get_outcomes(after_round: int | None = None):
+    return _snapshot.outcomes(after_round)
+
+# Former module globals, read from the active snapshot. Code that keeps a
+# reference across calls should hold a snapshot() instead.
+_SNAPSHOT_ATTRS = {
+    "sim_data": "sim_data", "features_2026": "features_2026",
+    "DRIVERS": "drivers", "ROUNDS": "rounds", "RACE_NAMES": "race_names",
+    "POS_DIST": "pos_dist", "SIM_POINTS": "sim_points", "SIM_WINS": "sim_wins",
+    "N_SIMS": "n_sims", "SIM_VERSION": "version", "PRECISION": "precision",
+    "TEAM_MAP": "team_map", "DRIVER_NAMES": "driver_names",
+    "CHAMP_WINNERS": "champ_winners", "SUMMARY": "summary",
+}
+
+def __getattr__(name: str):
+    if name in _SNAPSHOT_ATTRS:
+        return getattr(_snapshot, _SNAPSHOT_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
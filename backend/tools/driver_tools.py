@@ -1,113 +1,108 @@
-from strands import tool
-from .data_loader import (
-    DRIVERS, ROUNDS, RACE_NAMES, POS_DIST, SIM_POINTS,
-    SIM_WINS, N_SIMS, TEAM_MAP, DRIVER_NAMES, CHAMP_WINNERS, find_driver
-)
-import numpy as np
+from .data_loader import snapshot
+from metrics import timed_tool
 
-@tool
-def get_driver_profile(driver: str) -> dict:
+@timed_tool
+def get_driver_profile(driver: str, after_round: int | None = None) -> dict:
     """
     Returns complete season profile for a driver.
     Includes points outlook, championship probability, best/worst circuits.
     Driver can be code (LEC) or full name (Leclerc, Charles).
+    Pass after_round=N to condition on the actual results of rounds 1..N.
     """
-    d = find_driver(driver)
+    snap = snapshot()
+    d = snap.find_driver(driver)
     if not d:
-        return {"error": f"Driver '{driver}' not found", "available": DRIVERS}
+        return {"error": f"Driver '{driver}' not found", "available": snap.drivers}
 
-    i = DRIVERS.index(d)
-    pts = SIM_POINTS[:, i]
-    champ_wins = int(np.sum(CHAMP_WINNERS == i))
+    try:
+        sim = snap.sim_results(after_round)
+    except ValueError as e:
+        return {"error": str(e)}
+    summary, after_round = sim["summary"], sim["after_round"]
+
+    i = snap.drivers.index(d)
 
     circuit_stats = []
-    for r_idx, rnd in enumerate(ROUNDS):
-        probs = POS_DIST[i, r_idx, :] / N_SIMS * 100
+    for r_idx, rnd in enumerate(snap.rounds):
         circuit_stats.append({
-            "race"       : RACE_NAMES[rnd],
+            "race"       : snap.race_names[rnd],
             "round"      : rnd,
-            "win_pct"    : round(float(probs[0]), 1),
-            "podium_pct" : round(float(sum(probs[:3])), 1),
-            "points_pct" : round(float(sum(probs[:10])), 1),
-            "likely_pos" : int(probs.argmax()) + 1,
+            "win_pct"    : round(float(summary.race_win_pct[i, r_idx]), 1),
+            "podium_pct" : round(float(summary.podium_pct[i, r_idx]), 1),
+            "points_pct" : round(float(summary.points_pct[i, r_idx]), 1),
+            "likely_pos" : int(summary.likely_pos[i, r_idx]),
         })
 
     circuit_stats.sort(key=lambda x: x["win_pct"], reverse=True)
 
-    return {
+    profile = {
         "driver"         : d,
-        "full_name"      : DRIVER_NAMES.get(d, d),
-        "team"           : TEAM_MAP.get(d, "Unknown"),
-        "avg_points"     : round(float(pts.mean()), 1),
-        "champ_pct"      : round(champ_wins / N_SIMS * 100, 1),
-        "win_pct"        : round(float(SIM_WINS[i]) / (N_SIMS * 24) * 100, 1),
-        "min_points"     : round(float(pts.min()), 0),
-        "max_points"     : round(float(pts.max()), 0),
-        "std"            : round(float(pts.std()), 1),
+        "full_name"      : snap.driver_names.get(d, d),
+        "team"           : snap.team_map.get(d, "Unknown"),
+        "avg_points"     : round(float(summary.avg_points[i]), 1),
+        "champ_pct"      : round(float(summary.champ_pct[i]), 1),
+        "win_pct"        : round(float(summary.win_pct[i]), 1),
+        "min_points"     : round(float(summary.min_points[i]), 0),
+        "max_points"     : round(float(summary.max_points[i]), 0),
+        "std"            : round(float(summary.std_points[i]), 1),
         "best_circuits"  : circuit_stats[:5],
         "worst_circuits" : circuit_stats[-5:][::-1],
         "all_circuits"   : circuit_stats,
     }
+    if after_round:
+        profile["after_round"] = after_round
+    return profile
 
 
-@tool
+@timed_tool
 def compare_drivers(driver1: str, driver2: str) -> dict:
     """
     Head to head comparison of two drivers across all metrics and every circuit.
     Drivers can be codes or full names.
     """
-    d1 = find_driver(driver1)
-    d2 = find_driver(driver2)
+    snap = snapshot()
+    d1 = snap.find_driver(driver1)
+    d2 = snap.find_driver(driver2)
 
     if not d1:
         return {"error": f"Driver '{driver1}' not found"}
     if not d2:
         return {"error": f"Driver '{driver2}' not found"}
 
-    i1, i2 = DRIVERS.index(d1), DRIVERS.index(d2)
-    pts1, pts2 = SIM_POINTS[:, i1], SIM_POINTS[:, i2]
-
-    champ1 = int(np.sum(CHAMP_WINNERS == i1))
-    champ2 = int(np.sum(CHAMP_WINNERS == i2))
-    d1_beats_d2 = round(float(np.sum(pts1 > pts2)) / N_SIMS * 100, 1)
+    summary = snap.summary
+    i1, i2 = snap.drivers.index(d1), snap.drivers.index(d2)
 
     circuit_comparison = []
-    for r_idx, rnd in enumerate(ROUNDS):
-        p1 = POS_DIST[i1, r_idx, :] / N_SIMS * 100
-        p2 = POS_DIST[i2, r_idx, :] / N_SIMS * 100
+    for r_idx, rnd in enumerate(snap.rounds):
+        w1 = summary.race_win_pct[i1, r_idx]
+        w2 = summary.race_win_pct[i2, r_idx]
         circuit_comparison.append({
-            "race"       : RACE_NAMES[rnd],
+            "race"       : snap.race_names[rnd],
             "round"      : rnd,
-            "d1_win_pct" : round(float(p1[0]), 1),
-            "d2_win_pct" : round(float(p2[0]), 1),
-            "d1_podium"  : round(float(sum(p1[:3])), 1),
-            "d2_podium"  : round(float(sum(p2[:3])), 1),
-            "d1_likely"  : int(p1.argmax()) + 1,
-            "d2_likely"  : int(p2.argmax()) + 1,
-            "advantage"  : d1 if p1[0] > p2[0] else d2,
+            "d1_win_pct" : round(float(w1), 1),
+            "d2_win_pct" : round(float(w2), 1),
+            "d1_podium"  : round(float(summary.podium_pct[i1, r_idx]), 1),
+            "d2_podium"  : round(float(summary.podium_pct[i2, r_idx]), 1),
+            "d1_likely"  : int(summary.likely_pos[i1, r_idx]),
+            "d2_likely"  : int(summary.likely_pos[i2, r_idx]),
+            "advantage"  : d1 if w1 > w2 else d2,
         })
 
+    def summary_row(d, i):
+        return {
+            "code"       : d,
+            "full_name"  : snap.driver_names.get(d, d),
+            "team"       : snap.team_map.get(d, "Unknown"),
+            "avg_points" : round(float(summary.avg_points[i]), 1),
+            "champ_pct"  : round(float(summary.champ_pct[i]), 1),
+            "win_pct"    : round(float(summary.win_pct[i]), 1),
+            "min_points" : round(float(summary.min_points[i]), 0),
+            "max_points" : round(float(summary.max_points[i]), 0),
+        }
+
     return {
-        "driver1": {
-            "code"       : d1,
-            "full_name"  : DRIVER_NAMES.get(d1, d1),
-            "team"       : TEAM_MAP.get(d1, "Unknown"),
-            "avg_points" : round(float(pts1.mean()), 1),
-            "champ_pct"  : round(champ1 / N_SIMS * 100, 1),
-            "win_pct"    : round(float(SIM_WINS[i1]) / (N_SIMS * 24) * 100, 1),
-            "min_points" : round(float(pts1.min()), 0),
-            "max_points" : round(float(pts1.max()), 0),
-        },
-        "driver2": {
-            "code"       : d2,
-            "full_name"  : DRIVER_NAMES.get(d2, d2),
-            "team"       : TEAM_MAP.get(d2, "Unknown"),
-            "avg_points" : round(float(pts2.mean()), 1),
-            "champ_pct"  : round(champ2 / N_SIMS * 100, 1),
-            "win_pct"    : round(float(SIM_WINS[i2]) / (N_SIMS * 24) * 100, 1),
-            "min_points" : round(float(pts2.min()), 0),
-            "max_points" : round(float(pts2.max()), 0),
-        },
-        "d1_beats_d2_pct"    : d1_beats_d2,
+        "driver1"            : summary_row(d1, i1),
+        "driver2"            : summary_row(d2, i2),
+        "d1_beats_d2_pct"    : round(float(summary.beats_pct[i1, i2]), 1),
         "circuit_comparison" : circuit_comparison,
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,227 @@
+"""
+jolpica_mock.py
+Local stand-in for the Jolpica F1 API, serving the project's raw data
+(tools/raw_store.py) in Jolpica's response shapes — so career stats and
+fetch_missing_data.py can be developed and tested offline and without
+hitting the real rate limits.
+
+Run it standalone and point the backend at it:
+
+    cd backend
+    uvicorn tools.jolpica_mock:app --port 8001
+    JOLPICA_BASE=http://localhost:8001/ergast/f1 uvicorn main:app
+
+or in-process with career_tools.reset_client(httpx.ASGITransport(app=app)).
+
+Like the real API, pages are capped at 100 rows. MOCK_LATENCY_S adds a
+delay per request. MOCK_RATE_LIMIT=N answers 429 with a Retry-After header
+once more than N requests arrive within a second. GET /_mock/stats returns
+request counts per path (429s under "429").
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import Counter
+from functools import lru_cache
+
+import pandas as pd
+from fastapi import FastAPI, Request, Response
+
+from . import raw_store
+from .career_tools import DRIVER_ID_MAP
+
+MOCK_LATENCY_S  = float(os.getenv("MOCK_LATENCY_S", "0"))
+MOCK_RATE_LIMIT = int(os.getenv("MOCK_RATE_LIMIT", "0"))   # requests per second, 0 = unlimited
+MAX_LIMIT      = 100
+
+app = FastAPI(title="Jolpica mock")
+REQUESTS: Counter = Counter()
+
+_CODE_TO_ID = DRIVER_ID_MAP
+
+
+@lru_cache(maxsize=1)
+def _frames() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    return tuple(raw_store.read_table(kind) for kind in ("race_results", "qualifying", "pitstops"))
+
+
+def _driver_id(code: str, name: str) -> str:
+    return _CODE_TO_ID.get(code) or name.split()[-1].lower()
+
+
+def _driver(row) -> dict:
+    given, _, family = row.driver_name.partition(" ")
+    return {
+        "driverId"   : _driver_id(row.driver, row.driver_name),
+        "code"       : row.driver,
+        "givenName"  : given,
+        "familyName" : family,
+    }
+
+
+def _text(value) -> str:
+    # Rows written by older fetch_missing_data.py runs lack some columns
+    return "" if pd.isna(value) else str(value)
+
+
+def _race(row) -> dict:
+    race = {"season": str(row.year), "round": str(row.round), "raceName": _text(row.race_name)}
+    if hasattr(row, "circuit"):
+        race["Circuit"] = {"circuitName": _text(row.circuit)}
+    if hasattr(row, "date"):
+        race["date"] = _text(row.date)
+    return race
+
+
+def _result(row) -> dict:
+    result = {
+        "position"    : str(row.finish_position),
+        "points"      : str(row.points),
+        "grid"        : str(row.grid_position),
+        "laps"        : str(row.laps_completed),
+        "status"      : row.status,
+        "Driver"      : _driver(row),
+        "Constructor" : {"name": row.team},
+    }
+    if pd.notna(row.fastest_lap_rank):
+        result["FastestLap"] = {"rank": str(int(row.fastest_lap_rank))}
+    return result
+
+
+def _pitstop(row) -> dict:
+    return {"driverId": row.driver, "lap": str(int(row.lap)), "stop": str(int(row.stop_number)),
+            "duration": _text(row.duration)}
+
+
+def _qualifying(row) -> dict:
+    return {"position": str(row.quali_position), "Driver": _driver(row), "Constructor": {"name": row.team}}
+
+
+def _for_driver(df: pd.DataFrame, driver_id: str, year: int | None = None) -> pd.DataFrame:
+    if year is not None:
+        df = df[df["year"] == year]
+    ids = [_driver_id(c, n) for c, n in zip(df["driver"], df["driver_name"])]
+    return df[[i == driver_id for i in ids]].sort_values(["year", "round"])
+
+
+def _season_totals() -> pd.DataFrame:
+    totals = _frames()[0].groupby(["year", "driver", "driver_name"], as_index=False)["points"].sum()
+    totals["position"] = totals.groupby("year")["points"].rank(ascending=False, method="first").astype(int)
+    return totals
+
+
+def _page(request: Request, rows: list, table: str, key: str, make) -> dict:
+    """One Jolpica-style page: limit/offset applied, rows grouped by race."""
+    limit  = min(int(request.query_params.get("limit", 30)), MAX_LIMIT)
+    offset = int(request.query_params.get("offset", 0))
+    races: list = []
+    for row in rows[offset:offset + limit]:
+        if not races or (races[-1]["season"], races[-1]["round"]) != (str(row.year), str(row.round)):
+            races.append({**_race(row), key: []})
+        races[-1][key].append(make(row))
+    return {"MRData": {
+        "limit"  : str(limit),
+        "offset" : str(offset),
+        "total"  : str(len(rows)),
+        table    : {"Races": races},
+    }}
+
+
+_window = {"start": 0.0, "count": 0}
+
+@app.middleware("http")
+async def _count(request: Request, call_next):
+    if MOCK_RATE_LIMIT and request.url.path.startswith("/ergast"):
+        now = time.monotonic()
+        if now - _window["start"] >= 1.0:
+            _window["start"], _window["count"] = now, 0
+        _window["count"] += 1
+        if _window["count"] > MOCK_RATE_LIMIT:
+            REQUESTS["429"] += 1
+            retry_after = max(1, math.ceil(1.0 - (now - _window["start"])))
+            return Response(status_code=429, headers={"Retry-After": str(retry_after)})
+    REQUESTS[request.url.path] += 1
+    if MOCK_LATENCY_S:
+        await asyncio.sleep(MOCK_LATENCY_S)
+    return await call_next(request)
+
+
+@app.get("/ergast/f1/drivers/{driver_id}/results.json")
+async def driver_results(request: Request, driver_id: str):
+    rows = list(_for_driver(_frames()[0], driver_id).itertuples())
+    return _page(request, rows, "RaceTable", "Results", _result)
+
+
+@app.get("/ergast/f1/drivers/{driver_id}/qualifying.json")
+async def driver_qualifying(request: Request, driver_id: str):
+    rows = list(_for_driver(_frames()[1], driver_id).itertuples())
+    return _page(request, rows, "RaceTable", "QualifyingResults", _qualifying)
+
+
+@app.get("/ergast/f1/drivers/{driver_id}/driverStandings/1.json")
+async def driver_titles(driver_id: str):
+    totals = _season_totals()
+    won = [r for r in totals[totals["position"] == 1].itertuples()
+           if _driver_id(r.driver, r.driver_name) == driver_id]
+    return {"MRData": {"StandingsTable": {"StandingsLists": [
+        {"season": str(r.year), "DriverStandings": [{"position": "1", "points": str(r.points)}]}
+        for r in won
+    ]}}}
+
+
+@app.get("/ergast/f1/{year}/drivers/{driver_id}/results.json")
+async def season_results(request: Request, year: int, driver_id: str):
+    rows = list(_for_driver(_frames()[0], driver_id, year).itertuples())
+    return _page(request, rows, "RaceTable", "Results", _result)
+
+
+@app.get("/ergast/f1/{year}/drivers/{driver_id}/qualifying.json")
+async def season_qualifying(request: Request, year: int, driver_id: str):
+    rows = list(_for_driver(_frames()[1], driver_id, year).itertuples())
+    return _page(request, rows, "RaceTable", "QualifyingResults", _qualifying)
+
+
+@app.get("/ergast/f1/{year}/drivers/{driver_id}/driverStandings.json")
+async def season_standing(year: int, driver_id: str):
+    totals = _season_totals()
+    rows = [r for r in totals[totals["year"] == year].itertuples()
+            if _driver_id(r.driver, r.driver_name) == driver_id]
+    return {"MRData": {"StandingsTable": {"season": str(year), "StandingsLists": [
+        {"season": str(r.year), "DriverStandings": [{"position": str(r.position), "points": str(r.points)}]}
+        for r in rows
+    ]}}}
+
+
+@app.get("/ergast/f1/{year}.json")
+async def schedule(year: int):
+    races = (_frames()[0].query("year == @year")
+             .drop_duplicates("round").sort_values("round").itertuples())
+    return {"MRData": {"RaceTable": {"season": str(year), "Races": [_race(r) for r in races]}}}
+
+
+@app.get("/ergast/f1/{year}/{rnd}/results.json")
+async def round_results(request: Request, year: int, rnd: int):
+    df = _frames()[0]
+    rows = list(df[(df["year"] == year) & (df["round"] == rnd)].sort_values("finish_position").itertuples())
+    return _page(request, rows, "RaceTable", "Results", _result)
+
+
+@app.get("/ergast/f1/{year}/{rnd}/qualifying.json")
+async def round_qualifying(request: Request, year: int, rnd: int):
+    df = _frames()[1]
+    rows = list(df[(df["year"] == year) & (df["round"] == rnd)].sort_values("quali_position").itertuples())
+    return _page(request, rows, "RaceTable", "QualifyingResults", _qualifying)
+
+
+@app.get("/ergast/f1/{year}/{rnd}/pitstops.json")
+async def round_pitstops(request: Request, year: int, rnd: int):
+    df = _frames()[2]
+    rows = list(df[(df["year"] == year) & (df["round"] == rnd)].itertuples())
+    return _page(request, rows, "RaceTable", "PitStops", _pitstop)
+
+
+@app.get("/_mock/stats")
+async def stats():
+    return dict(REQUESTS)
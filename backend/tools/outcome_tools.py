@@ -0,0 +1,48 @@
+"""
+outcome_tools.py
+Conditional and joint probabilities over every simulated season
+("if Leclerc wins Monaco, what are Leclerc's title odds?"). Each query is a
+couple of boolean masks over the stored finishing orders — see
+simulation/outcomes.py for the event format.
+"""
+
+from .data_loader import snapshot
+from metrics import timed_tool
+
+
+@timed_tool
+def query_outcomes(event: dict, given: dict | None = None,
+                   after_round: int | None = None) -> dict:
+    """
+    Probability of an event across all simulated 2026 seasons, optionally
+    conditioned on another event. Use it for "if X happens, what are the
+    odds of Y" and for combined events over several races.
+
+    A condition is {"driver": ..., <race>, <test>}:
+      race : "race": "Monaco Grand Prix" (or round number), "races": [...]
+             for every race listed, or no race for the final championship order
+      test : "position": 1 exact finish, "top": 3 finishes P1-P3,
+             "ahead_of": "NOR" finishes ahead of another driver,
+             "champion": true wins the title
+    Combine with {"all": [...]}, {"any": [...]}, {"not": {...}}.
+
+    event       : the outcome to measure, e.g. {"driver": "LEC", "champion": true}
+    given       : optional condition, e.g. {"driver": "LEC", "race": "Monaco Grand Prix", "position": 1}
+    after_round : fix rounds up to N to the actual results first
+    """
+    snap = snapshot()
+    try:
+        after_round = snap.conditioned_round(after_round)
+        outcomes = snap.outcomes(after_round)
+        result = outcomes.probability(event, given)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    result["probability_pct"] = round(result["probability"] * 100, 2)
+    result["std_error_pct"]   = round(result["std_error"] * 100, 2)
+    if given is not None:
+        result["unconditional_pct"] = round(result["unconditional_probability"] * 100, 2)
+        result["given_pct"]         = round(result["given_probability"] * 100, 2)
+    if after_round:
+        result["after_round"] = after_round
+    return result
@@ -1,104 +1,106 @@
-from strands import tool
-from .data_loader import (
-    DRIVERS, ROUNDS, RACE_NAMES, POS_DIST,
-    N_SIMS, TEAM_MAP, DRIVER_NAMES, find_driver, find_race
-)
-import numpy as np
+from .data_loader import DataSnapshot, snapshot
+from simulation.summary import SimSummary
+from metrics import timed_tool
 
-@tool
-def get_race_winner_probs(race: str) -> dict:
-    """
-    Returns win/podium/points probabilities for ALL drivers at a specific race.
-    Race must be full GP name e.g. "Monaco Grand Prix".
-    """
-    rnd, race_name = find_race(race)
-    if not rnd:
-        return {"error": f"Race '{race}' not found", "available": list(RACE_NAMES.values())}
-
-    r_idx = ROUNDS.index(rnd)
+def race_rows_from_summary(summary: SimSummary, r_idx: int, snap: DataSnapshot) -> list:
+    """Per-driver probability rows for one round, sorted by win %."""
     results = []
-
-    for i, driver in enumerate(DRIVERS):
-        probs = POS_DIST[i, r_idx, :] / N_SIMS * 100
+    for i, driver in enumerate(snap.drivers):
         results.append({
-            "driver"     : driver,
-            "full_name"  : DRIVER_NAMES.get(driver, driver),
-            "team"       : TEAM_MAP.get(driver, "Unknown"),
-            "win_pct"    : round(float(probs[0]), 1),
-            "podium_pct" : round(float(sum(probs[:3])), 1),
-            "points_pct" : round(float(sum(probs[:10])), 1),
-            "likely_pos" : int(probs.argmax()) + 1,
-            "pos_probs"  : [round(float(p), 1) for p in probs],
+            "driver"        : driver,
+            "full_name"     : snap.driver_names.get(driver, driver),
+            "team"          : snap.team_map.get(driver, "Unknown"),
+            "win_pct"       : round(float(summary.race_win_pct[i, r_idx]), 1),
+            "podium_pct"    : round(float(summary.podium_pct[i, r_idx]), 1),
+            "win_pct_ci"    : round(float(summary.race_win_pct_ci[i, r_idx]), 2),
+            "podium_pct_ci" : round(float(summary.podium_pct_ci[i, r_idx]), 2),
+            "points_pct"    : round(float(summary.points_pct[i, r_idx]), 1),
+            "likely_pos"    : int(summary.likely_pos[i, r_idx]),
+            "pos_probs"     : [round(float(p), 1) for p in summary.pos_pct[i, r_idx]],
         })
 
     results.sort(key=lambda x: x["win_pct"], reverse=True)
     for i, r in enumerate(results):
         r["position"] = i + 1
+    return results
 
-    return {"race": race_name, "round": rnd, "drivers": results}
 
+@timed_tool
+def get_race_winner_probs(race: str) -> dict:
+    """
+    Returns win/podium/points probabilities for ALL drivers at a specific race.
+    Race must be full GP name e.g. "Monaco Grand Prix".
+    """
+    snap = snapshot()
+    rnd, race_name = snap.find_race(race)
+    if not rnd:
+        return {"error": f"Race '{race}' not found", "available": list(snap.race_names.values())}
+
+    r_idx = snap.rounds.index(rnd)
+    return {"race": race_name, "round": rnd, "drivers": race_rows_from_summary(snap.summary, r_idx, snap)}
 
-@tool
+
+@timed_tool
 def get_race_prediction(driver: str, race: str) -> dict:
     """
     Returns detailed probability breakdown for one driver at one race.
     Driver can be code or name. Race must be full GP name e.g. "Monaco Grand Prix".
     """
-    d = find_driver(driver)
+    snap = snapshot()
+    d = snap.find_driver(driver)
     if not d:
         return {"error": f"Driver '{driver}' not found"}
 
-    rnd, race_name = find_race(race)
+    rnd, race_name = snap.find_race(race)
     if not rnd:
         return {"error": f"Race '{race}' not found"}
 
-    d_idx = DRIVERS.index(d)
-    r_idx = ROUNDS.index(rnd)
-    probs = POS_DIST[d_idx, r_idx, :] / N_SIMS * 100
+    d_idx = snap.drivers.index(d)
+    r_idx = snap.rounds.index(rnd)
 
     return {
         "driver"     : d,
-        "full_name"  : DRIVER_NAMES.get(d, d),
-        "team"       : TEAM_MAP.get(d, "Unknown"),
+        "full_name"  : snap.driver_names.get(d, d),
+        "team"       : snap.team_map.get(d, "Unknown"),
         "race"       : race_name,
         "round"      : rnd,
-        "win_pct"    : round(float(probs[0]), 1),
-        "podium_pct" : round(float(sum(probs[:3])), 1),
-        "points_pct" : round(float(sum(probs[:10])), 1),
-        "likely_pos" : int(probs.argmax()) + 1,
-        "pos_probs"  : [round(float(p), 1) for p in probs],
+        "win_pct"    : round(float(snap.summary.race_win_pct[d_idx, r_idx]), 1),
+        "podium_pct" : round(float(snap.summary.podium_pct[d_idx, r_idx]), 1),
+        "points_pct" : round(float(snap.summary.points_pct[d_idx, r_idx]), 1),
+        "likely_pos" : int(snap.summary.likely_pos[d_idx, r_idx]),
+        "pos_probs"  : [round(float(p), 1) for p in snap.summary.pos_pct[d_idx, r_idx]],
     }
 
 
-@tool
+@timed_tool
 def get_driver_calendar(driver: str) -> dict:
     """
     Returns all races ranked best to worst for a specific driver.
     Shows where driver peaks and struggles across the season.
     Driver can be code or full name.
     """
-    d = find_driver(driver)
+    snap = snapshot()
+    d = snap.find_driver(driver)
     if not d:
         return {"error": f"Driver '{driver}' not found"}
 
-    d_idx = DRIVERS.index(d)
+    d_idx = snap.drivers.index(d)
     races = []
 
-    for r_idx, rnd in enumerate(ROUNDS):
-        probs = POS_DIST[d_idx, r_idx, :] / N_SIMS * 100
+    for r_idx, rnd in enumerate(snap.rounds):
         races.append({
             "round"      : rnd,
-            "race"       : RACE_NAMES[rnd],
-            "win_pct"    : round(float(probs[0]), 1),
-            "podium_pct" : round(float(sum(probs[:3])), 1),
-            "points_pct" : round(float(sum(probs[:10])), 1),
-            "likely_pos" : int(probs.argmax()) + 1,
+            "race"       : snap.race_names[rnd],
+            "win_pct"    : round(float(snap.summary.race_win_pct[d_idx, r_idx]), 1),
+            "podium_pct" : round(float(snap.summary.podium_pct[d_idx, r_idx]), 1),
+            "points_pct" : round(float(snap.summary.points_pct[d_idx, r_idx]), 1),
+            "likely_pos" : int(snap.summary.likely_pos[d_idx, r_idx]),
         })
 
     return {
         "driver"         : d,
-        "full_name"      : DRIVER_NAMES.get(d, d),
-        "team"           : TEAM_MAP.get(d, "Unknown"),
+        "full_name"      : snap.driver_names.get(d, d),
+        "team"           : snap.team_map.get(d, "Unknown"),
         "calendar_order" : sorted(races, key=lambda x: x["round"]),
         "ranked_by_win"  : sorted(races, key=lambda x: x["win_pct"], reverse=True),
-    }
\ No newline at end of file
+    }
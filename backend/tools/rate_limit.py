@@ -0,0 +1,60 @@
+"""
+rate_limit.py
+Client-side pacing for the Jolpica API (4 requests/s), shared by
+career_tools and fetch_missing_data.py: a token bucket every request
+acquires from, and Retry-After parsing so a 429 pauses the whole bucket
+rather than each request retrying on its own.
+"""
+
+import asyncio
+import email.utils
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`; pause() blocks everyone."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate         = rate
+        self.burst        = burst
+        self.tokens       = float(burst)
+        self.updated      = time.monotonic()
+        self.paused_until = 0.0
+        self._lock        = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+def retry_after(response: httpx.Response, default: float) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
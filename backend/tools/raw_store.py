@@ -0,0 +1,344 @@
+"""
+raw_store.py
+Typed Parquet store for the raw Jolpica tables (race_results, qualifying,
+pitstops), partitioned by year and round.
+
+    data/raw/{table}/year=2025/season.parquet     compacted season
+    data/raw/{table}/year=2025/round=07.parquet   one fetched round
+
+Adding a round writes only its own file, so the fetcher never rewrites a
+season to checkpoint. compact() folds a year's round files into
+season.parquet (the fetcher does this once per run) — a season is then one
+file to open instead of two dozen. When a round exists in both, the round
+file wins, so a reader racing a compaction never sees duplicates.
+
+read_table() prunes years and rounds by file name before opening anything,
+pushes round/driver predicates down to Parquet row groups and reads only
+the requested columns. Years not yet in the store fall back to the legacy
+data/{table}_{year}.csv files with the same filters, so everything keeps
+working before the migration:
+
+    cd backend
+    python -m tools.raw_store migrate          # CSVs → data/raw, plus derived tables
+
+Derived tables (features_2026.csv, master_features_all.csv, ...) stay CSV
+for people but get a Parquet sibling — write_frame()/read_frame().
+
+The Arrow readers don't need pandas, so it is imported only where frames
+are built — the API reads its tables without loading it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = Path(os.getenv("DATA_DIR", str(Path(__file__).resolve().parent.parent.parent / "data")))
+RAW_DIR  = "raw"          # under the data dir
+SEASON   = "season.parquet"
+
+_STR, _I16, _F64 = pa.string(), pa.int16(), pa.float64()
+
+SCHEMAS = {
+    "race_results": pa.schema([
+        ("year", _I16), ("round", _I16), ("race_name", _STR), ("circuit", _STR), ("date", _STR),
+        ("driver", _STR), ("driver_name", _STR), ("team", _STR),
+        ("grid_position", _I16), ("finish_position", _I16), ("points", _F64),
+        ("status", _STR), ("laps_completed", _I16), ("fastest_lap_rank", _I16),
+    ]),
+    "qualifying": pa.schema([
+        ("year", _I16), ("round", _I16), ("race_name", _STR),
+        ("driver", _STR), ("driver_name", _STR), ("team", _STR),
+        ("quali_position", _I16), ("q1_time", _STR), ("q2_time", _STR), ("q3_time", _STR),
+    ]),
+    # driver is the Jolpica driverId here ("norris"), not the code
+    "pitstops": pa.schema([
+        ("year", _I16), ("round", _I16), ("race_name", _STR),
+        ("driver", _STR), ("stop_number", _I16), ("lap", _I16), ("duration", _STR),
+    ]),
+}
+
+SORT_KEYS = {
+    "race_results": ["round", "finish_position"],
+    "qualifying"  : ["round", "quali_position"],
+    "pitstops"    : ["round", "stop_number", "lap"],
+}
+
+DERIVED = ["features_2026", "master_features_2025", "master_features_all", "bot_per_2024_features"]
+
+
+def _table_dir(table: str, data_dir: Path) -> Path:
+    if table not in SCHEMAS:
+        raise ValueError(f"Unknown table {table!r} — expected one of {', '.join(SCHEMAS)}")
+    return Path(data_dir) / RAW_DIR / table
+
+
+def _round_file(rnd: int) -> str:
+    return f"round={int(rnd):02d}.parquet"
+
+
+def _write_atomic(table: pa.Table, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+# ── Normalising ──────────────────────────────────────────────────
+
+def _normalise(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Conform a frame to the table schema: legacy column names, missing columns as nulls."""
+    import pandas as pd
+
+    df = df.copy()
+    if table == "pitstops" and "stop" in df.columns:
+        # fetch_missing_data.py used to write "stop", the notebook "stop_number"
+        df["stop_number"] = df["stop_number"].fillna(df["stop"]) if "stop_number" in df.columns else df["stop"]
+    schema = SCHEMAS[table]
+    for name in schema.names:
+        if name not in df.columns:
+            df[name] = None
+    df = df[schema.names].sort_values(SORT_KEYS[table], kind="stable")
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name]).astype("Int16")
+        elif pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype(object).where(df[field.name].notna(), None).map(
+                lambda v: v if v is None else str(v))
+    return df
+
+
+def _to_arrow(table: str, df: pd.DataFrame) -> pa.Table:
+    # No pandas metadata: readers get plain numpy dtypes, like read_csv
+    arrow = pa.Table.from_pandas(_normalise(table, df), schema=SCHEMAS[table], preserve_index=False)
+    return arrow.replace_schema_metadata(None)
+
+# ── Writing ──────────────────────────────────────────────────────
+
+def append_round(table: str, year: int, rnd: int, df: pd.DataFrame, data_dir: Path = DATA_DIR) -> Path:
+    """Write one round's rows as its own partition file (replacing an earlier fetch of it)."""
+    rows = df.assign(year=year, round=rnd)
+    path = _table_dir(table, data_dir) / f"year={int(year)}" / _round_file(rnd)
+    _write_atomic(_to_arrow(table, rows), path)
+    return path
+
+
+def write_season(table: str, year: int, df: pd.DataFrame, data_dir: Path = DATA_DIR) -> Path:
+    """Replace a whole year with df as one compacted file."""
+    year_dir = _table_dir(table, data_dir) / f"year={int(year)}"
+    _write_atomic(_to_arrow(table, df.assign(year=year)), year_dir / SEASON)
+    for stale in year_dir.glob("round=*.parquet"):
+        stale.unlink()
+    return year_dir / SEASON
+
+
+def compact(table: str, year: int, data_dir: Path = DATA_DIR) -> bool:
+    """Fold a year's round files into season.parquet. Returns False if there was nothing to do."""
+    year_dir = _table_dir(table, data_dir) / f"year={int(year)}"
+    if not any(year_dir.glob("round=*.parquet")):
+        return False
+    df = read_table(table, years=[year], data_dir=data_dir)
+    write_season(table, year, df, data_dir)
+    return True
+
+# ── Reading ──────────────────────────────────────────────────────
+
+def available_years(table: str, data_dir: Path = DATA_DIR) -> list[int]:
+    """Years available in the store or as legacy CSVs."""
+    stored = {int(p.name.split("=")[1]) for p in _table_dir(table, data_dir).glob("year=*")}
+    legacy = {int(p.stem.rsplit("_", 1)[1]) for p in Path(data_dir).glob(f"{table}_[0-9][0-9][0-9][0-9].csv")}
+    return sorted(stored | legacy)
+
+
+def rounds(table: str, year: int, data_dir: Path = DATA_DIR) -> set[int]:
+    """Rounds of `year` present in the store (reads only the round column)."""
+    year_dir = _table_dir(table, data_dir) / f"year={int(year)}"
+    found = {int(p.stem.split("=")[1]) for p in year_dir.glob("round=*.parquet")}
+    if (year_dir / SEASON).exists():
+        found |= set(pq.read_table(year_dir / SEASON, columns=["round"]).column("round").to_pylist())
+    return found
+
+
+def _filters(rounds_, drivers, skip_rounds=()):
+    filters = []
+    if rounds_ is not None:
+        filters.append(("round", "in", [int(r) for r in rounds_]))
+    if skip_rounds:
+        filters.append(("round", "not in", sorted(skip_rounds)))
+    if drivers is not None:
+        filters.append(("driver", "in", list(drivers)))
+    return filters or None
+
+
+def _read_parquet(path: Path, columns=None, filters=None) -> pa.Table:
+    # Unfiltered reads skip pyarrow.dataset, which imports pandas
+    if filters is None:
+        with pq.ParquetFile(path) as f:
+            return f.read(columns=columns)
+    return pq.read_table(path, columns=columns, filters=filters)
+
+
+def _read_year(year_dir: Path, rounds_, drivers, columns) -> list[pa.Table]:
+    round_files = {int(p.stem.split("=")[1]): p for p in year_dir.glob("round=*.parquet")}
+    wanted = {r: p for r, p in round_files.items() if rounds_ is None or r in rounds_}
+    parts = []
+    season = year_dir / SEASON
+    if season.exists() and (rounds_ is None or set(rounds_) - set(round_files)):
+        parts.append(_read_parquet(season, columns, _filters(rounds_, drivers, skip_rounds=set(round_files))))
+    for _, path in sorted(wanted.items()):
+        parts.append(_read_parquet(path, columns, _filters(None, drivers)))
+    return parts
+
+
+def _read_legacy(table: str, csv_path: Path, rounds_, drivers, columns) -> pa.Table:
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    if rounds_ is not None:
+        df = df[df["round"].isin(list(rounds_))]
+    if drivers is not None:
+        df = df[df["driver"].isin(list(drivers))]
+    return _to_arrow(table, df).select(columns)
+
+
+def read_arrow(table: str, years=None, rounds=None, drivers=None, columns=None,
+               data_dir: Path = DATA_DIR) -> pa.Table:
+    """
+    Rows of `table` as an Arrow table. years/rounds/drivers are optional
+    collections to keep; columns projects (default: every schema column).
+    """
+    root    = _table_dir(table, data_dir)
+    schema  = SCHEMAS[table]
+    columns = list(columns) if columns is not None else schema.names
+    if unknown := set(columns) - set(schema.names):
+        raise ValueError(f"{table} has no column(s) {', '.join(sorted(unknown))}")
+    rounds_ = None if rounds is None else {int(r) for r in rounds}
+    wanted  = years if years is not None else available_years(table, data_dir)
+
+    parts = []
+    for year in sorted(int(y) for y in wanted):
+        year_dir = root / f"year={year}"
+        if year_dir.is_dir():
+            parts += _read_year(year_dir, rounds_, drivers, columns)
+        elif (csv_path := Path(data_dir) / f"{table}_{year}.csv").exists():
+            parts.append(_read_legacy(table, csv_path, rounds_, drivers, columns))
+    if not parts:
+        return schema.empty_table().select(columns)
+    return pa.concat_tables(parts)
+
+
+def read_table(table: str, years=None, rounds=None, drivers=None, columns=None,
+               data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """read_arrow() as a DataFrame. Integer columns with gaps come back as float, as from read_csv."""
+    return read_arrow(table, years, rounds, drivers, columns, data_dir).to_pandas()
+
+# ── Derived tables ───────────────────────────────────────────────
+
+def write_frame(df: pd.DataFrame, csv_path) -> Path:
+    """Save a derived table as CSV plus a Parquet sibling that read_frame() prefers."""
+    csv_path = Path(csv_path)
+    df.to_csv(csv_path, index=False)
+    return _write_sibling(df, csv_path)
+
+
+def _write_sibling(df: pd.DataFrame, csv_path: Path) -> Path:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta  = {**(table.schema.metadata or {}), b"source_sha256": _file_hash(csv_path).encode()}
+    parquet = csv_path.with_suffix(".parquet")
+    _write_atomic(table.replace_schema_metadata(meta), parquet)
+    return parquet
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def read_frame(csv_path, columns=None) -> pd.DataFrame:
+    """Read a derived table from its Parquet sibling when it's current, else from the CSV."""
+    import pandas as pd
+
+    return read_frame_arrow(csv_path, columns).to_pandas() if _parquet_current(csv_path) \
+        else pd.read_csv(csv_path, usecols=columns)
+
+
+def read_frame_arrow(csv_path, columns=None) -> pa.Table:
+    csv_path = Path(csv_path)
+    if _parquet_current(csv_path):
+        return _read_parquet(csv_path.with_suffix(".parquet"), columns)
+    import pandas as pd
+
+    return pa.Table.from_pandas(pd.read_csv(csv_path, usecols=columns), preserve_index=False)
+
+
+def _parquet_current(csv_path) -> bool:
+    # The sibling records the hash of the CSV it was made from, so a
+    # hand-edited CSV wins — mtimes aren't reliable after a git checkout
+    csv_path = Path(csv_path)
+    parquet = csv_path.with_suffix(".parquet")
+    if not parquet.exists():
+        return False
+    if not csv_path.exists():
+        return True
+    source = (pq.read_schema(parquet).metadata or {}).get(b"source_sha256", b"").decode()
+    return source == _file_hash(csv_path)
+
+# ── Migration ────────────────────────────────────────────────────
+
+def migrate(data_dir: Path = DATA_DIR, year_list=None, force: bool = False) -> dict:
+    """
+    One-shot import of data/{table}_{year}.csv into the store as compacted
+    seasons, plus Parquet siblings for the derived tables. Years already in
+    the store are left alone unless force. Returns {table: [years written]}.
+    """
+    import pandas as pd
+
+    data_dir = Path(data_dir)
+    written: dict = {}
+    for table in SCHEMAS:
+        for csv_path in sorted(data_dir.glob(f"{table}_[0-9][0-9][0-9][0-9].csv")):
+            year = int(csv_path.stem.rsplit("_", 1)[1])
+            if year_list is not None and year not in year_list:
+                continue
+            if (_table_dir(table, data_dir) / f"year={year}").is_dir() and not force:
+                continue
+            write_season(table, year, pd.read_csv(csv_path), data_dir)
+            written.setdefault(table, []).append(year)
+    for name in DERIVED:
+        csv_path = data_dir / f"{name}.csv"
+        if csv_path.exists() and (force or not _parquet_current(csv_path)):
+            _write_sibling(pd.read_csv(csv_path), csv_path)
+            written.setdefault("derived", []).append(name)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Raw race data store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="import the legacy CSVs")
+    m.add_argument("years", nargs="*", type=int)
+    m.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    m.add_argument("--force", action="store_true", help="re-import years already in the store")
+    c = sub.add_parser("compact", help="fold round files into season files")
+    c.add_argument("years", nargs="*", type=int)
+    c.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        done = migrate(args.data_dir, args.years or None, args.force)
+        for table, items in done.items():
+            print(f"  {table:<13} {', '.join(map(str, items))}")
+        print("✅ Migrated" if done else "Nothing to migrate — store is up to date")
+    else:
+        for table in SCHEMAS:
+            for year in args.years or available_years(table, args.data_dir):
+                if compact(table, year, args.data_dir):
+                    print(f"  {table:<13} {year} compacted")
@@ -0,0 +1,163 @@
+"""
+whatif_tools.py
+Runs fresh, bounded Monte Carlo simulations against the cached baseline
+inputs with user overrides ("what if Ferrari's DNF rate drops to 5%?").
+Scenario and baseline share a seed, sampling mode and chunking — common
+random numbers — so differences are the override's effect rather than
+sampling noise, and their error bars come from the per-sim paired change.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from .data_loader import DataSnapshot, snapshot
+from .championship_tools import standings_from_summary
+from .race_tools import race_rows_from_summary
+from simulation.engine import DEFAULT_SEED, SAMPLING_MODES, simulate_season
+from simulation.scenario import apply_overrides
+from simulation.summary import DEFAULT_CONFIDENCE, build_summary, z_value
+from metrics import timed_tool
+
+DEFAULT_WHATIF_SIMS = 10000
+MAX_WHATIF_SIMS     = 20000   # keeps a what-if run within a few hundred ms
+# Seed and n_sims come from the client, so only the most recent baselines
+# are kept (~1.8 MB each at 10k sims)
+BASELINE_CACHE_MAX_ENTRIES = 8
+
+# Baseline (summary, sim_points) keyed by (data version, n_sims, seed, sampling)
+# — reused across scenarios, least recently used dropped first
+_baseline_cache: OrderedDict = OrderedDict()
+_baseline_lock  = threading.Lock()
+
+def _summarise(sim: dict, snap: DataSnapshot):
+    return build_summary(sim["sim_points"], sim["sim_wins"], sim["pos_distribution"],
+                         snap.drivers, snap.team_map, pairwise=False)
+
+def _baseline(snap: DataSnapshot, n_sims: int, seed: int, sampling: str = "plain"):
+    key = (snap.version, n_sims, seed, sampling)
+    with _baseline_lock:
+        if key in _baseline_cache:
+            _baseline_cache.move_to_end(key)
+            return _baseline_cache[key]
+
+    inputs = snap.sim_inputs()
+    sim = simulate_season(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"],
+                          n_sims, seed=seed, sampling=sampling)
+    baseline = (_summarise(sim, snap), sim["sim_points"])
+
+    with _baseline_lock:
+        for stale in [k for k in _baseline_cache if k[0] != snap.version]:
+            del _baseline_cache[stale]
+        _baseline_cache[key] = baseline
+        while len(_baseline_cache) > BASELINE_CACHE_MAX_ENTRIES:
+            _baseline_cache.popitem(last=False)
+    return baseline
+
+def _change_ci(points, base_points) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Half-widths of the champ % and avg points changes from per-sim paired
+    differences — narrow because both runs share their random draws. Plain
+    sampling only: the other modes' sims aren't independent.
+    """
+    n, n_drivers = points.shape
+    z = z_value(DEFAULT_CONFIDENCE)
+    champ = np.eye(n_drivers, dtype=np.int8)
+    d_champ  = champ[np.argmax(points, axis=1)] - champ[np.argmax(base_points, axis=1)]
+    d_points = points - base_points
+    return (z * d_champ.std(axis=0) / np.sqrt(n) * 100,
+            z * d_points.std(axis=0) / np.sqrt(n))
+
+
+@timed_tool
+def simulate_what_if(
+    base_predictions: dict[str, float | list[float]] | None = None,
+    dnf_rate: dict[str, float] | None = None,
+    combined_pace_gap_s: dict[str, float] | None = None,
+    safety_car_probability: dict[str, float] | None = None,
+    race: str | None = None,
+    n_sims: int = DEFAULT_WHATIF_SIMS,
+    seed: int = DEFAULT_SEED,
+    sampling: str = "plain",
+) -> dict:
+    """
+    Re-runs the 2026 season simulation with hypothetical changes and returns
+    the new championship standings (plus one race's win probabilities if
+    race is given). Keys can be driver codes (LEC) or team names (Ferrari).
+
+    base_predictions       : predicted finish position per driver/team,
+                             one number or one per round
+    dnf_rate               : per-race retirement probability e.g. {"Ferrari": 0.05}
+    combined_pace_gap_s    : new pace gap to the fastest car in seconds.
+                             "Cadillac finds 0.5s" = current gap minus 0.5
+    safety_car_probability : per race, full GP name e.g. {"Monaco Grand Prix": 0.5}
+    race                   : full GP name to include race win probabilities for
+    sampling               : "plain" (default), "antithetic" or "sobol"
+
+    Each standings row carries champ_pct_change / avg_points_change against
+    an unmodified run with the same seed, and (plain sampling) the ± error
+    of each change.
+    """
+    n_sims = max(1, min(int(n_sims), MAX_WHATIF_SIMS))
+    if not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+        return {"error": f"seed must be a non-negative integer, got {seed!r}"}
+    if sampling not in SAMPLING_MODES:
+        return {"error": f"Unknown sampling '{sampling}'", "available": list(SAMPLING_MODES)}
+
+    snap = snapshot()
+    r_idx = None
+    if race:
+        rnd, race_name = snap.find_race(race)
+        if not rnd:
+            return {"error": f"Race '{race}' not found", "available": list(snap.race_names.values())}
+        r_idx = snap.rounds.index(rnd)
+
+    try:
+        inputs, unknown = apply_overrides(
+            snap.sim_inputs(), snap.drivers, snap.rounds, snap.race_names, snap.team_map,
+            base_predictions=base_predictions,
+            dnf_rate=dnf_rate,
+            combined_pace_gap_s=combined_pace_gap_s,
+            safety_car_probability=safety_car_probability,
+        )
+    except ValueError as e:
+        return {"error": f"Invalid override — {e}"}
+    sim = simulate_season(inputs["base_preds"], inputs["sc_probs"], inputs["dnf_rates"],
+                          n_sims, seed=seed, sampling=sampling)
+    summary = _summarise(sim, snap)
+
+    standings = standings_from_summary(summary, snap)
+    base_summary, base_points = _baseline(snap, n_sims, seed, sampling)
+    baseline  = {r["driver"]: r for r in standings_from_summary(base_summary, snap)}
+    if sampling == "plain":
+        champ_ci, points_ci = _change_ci(sim["sim_points"], base_points)
+    for r in standings:
+        b = baseline[r["driver"]]
+        r["champ_pct_change"]  = round(r["champ_pct"] - b["champ_pct"], 1)
+        r["avg_points_change"] = round(r["avg_points"] - b["avg_points"], 1)
+        if sampling == "plain":
+            i = snap.drivers.index(r["driver"])
+            r["champ_pct_change_ci"]  = round(float(champ_ci[i]), 2)
+            r["avg_points_change_ci"] = round(float(points_ci[i]), 1)
+
+    result = {
+        "scenario": {
+            "base_predictions"       : base_predictions or {},
+            "dnf_rate"               : dnf_rate or {},
+            "combined_pace_gap_s"    : combined_pace_gap_s or {},
+            "safety_car_probability" : safety_car_probability or {},
+        },
+        "n_sims"    : n_sims,
+        "seed"      : seed,
+        "sampling"  : sampling,
+        "standings" : standings,
+    }
+    if r_idx is not None:
+        result["race"] = {
+            "race"    : snap.race_names[snap.rounds[r_idx]],
+            "round"   : snap.rounds[r_idx],
+            "drivers" : race_rows_from_summary(summary, r_idx, snap),
+        }
+    if unknown:
+        result["unmatched"] = unknown
+    return result
@@ -0,0 +1,94 @@
+"""
+bench.py
+Wall time and best MAE of training.search against the notebook's serial
+cv_objective (kept verbatim below as the reference), over the same number
+of trials and the same TPE seed.
+
+    cd backend
+    python -m training.bench --trials 100 --workers 4
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import optuna
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from tools import raw_store
+from training import search
+
+
+def reference_study(df_2025: pd.DataFrame, n_trials: int, seed: int) -> optuna.Study:
+    """cv_objective as it was in 04_model_training.ipynb, in an in-memory study."""
+    META_COLS, LEAKAGE_COLS, TARGET = search.META_COLS, search.LEAKAGE_COLS, search.TARGET
+    _, feature_cols = search.feature_frame(df_2025)
+
+    def cv_objective(trial):
+        params = {**search.suggest_params(trial), 'random_state': 42, 'verbose': -1}
+
+        fold_maes = []
+        for year, test_end in [(2023, 23), (2024, 25), (2025, 25)]:
+            year_mask  = df_2025['year'] == year
+
+            df_cv = pd.get_dummies(df_2025[year_mask],
+                                   columns=['circuit_type'],
+                                   prefix=['circuit'])
+            drop_cols_cv = [c for c in META_COLS + LEAKAGE_COLS + ['round']
+                            if c in df_cv.columns]
+            df_cv = df_cv.drop(columns=drop_cols_cv)
+
+            train_idx_local = df_2025[year_mask]['round'].isin(range(1, 19)).values
+            test_idx_local  = df_2025[year_mask]['round'].isin(range(19, test_end)).values
+
+            X_tr = df_cv[train_idx_local][feature_cols]
+            y_tr = df_cv[train_idx_local][TARGET]
+            w_tr = df_2025[year_mask][train_idx_local]['sample_weight']
+            X_te = df_cv[test_idx_local][feature_cols]
+            y_te = df_cv[test_idx_local][TARGET]
+
+            m = lgb.LGBMRegressor(**params)
+            m.fit(X_tr, y_tr, sample_weight=w_tr)
+            fold_maes.append(mean_absolute_error(y_te, m.predict(X_te)))
+
+        return np.mean(fold_maes)
+
+    study = optuna.create_study(direction='minimize', sampler=optuna.samplers.TPESampler(seed=seed))
+    study.optimize(cv_objective, n_trials=n_trials)
+    return study
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=search.SEED)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    df = raw_store.read_frame(raw_store.DATA_DIR / "master_features_all.csv")
+
+    started = time.perf_counter()
+    ref = reference_study(df, args.trials, args.seed)
+    t_ref = time.perf_counter() - started
+
+    rows = [("notebook", t_ref, ref.best_value, len(ref.trials), 0)]
+    for label, workers in (("cached+pruned", 1), ("parallel", args.workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            study = search.run_search(df, args.trials, workers, Path(tmp) / "journal.log",
+                                      seed=args.seed, cache_root=Path(tmp) / "fold_cache")
+            pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in study.trials)
+            rows.append((label, time.perf_counter() - started, study.best_value, len(study.trials), pruned))
+
+    print(f"{'':>14} {'wall':>8} {'best MAE':>9} {'trials':>7} {'pruned':>7}")
+    for label, t, best, n, pruned in rows:
+        print(f"{label:>14} {t:>7.1f}s {best:>9.3f} {n:>7} {pruned:>7}   ×{t_ref / t:.1f}")
+
+
+if __name__ == "__main__":
+    main()
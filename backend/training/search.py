@@ -0,0 +1,291 @@
+"""
+search.py
+Hyperparameter search for the finish-position model: the cross-validated
+Optuna study from 04_model_training.ipynb (cv_objective) as a CLI.
+
+The notebook re-encoded and re-sliced the three year folds inside every
+trial and ran 300 trials serially in memory. Here the folds are built once
+and cached as LightGBM binary datasets (models/fold_cache/<hash>/, keyed by
+a hash of the training frame), so a trial only trains and predicts. Worker
+processes run trials in parallel, one LightGBM thread each, and share the
+study through an Optuna journal file (an append-only log each worker
+replays, so TPE reads the study from memory rather than from a database per
+suggestion). Each trial reports its running mean MAE after
+every fold, and the median pruner stops trials already worse than the
+median at that fold. The study persists: re-running resumes it, a larger
+--trials extends it, and trials a crashed run left RUNNING are failed and
+replaced.
+
+    cd backend
+    python -m training.search --trials 300 --workers 4
+    python -m training.search --trials 500               # extend the same study
+    python -m training.search --trials 0 --save          # refit best params on all data → models/
+
+Best params use LGBMRegressor's names, so they drop into the notebook's
+later cells (and the saved model is the notebook's lgbm_regressor.pkl).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import optuna
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from simulation import trees
+from tools import raw_store
+
+MODELS_DIR  = raw_store.DATA_DIR.parent / "models"
+STORAGE     = MODELS_DIR / "optuna_journal.log"
+STUDY_NAME  = "lgbm_cv"
+N_TRIALS    = 300
+SEED        = 42
+
+TARGET = 'finish_position'
+META_COLS = ['year', 'race_name', 'circuit', 'date', 'driver', 'driver_name', 'team']
+LEAKAGE_COLS = ['status', 'points', 'laps_completed', 'fastest_lap_rank', 'dnf',
+                'teammate_finish_gap', 'championship_gap', 'wet_race', 'sample_weight']
+WEAK_FEATURES = ['home_race', 'circuit_permanent', 'circuit_street']
+
+# (year, first round past the test window) — train on rounds 1-18 of each year
+CV_FOLDS     = [(2023, 23), (2024, 25), (2025, 25)]
+TRAIN_ROUNDS = range(1, 19)
+
+# feature_pre_filter off: min_child_samples varies per trial on one binned dataset
+DATASET_PARAMS = {'feature_pre_filter': False, 'verbose': -1}
+
+# LGBMRegressor name → lgb.train name
+_BOOSTER_NAMES = {
+    'n_estimators'     : 'num_iterations',
+    'min_child_samples': 'min_data_in_leaf',
+    'subsample'        : 'bagging_fraction',
+    'colsample_bytree' : 'feature_fraction',
+    'reg_alpha'        : 'lambda_l1',
+    'reg_lambda'       : 'lambda_l2',
+    'random_state'     : 'seed',
+}
+
+
+def feature_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    """The notebook's encoding: circuit_type one-hot, meta/leakage/round dropped, weak features out."""
+    encoded = pd.get_dummies(df, columns=['circuit_type'], prefix=['circuit'])
+    encoded = encoded.drop(columns=[c for c in META_COLS + LEAKAGE_COLS + ['round'] if c in encoded.columns])
+    feature_cols = [c for c in encoded.columns if c != TARGET and c not in WEAK_FEATURES]
+    return encoded, feature_cols
+
+
+def fold_arrays(df: pd.DataFrame) -> tuple[list[dict], list[str]]:
+    """Per-year train/test matrices for CV_FOLDS, as float64 arrays."""
+    encoded, feature_cols = feature_frame(df)
+    X = encoded[feature_cols].to_numpy(dtype=np.float64)
+    y = df[TARGET].to_numpy(dtype=np.float64)
+    w = df['sample_weight'].to_numpy(dtype=np.float64)
+    folds = []
+    for year, test_end in CV_FOLDS:
+        in_year = (df['year'] == year).to_numpy()
+        train = in_year & df['round'].isin(TRAIN_ROUNDS).to_numpy()
+        test  = in_year & df['round'].isin(range(TRAIN_ROUNDS.stop, test_end)).to_numpy()
+        folds.append({'year': year, 'X_tr': X[train], 'y_tr': y[train], 'w_tr': w[train],
+                      'X_te': X[test], 'y_te': y[test]})
+    return folds, feature_cols
+
+
+def cache_key(df: pd.DataFrame) -> str:
+    """Hash of the training frame, the fold layout and the LightGBM version."""
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(json.dumps([list(df.columns), CV_FOLDS, list(TRAIN_ROUNDS), WEAK_FEATURES,
+                         DATASET_PARAMS, lgb.__version__]).encode())
+    return h.hexdigest()[:16]
+
+
+def build_fold_cache(df: pd.DataFrame, cache_root: Path = MODELS_DIR / "fold_cache") -> Path:
+    """
+    Write the folds once: a LightGBM binary (binned) training set and the
+    test matrix per year. Reuses the directory when the frame is unchanged.
+    """
+    path = Path(cache_root) / cache_key(df)
+    if (path / "meta.json").exists():
+        return path
+    folds, feature_cols = fold_arrays(df)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for f in folds:
+        lgb.Dataset(f['X_tr'], f['y_tr'], weight=f['w_tr'], feature_name=feature_cols,
+                    params=DATASET_PARAMS).save_binary(str(tmp / f"train_{f['year']}.bin"))
+        np.savez(tmp / f"test_{f['year']}.npz", X=f['X_te'], y=f['y_te'])
+    (tmp / "meta.json").write_text(json.dumps({"feature_cols": feature_cols, "folds": CV_FOLDS}))
+    try:
+        os.replace(tmp, path)
+    except OSError:                       # another process finished it first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def load_folds(path: Path) -> list[tuple[int, lgb.Dataset, np.ndarray, np.ndarray]]:
+    """(year, constructed training Dataset, X_test, y_test) per fold from a fold cache."""
+    folds = []
+    for year, _ in json.loads((Path(path) / "meta.json").read_text())["folds"]:
+        train = lgb.Dataset(str(Path(path) / f"train_{year}.bin"), params=DATASET_PARAMS).construct()
+        test = np.load(Path(path) / f"test_{year}.npz")
+        folds.append((year, train, test['X'], test['y']))
+    return folds
+
+
+def suggest_params(trial: optuna.Trial) -> dict:
+    """cv_objective's search space, in LGBMRegressor's names."""
+    return {
+        'n_estimators'     : trial.suggest_int('n_estimators', 100, 1000),
+        'learning_rate'    : trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+        'max_depth'        : trial.suggest_int('max_depth', 3, 6),
+        'num_leaves'       : trial.suggest_int('num_leaves', 15, 63),
+        'min_child_samples': trial.suggest_int('min_child_samples', 10, 50),
+        'subsample'        : trial.suggest_float('subsample', 0.5, 1.0),
+        'colsample_bytree' : trial.suggest_float('colsample_bytree', 0.5, 1.0),
+        'reg_alpha'        : trial.suggest_float('reg_alpha', 0.0, 1.0),
+        'reg_lambda'       : trial.suggest_float('reg_lambda', 0.0, 1.0),
+    }
+
+
+def booster_params(params: dict, threads: int = 1) -> tuple[dict, int]:
+    """LGBMRegressor params → (lgb.train params, boosting rounds); same model either way."""
+    mapped = {_BOOSTER_NAMES.get(k, k): v for k, v in {'random_state': SEED, **params}.items()}
+    rounds = mapped.pop('num_iterations', 100)
+    return {'objective': 'regression', 'verbose': -1, 'num_threads': threads, **mapped}, rounds
+
+
+def cv_mae(params: dict, folds, trial: optuna.Trial | None = None, threads: int = 1) -> float:
+    """
+    Mean test MAE over the folds. With a trial, the running mean is reported
+    after each fold and the trial is pruned as soon as the pruner says so.
+    """
+    train_params, rounds = booster_params(params, threads)
+    maes = []
+    for step, (_, train, X_te, y_te) in enumerate(folds):
+        booster = lgb.train(train_params, train, num_boost_round=rounds)
+        maes.append(mean_absolute_error(y_te, booster.predict(X_te)))
+        if trial is not None:
+            trial.report(float(np.mean(maes)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+    return float(np.mean(maes))
+
+
+def _load_study(storage: Path, study_name: str, seed: int) -> optuna.Study:
+    backend = optuna.storages.journal.JournalFileBackend(str(storage))
+    return optuna.create_study(
+        study_name=study_name, storage=optuna.storages.JournalStorage(backend),
+        direction='minimize', load_if_exists=True,
+        sampler=optuna.samplers.TPESampler(seed=seed, constant_liar=True),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=10, n_warmup_steps=0),
+    )
+
+
+def _finished(study: optuna.Study) -> int:
+    return len(study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,
+                                                        optuna.trial.TrialState.PRUNED)))
+
+
+def _worker(storage: Path, study_name: str, cache: str, n_trials: int, seed: int) -> int:
+    """One search process: load the folds once, then take trials until the study has n_trials."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    folds = load_folds(Path(cache))
+    study = _load_study(storage, study_name, seed)
+    before = _finished(study)
+    study.optimize(
+        lambda trial: cv_mae(suggest_params(trial), folds, trial),
+        n_trials=max(n_trials - before, 0),
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=(optuna.trial.TrialState.COMPLETE,
+                                                                    optuna.trial.TrialState.PRUNED))],
+        gc_after_trial=False,
+    )
+    return _finished(study) - before
+
+
+def run_search(df: pd.DataFrame, n_trials: int = N_TRIALS, workers: int | None = None,
+               storage: Path = STORAGE, study_name: str = STUDY_NAME, seed: int = SEED,
+               cache_root: Path = MODELS_DIR / "fold_cache") -> optuna.Study:
+    """
+    Run (or resume, or extend) the study until it has n_trials finished
+    trials, across `workers` processes (default: all cores). Returns the study.
+    """
+    Path(storage).parent.mkdir(parents=True, exist_ok=True)
+    cache = build_fold_cache(df, cache_root)
+    study = _load_study(storage, study_name, seed)
+    # Nothing else runs this study now, so RUNNING trials are from a crashed run;
+    # only COMPLETE and PRUNED count towards n_trials, so failing them replaces them
+    for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.RUNNING,)):
+        study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+    workers = max(1, min(workers or os.cpu_count() or 1, n_trials - _finished(study)))
+    if n_trials > _finished(study):
+        if workers == 1:
+            _worker(storage, study_name, str(cache), n_trials, seed)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                # Distinct sampler seeds so workers don't propose the same points
+                list(pool.map(_worker, [storage] * workers, [study_name] * workers,
+                              [str(cache)] * workers, [n_trials] * workers,
+                              [seed + i for i in range(workers)]))
+    return _load_study(storage, study_name, seed)
+
+
+def fit_final(df: pd.DataFrame, params: dict) -> tuple[lgb.LGBMRegressor, list[str]]:
+    """The notebook's final model: best params on every row, weighted by season."""
+    encoded, feature_cols = feature_frame(df)
+    model = lgb.LGBMRegressor(**params, random_state=SEED, verbose=-1)
+    model.fit(encoded[feature_cols], df[TARGET], sample_weight=df['sample_weight'])
+    return model, feature_cols
+
+
+def save_model(model, feature_cols: list[str], params: dict, cv_mae_: float,
+               models_dir: Path = MODELS_DIR):
+    """
+    lgbm_regressor.pkl + feature_cols.pkl (as the notebook writes them),
+    lgbm_trees.npz (the LightGBM-free export) and best_params.json.
+    """
+    models_dir.mkdir(parents=True, exist_ok=True)
+    with open(models_dir / "lgbm_regressor.pkl", "wb") as f:
+        pickle.dump(model, f)
+    with open(models_dir / "feature_cols.pkl", "wb") as f:
+        pickle.dump(feature_cols, f)
+    trees.export(model, feature_cols).save(models_dir / "lgbm_trees.npz")
+    (models_dir / "best_params.json").write_text(json.dumps({"params": params, "cv_mae": cv_mae_}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel, resumable Optuna search for the LightGBM model.")
+    parser.add_argument("--trials", type=int, default=N_TRIALS, help="finished trials the study should reach")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--features", type=Path, default=raw_store.DATA_DIR / "master_features_all.csv")
+    parser.add_argument("--storage", type=Path, default=STORAGE, help="Optuna journal file")
+    parser.add_argument("--study", default=STUDY_NAME)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--save", action="store_true", help="refit the best params on all data and save the model")
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    df = raw_store.read_frame(args.features)
+    started = time.perf_counter()
+    study = run_search(df, args.trials, args.workers, args.storage, args.study, args.seed)
+    states = pd.Series([t.state.name for t in study.trials]).value_counts().to_dict()
+    print(f"✅ Study '{args.study}': {states} in {time.perf_counter() - started:.1f}s")
+    print(f"Best CV MAE : {study.best_value:.3f}")
+    print(f"Best params : {study.best_params}")
+
+    if args.save:
+        model, feature_cols = fit_final(df, study.best_params)
+        save_model(model, feature_cols, study.best_params, study.best_value)
+        print(f"✅ Saved lgbm_regressor.pkl, feature_cols.pkl, lgbm_trees.npz, best_params.json → {MODELS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
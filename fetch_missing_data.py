@@ -1,40 +1,76 @@
 """
-Fetches complete race results, qualifying, and pit stop data for 2023 and 2024.
-Only fetches rounds that are missing from the existing CSV files.
+Fetches race results, qualifying, and pit stop data from the Jolpica API.
+Only fetches rounds that are missing from the raw data store (data/raw,
+see backend/tools/raw_store.py).
+
+  • Season schedules come from the API, so any year can be filled.
+  • Requests overlap, paced by a token bucket (Jolpica allows 4 req/s);
+    a 429 pauses every request for its Retry-After instead of fixed sleeps.
+  • Each round is written to its own Parquet partition as soon as it
+    arrives, so an interrupted run picks up where it stopped and nothing
+    already fetched is rewritten. Years still only in the legacy CSVs are
+    migrated into the store first.
 
 Run from the f1-predictor directory:
-    python fetch_missing_data.py
+    python fetch_missing_data.py                 # 2023 and 2024
+    python fetch_missing_data.py 2025 2026 --rate 2
+
+Set JOLPICA_BASE to run against the local stand-in instead of the real API:
+    uvicorn tools.jolpica_mock:app --app-dir backend --port 8001
+    JOLPICA_BASE=http://localhost:8001/ergast/f1 python fetch_missing_data.py
 """
 
+import argparse
+import asyncio
+import json
+import os
+import sys
 import time
-import requests
-import pandas as pd
+from datetime import date
 from pathlib import Path
 
-DATA_DIR = Path("data")
-DELAY    = 1.5   # seconds between API calls — stays well under rate limit
+import httpx
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from tools import raw_store  # noqa: E402
+from tools.rate_limit import TokenBucket, retry_after  # noqa: E402
+from features.store import FeatureStore  # noqa: E402
+
+BASE        = os.getenv("JOLPICA_BASE", "https://api.jolpi.ca/ergast/f1")
+DATA_DIR    = Path("data")
+STATE_FILE  = Path("cache") / "fetch_state.json"   # under DATA_DIR
+RATE        = 4.0   # requests per second — Jolpica's burst limit
+BURST       = 4
+CONCURRENCY = 4     # rounds in flight
+RETRIES     = 5
 
-# ── Helpers ───────────────────────────────────────────────────────────────────
+# ── Rate-limited requests ─────────────────────────────────────────────────────
 
-def get(url, retries=3):
-    for attempt in range(retries):
+async def get(client: httpx.AsyncClient, bucket: TokenBucket, path: str) -> dict:
+    for attempt in range(RETRIES):
+        await bucket.acquire()
         try:
-            r = requests.get(url, timeout=20)
-            r.raise_for_status()
-            return r.json()
-        except requests.exceptions.HTTPError as e:
-            if r.status_code == 429:
-                wait = 10 * (attempt + 1)
-                print(f"    Rate limited — waiting {wait}s...")
-                time.sleep(wait)
-            else:
-                raise
-    raise RuntimeError(f"Failed after {retries} retries: {url}")
+            r = await client.get(f"{BASE}/{path}")
+        except httpx.TransportError as e:
+            print(f"    {path}: {e!r} — retrying")
+            await asyncio.sleep(2 ** attempt)
+            continue
+        if r.status_code == 429:
+            wait = retry_after(r, default=10 * (attempt + 1))
+            print(f"    Rate limited — pausing {wait:.0f}s...")
+            bucket.pause(wait)
+            continue
+        if r.status_code >= 500:
+            await asyncio.sleep(2 ** attempt)
+            continue
+        r.raise_for_status()
+        return r.json()
+    raise RuntimeError(f"Failed after {RETRIES} retries: {path}")
 
 # ── Race results ──────────────────────────────────────────────────────────────
 
-def fetch_race_results_round(year, rnd):
-    data = get(f"https://api.jolpi.ca/ergast/f1/{year}/{rnd}/results.json")
+def parse_race_results(data, year):
     races = data["MRData"]["RaceTable"]["Races"]
     if not races:
         return pd.DataFrame()
@@ -62,8 +98,7 @@ def fetch_race_results_round(year, rnd):
 
 # ── Qualifying ────────────────────────────────────────────────────────────────
 
-def fetch_qualifying_round(year, rnd):
-    data = get(f"https://api.jolpi.ca/ergast/f1/{year}/{rnd}/qualifying.json")
+def parse_qualifying(data, year):
     races = data["MRData"]["RaceTable"]["Races"]
     if not races:
         return pd.DataFrame()
@@ -83,8 +118,7 @@ def fetch_qualifying_round(year, rnd):
 
 # ── Pit stops ─────────────────────────────────────────────────────────────────
 
-def fetch_pitstops_round(year, rnd):
-    data = get(f"https://api.jolpi.ca/ergast/f1/{year}/{rnd}/pitstops.json?limit=100")
+def parse_pitstops(data, year):
     races = data["MRData"]["RaceTable"]["Races"]
     if not races or "PitStops" not in races[0]:
         return pd.DataFrame()
@@ -92,92 +126,133 @@ def fetch_pitstops_round(year, rnd):
     rows = []
     for ps in race["PitStops"]:
         rows.append({
-            "year"    : year,
-            "round"   : int(race["round"]),
-            "driver"  : ps["driverId"],
-            "lap"     : int(ps["lap"]),
-            "stop"    : int(ps["stop"]),
-            "duration": ps["duration"],
+            "year"       : year,
+            "round"      : int(race["round"]),
+            "race_name"  : race["raceName"],
+            "driver"     : ps["driverId"],
+            "stop_number": int(ps["stop"]),
+            "lap"        : int(ps["lap"]),
+            "duration"   : ps["duration"],
         })
     return pd.DataFrame(rows)
 
-# ── Total rounds per year ─────────────────────────────────────────────────────
+# kind (raw_store table) → (endpoint, parser)
+KINDS = {
+    "race_results": ("results.json",             parse_race_results),
+    "qualifying"  : ("qualifying.json",          parse_qualifying),
+    "pitstops"    : ("pitstops.json?limit=100",  parse_pitstops),
+}
 
-TOTAL_ROUNDS = {2023: 22, 2024: 24}
+# ── Schedule ──────────────────────────────────────────────────────────────────
 
-# ── Main ──────────────────────────────────────────────────────────────────────
+async def fetch_schedule(client, bucket, year):
+    """Rounds of `year` that have already been raced, as {round: race name}."""
+    data  = await get(client, bucket, f"{year}.json?limit=100")
+    today = date.today().isoformat()
+    return {
+        int(r["round"]): r["raceName"]
+        for r in data["MRData"]["RaceTable"]["Races"]
+        if r.get("date", today) < today
+    }
+
+# ── Checkpointed store ────────────────────────────────────────────────────────
 
-def fill_missing(year):
-    print(f"\n{'='*50}")
-    print(f"  Year {year}")
-    print(f"{'='*50}")
+class SeasonStore:
+    """
+    One year of the raw store. Every fetched round is appended as its own
+    partition file, so the store itself is the checkpoint. Rounds a finished
+    season has no data for (e.g. pit stops) are recorded in STATE_FILE so
+    reruns don't ask again.
+    """
 
-    # Load existing files
-    rr_path = DATA_DIR / f"race_results_{year}.csv"
-    qq_path = DATA_DIR / f"qualifying_{year}.csv"
-    pp_path = DATA_DIR / f"pitstops_{year}.csv"
+    def __init__(self, data_dir: Path, year: int):
+        self.data_dir = data_dir
+        self.year     = year
+        raw_store.migrate(data_dir, [year])
+        self.rounds   = {kind: raw_store.rounds(kind, year, data_dir) for kind in KINDS}
+        self.added    = {kind: 0 for kind in KINDS}
+        self.state_path = data_dir / STATE_FILE
+        self.state    = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
 
-    df_rr = pd.read_csv(rr_path) if rr_path.exists() else pd.DataFrame()
-    df_qq = pd.read_csv(qq_path) if qq_path.exists() else pd.DataFrame()
-    df_pp = pd.read_csv(pp_path) if pp_path.exists() else pd.DataFrame()
+    def has(self, kind: str, rnd: int) -> bool:
+        return rnd in self.rounds[kind] or rnd in self.state.get(f"{self.year}/{kind}", [])
 
-    existing_rr = set(df_rr["round"].unique()) if "round" in df_rr.columns else set()
-    existing_qq = set(df_qq["round"].unique()) if "round" in df_qq.columns else set()
-    existing_pp = set(df_pp["round"].unique()) if "round" in df_pp.columns else set()
+    def save(self, kind: str, df_new: pd.DataFrame, rnd: int):
+        if df_new.empty:
+            if self.year < date.today().year:
+                self.state.setdefault(f"{self.year}/{kind}", []).append(rnd)
+                _write_atomic(self.state_path, json.dumps(self.state, indent=1))
+            return
+        raw_store.append_round(kind, self.year, rnd, df_new, self.data_dir)
+        self.rounds[kind].add(rnd)
+        self.added[kind] += 1
 
-    all_rounds = set(range(1, TOTAL_ROUNDS[year] + 1))
-    missing_rr = sorted(all_rounds - existing_rr)
-    missing_qq = sorted(all_rounds - existing_qq)
-    missing_pp = sorted(all_rounds - existing_pp)
+    def compact(self):
+        # One season file per table keeps reads to a handful of opens
+        for kind, added in self.added.items():
+            if added:
+                raw_store.compact(kind, self.year, self.data_dir)
 
-    print(f"  Race results missing : {missing_rr}")
-    print(f"  Qualifying missing   : {missing_qq}")
-    print(f"  Pit stops missing    : {missing_pp}")
 
-    new_rr, new_qq, new_pp = [], [], []
+def _write_atomic(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
 
-    all_missing = sorted(set(missing_rr) | set(missing_qq) | set(missing_pp))
-    for rnd in all_missing:
-        print(f"  Round {rnd}/{TOTAL_ROUNDS[year]}...", end=" ", flush=True)
+# ── Main ──────────────────────────────────────────────────────────────────────
 
-        if rnd in missing_rr:
-            df = fetch_race_results_round(year, rnd)
-            if not df.empty:
-                new_rr.append(df)
-            time.sleep(DELAY)
+async def fill_missing(client, bucket, gate, data_dir, year):
+    schedule = await fetch_schedule(client, bucket, year)
+    files    = SeasonStore(data_dir, year)
+    missing  = {kind: [rnd for rnd in schedule if not files.has(kind, rnd)] for kind in KINDS}
 
-        if rnd in missing_qq:
-            df = fetch_qualifying_round(year, rnd)
-            if not df.empty:
-                new_qq.append(df)
-            time.sleep(DELAY)
+    print(f"\n  {year}: {len(schedule)} rounds raced")
+    for kind, rounds in missing.items():
+        print(f"    {kind:<13} missing : {rounds}")
 
-        if rnd in missing_pp:
-            df = fetch_pitstops_round(year, rnd)
-            if not df.empty:
-                new_pp.append(df)
-            time.sleep(DELAY)
+    async def fill_round(rnd):
+        kinds = [kind for kind in KINDS if rnd in missing[kind]]
+        async with gate:
+            datas = await asyncio.gather(*(
+                get(client, bucket, f"{year}/{rnd}/{KINDS[kind][0]}") for kind in kinds
+            ))
+        for kind, data in zip(kinds, datas):
+            files.save(kind, KINDS[kind][1](data, year), rnd)
+        print(f"    {year} round {rnd:>2} ({schedule[rnd]}) ✅ {', '.join(kinds)}")
 
-        print("✅")
+    todo = sorted(set().union(*missing.values()))
+    await asyncio.gather(*(fill_round(rnd) for rnd in todo))
 
-    # Append and save
-    if new_rr:
-        df_rr = pd.concat([df_rr] + new_rr, ignore_index=True).sort_values(["round", "finish_position"])
-        df_rr.to_csv(rr_path, index=False)
-        print(f"  Saved race_results_{year}.csv — {df_rr['round'].nunique()} rounds")
+    files.compact()
+    for kind in KINDS:
+        if missing[kind]:
+            print(f"  Saved {kind} {year} — {len(files.rounds[kind])} rounds")
 
-    if new_qq:
-        df_qq = pd.concat([df_qq] + new_qq, ignore_index=True).sort_values(["round", "quali_position"])
-        df_qq.to_csv(qq_path, index=False)
-        print(f"  Saved qualifying_{year}.csv — {df_qq['round'].nunique()} rounds")
 
-    if new_pp:
-        df_pp = pd.concat([df_pp] + new_pp, ignore_index=True).sort_values(["round"])
-        df_pp.to_csv(pp_path, index=False)
-        print(f"  Saved pitstops_{year}.csv — {df_pp['round'].nunique()} rounds")
+async def main(years, data_dir=DATA_DIR, rate=RATE, burst=BURST, concurrency=CONCURRENCY):
+    bucket = TokenBucket(rate, burst)
+    gate   = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * len(KINDS))
+    async with httpx.AsyncClient(timeout=20, limits=limits) as client:
+        await asyncio.gather(*(fill_missing(client, bucket, gate, data_dir, y) for y in years))
+
+    # Emit feature rows for the new rounds from the stored rolling state
+    for year, rounds in FeatureStore(data_dir=data_dir).update(years).items():
+        print(f"  Features {year}: appended round(s) {', '.join(map(str, rounds))}")
 
 
 if __name__ == "__main__":
-    fill_missing(2023)
-    fill_missing(2024)
-    print("\n✅ Done. Now re-run 02_feature_engineering.ipynb from the multi-year cell.")
+    parser = argparse.ArgumentParser(description="Fill missing rounds in the raw data store from Jolpica.")
+    parser.add_argument("years", nargs="*", type=int, default=[2023, 2024])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--rate", type=float, default=RATE, help="requests per second")
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="rounds in flight")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    asyncio.run(main(args.years, args.data_dir, args.rate, args.burst, args.concurrency))
+    print(f"\n✅ Done in {time.perf_counter() - started:.1f}s. "
+          "Export with `python -m features.store export` (from backend/) "
+          "or re-run 02_feature_engineering.ipynb from the multi-year cell.")
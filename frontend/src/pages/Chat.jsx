@@ -4,6 +4,8 @@ export default function Chat() {
   const [question, setQuestion] = useState('')
   const [messages, setMessages] = useState([])
   const [thinking, setThinking] = useState(false)
+  const [partial, setPartial]   = useState('')
+  const [status, setStatus]     = useState('')
   const ws = useRef(null)
   const bottomRef = useRef(null)
 
@@ -13,9 +15,21 @@ export default function Chat() {
       const data = JSON.parse(event.data)
       if (data.type === 'thinking') {
         setThinking(true)
-      } else if (data.type === 'response') {
-        setMessages(prev => [...prev, { role: 'ai', text: data.message }])
+        setStatus('')
+      } else if (data.type === 'queued') {
+        setStatus(`Queued (#${data.position})`)
+      } else if (data.type === 'progress') {
+        setStatus(data.status === 'tool'
+          ? `${data.agent} agent: ${data.tool?.replaceAll('_', ' ') ?? ''}`
+          : data.status === 'started' ? `Asking the ${data.agent} agent...` : '')
+      } else if (data.type === 'token') {
+        setPartial(prev => prev + data.text)
+      } else if (data.type === 'response' || data.type === 'error' || data.type === 'cancelled') {
+        const text = data.type === 'cancelled' ? 'Stopped.' : data.message
+        setMessages(prev => [...prev, { role: 'ai', text }])
         setThinking(false)
+        setPartial('')
+        setStatus('')
       }
     }
     return () => ws.current?.close()
@@ -23,11 +37,15 @@ export default function Chat() {
 
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' })
-  }, [messages, thinking])
+  }, [messages, thinking, partial])
 
   const handleSubmit = (e) => {
     e.preventDefault()
-    if (!question.trim() || thinking) return
+    if (thinking) {
+      ws.current.send(JSON.stringify({ type: 'cancel' }))
+      return
+    }
+    if (!question.trim()) return
     setMessages(prev => [...prev, { role: 'user', text: question }])
     ws.current.send(JSON.stringify({ message: question }))
     setQuestion('')
@@ -46,7 +64,7 @@ export default function Chat() {
         )}
         {messages.map((msg, i) => (
           <div key={i} className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
-            <div className={`max-w-[80%] rounded-lg px-4 py-3 text-sm leading-relaxed
+            <div className={`max-w-[80%] rounded-lg px-4 py-3 text-sm leading-relaxed whitespace-pre-line
               ${msg.role === 'user'
                 ? 'bg-f1-red text-white'
                 : 'bg-white/5 text-gray-200 border border-white/10'}`}>
@@ -54,14 +72,23 @@ export default function Chat() {
             </div>
           </div>
         ))}
-        {thinking && (
+        {thinking && partial && (
+          <div className="flex justify-start">
+            <div className="max-w-[80%] rounded-lg px-4 py-3 text-sm leading-relaxed whitespace-pre-line
+              bg-white/5 text-gray-200 border border-white/10">
+              {partial}
+            </div>
+          </div>
+        )}
+        {thinking && !partial && (
           <div className="flex justify-start">
-            <div className="bg-white/5 border border-white/10 rounded-lg px-4 py-3">
+            <div className="bg-white/5 border border-white/10 rounded-lg px-4 py-3 flex items-center gap-3">
               <span className="flex gap-1">
                 <span className="w-2 h-2 bg-f1-red rounded-full animate-bounce [animation-delay:0ms]" />
                 <span className="w-2 h-2 bg-f1-red rounded-full animate-bounce [animation-delay:150ms]" />
                 <span className="w-2 h-2 bg-f1-red rounded-full animate-bounce [animation-delay:300ms]" />
               </span>
+              {status && <span className="text-xs text-f1-faint">{status}</span>}
             </div>
           </div>
         )}
@@ -81,11 +108,11 @@ export default function Chat() {
         />
         <button
           type="submit"
-          disabled={thinking || !question.trim()}
+          disabled={!thinking && !question.trim()}
           className="bg-f1-red hover:bg-red-700 disabled:opacity-40 disabled:cursor-not-allowed
             text-white text-sm font-medium px-6 py-3 rounded-lg transition-colors"
         >
-          {thinking ? '...' : 'Ask'}
+          {thinking ? 'Stop' : 'Ask'}
         </button>
       </form>
     </div>
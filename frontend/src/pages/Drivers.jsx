@@ -340,22 +340,27 @@ function CircuitBar({ name, pct, color }) {
   );
 }
 
-function DriverPanel({ driver, onClose }) {
+function DriverPanel({ driver, careers, onClose }) {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
   const teamColor = TEAM_COLORS[driver.team] || "#888";
+  const preloaded = careers?.[driver.code];
 
   useEffect(() => {
     setLoading(true);
     setData(null);
-    fetch(`${API}/api/driver/${driver.code}/career`)
+    // Career comes from the bulk /api/careers load when we have it
+    const url = preloaded
+      ? `${API}/api/driver/${driver.code}`
+      : `${API}/api/driver/${driver.code}/career`;
+    fetch(url)
       .then((r) => r.json())
       .then((d) => {
-        setData(d);
+        setData(preloaded ? { career: preloaded, prediction: d } : d);
         setLoading(false);
       })
       .catch(() => setLoading(false));
-  }, [driver.code]);
+  }, [driver.code, preloaded]);
 
   const career = data?.career;
   const pred = data?.prediction;
@@ -664,6 +669,17 @@ export default function Drivers() {
   const [search, setSearch] = useState("");
   const [selected, setSelected] = useState(null);
   const [viewMode, setViewMode] = useState("team"); // 'team' | 'grid'
+  const [careers, setCareers] = useState(null); // code → career stats
+
+  // One request for every driver's career instead of one per panel open
+  useEffect(() => {
+    fetch(`${API}/api/careers`)
+      .then((r) => r.json())
+      .then((d) =>
+        setCareers(Object.fromEntries(d.careers.map((c) => [c.code, c]))),
+      )
+      .catch(() => {});
+  }, []);
 
   // Filter logic
   const q = search.toLowerCase();
@@ -829,7 +845,11 @@ export default function Drivers() {
 
       <AnimatePresence>
         {selected && (
-          <DriverPanel driver={selected} onClose={() => setSelected(null)} />
+          <DriverPanel
+            driver={selected}
+            careers={careers}
+            onClose={() => setSelected(null)}
+          />
         )}
       </AnimatePresence>
     </div>